@@ -2,9 +2,14 @@ import streamlit as st
 import pandas as pd
 import tempfile
 import os
+import json
 
 from src.components.sidebar import render_sidebar
-from src.utils.experiment import run_batch_experiment
+from src.components.streamlit_reporter import StreamlitReporter
+from src.components.experiment_runner import run_grid
+from src.utils.adaptive import run_adaptive_search
+from src.utils.dataset import parse_questions
+from src.utils.tracing import Tracer
 from dotenv import load_dotenv
 from openai import RateLimitError, InternalServerError
 
@@ -16,6 +21,8 @@ st.set_page_config(page_title="RAG Eval Playground", layout="wide")
 # Session State
 if "eval_results" not in st.session_state:
     st.session_state.eval_results = []
+if "last_trace" not in st.session_state:
+    st.session_state.last_trace = None
 
 st.title("RAG Evaluation Playground")
 
@@ -31,15 +38,26 @@ with col1:
     
     if uploaded_files:
         st.info(f"{len(uploaded_files)} file(s) ready for experiments.")
+    
+    dataset_file = st.file_uploader("Upload question set (JSONL, CSV) - optional", type=["jsonl", "csv"], help="One question per row, optionally with a reference answer. Runs the whole grid over every question.")
+    dataset_questions = None
+    if dataset_file:
+        try:
+            dataset_questions = parse_questions(dataset_file.getvalue().decode("utf-8-sig"), dataset_file.name.rsplit(".", 1)[-1])
+            st.info(f"{len(dataset_questions)} question(s) loaded from {dataset_file.name}.")
+        except ValueError as e:
+            st.error(f"Could not read question set: {e}")
 
 with col2:
     st.header("Playground")
     
-    question = st.text_area("Enter your question:")
+    question = st.text_area("Enter your question:", disabled=bool(dataset_questions), help="Ignored when a question set is uploaded.")
     
-    if st.button("Run Experiment(s)"):
-        if not question:
-            st.error("Please enter a question.")
+    run_clicked = st.button("Run Experiment(s)")
+    estimate_clicked = st.button("Estimate", help="Load the documents and predict requests, tokens and run time without calling any model.")
+    if run_clicked or estimate_clicked:
+        if not question and not dataset_questions:
+            st.error("Please enter a question or upload a question set.")
         else:
             # Save uploaded files to temp paths
             temp_file_paths = []
@@ -66,20 +84,47 @@ with col2:
                 status_placeholder = st.empty()
                 status_placeholder.info("Step 1/3: Initializing models...")
                 
-                # Run Batch
-                results = run_batch_experiment(
-                    file_paths=temp_file_paths,
-                    config=config,
-                    question=question,
-                    progress_bar=progress_bar,
-                    status_placeholder=status_placeholder
-                )
+                reporter = StreamlitReporter(progress_bar, status_placeholder)
+                tracer = Tracer()
+                adaptive_summary = None
                 
-                # Append to history
-                st.session_state.eval_results.extend(results)
+                # Run Batch
+                if config.get("search_mode") == "adaptive" and estimate_clicked:
+                    st.info("Adaptive search stops at its call budget, so there is nothing to estimate.")
+                    results = None
+                elif config.get("search_mode") == "adaptive":
+                    results, adaptive_summary = run_adaptive_search(
+                        file_paths=temp_file_paths,
+                        config=config,
+                        questions=dataset_questions or [{"question": question}],
+                        reporter=reporter,
+                        tracer=tracer
+                    )
+                else:
+                    results = run_grid(
+                        temp_file_paths, config, question, dataset_questions, reporter, tracer,
+                        estimate_only=estimate_clicked
+                    )
                 
-                status_placeholder.empty()
-                st.success(f"Completed {len(results)} runs!")
+                # None when the run was only estimated or the budget blocked it
+                if results is None:
+                    status_placeholder.empty()
+                else:
+                    # Append to history. The engine's last status line (its cache hits and misses) stays visible.
+                    st.session_state.eval_results.extend(results)
+                    st.session_state.last_trace = tracer.to_dict()
+                    
+                    st.success(f"Completed {len(results)} runs!")
+                    if adaptive_summary:
+                        st.info(
+                            f"Adaptive search: {adaptive_summary['calls_used']} call(s) used vs "
+                            f"{adaptive_summary['exhaustive_calls']} for the exhaustive grid "
+                            f"({adaptive_summary['calls_saved']} saved)."
+                        )
+                        if adaptive_summary["best_configuration"]:
+                            st.write("Best configuration:", adaptive_summary["best_configuration"])
+                    if config.get("run_id"):
+                        st.info(f"Run log saved as {config['run_id']}. Select it under 'Resume run' to continue an interrupted sweep.")
                 
             except (RateLimitError, InternalServerError) as e:
                 st.error(f"An API error occurred: {e}")
@@ -96,6 +141,8 @@ with col2:
                         os.rmdir(t_dir)
                 if 'progress_bar' in locals():
                     progress_bar.empty()
+                # The next run gets a fresh run ID; this one stays resumable under 'Resume run'
+                st.session_state.pop("new_run_id", None)
                 
 
 
@@ -106,18 +153,34 @@ if st.session_state.eval_results:
     df = pd.DataFrame(st.session_state.eval_results)
     
     # Reorder columns for better visibility
-    cols = ["Question", "Answer", "Chunk Size", "Overlap", "Top-K", "Temperature", "Top P", "Accuracy", "Faithfulness", "Relevance", "Explanation", "latency_rag", "latency_judge"]
+    cols = ["Question", "Reference", "Answer", "Chunk Size", "Overlap", "Top-K", "Temperature", "Top P", "Accuracy", "Faithfulness", "Relevance", "Explanation", "latency_rag", "latency_judge"]
     
     # Rename columns for display
-    df = df.rename(columns={"latency_rag": "Gen Time (s)", "latency_judge": "Judge Time (s)"})
-    cols = ["Question", "Answer", "Chunk Size", "Overlap", "Top-K", "Temperature", "Top P", "Accuracy", "Faithfulness", "Relevance", "Explanation", "Gen Time (s)", "Judge Time (s)"]
+    df = df.rename(columns={"latency_rag": "Gen Time (s)", "latency_judge": "Judge Time (s)", "generation_cached": "Gen Cached", "judge_cached": "Judge Cached"})
+    cols = ["Question", "Reference", "Answer", "Chunk Size", "Overlap", "Top-K", "Temperature", "Top P", "Round", "Accuracy", "Faithfulness", "Relevance", "Explanation", "Gen Time (s)", "Judge Time (s)", "Gen Cached", "Judge Cached"]
     # Filter only columns that exist
     cols = [c for c in cols if c in df.columns]
     
     st.dataframe(df[cols])
     
+    if st.session_state.last_trace:
+        trace = st.session_state.last_trace
+        st.subheader("Stage Timings (last run)")
+        st.caption(
+            f"Wall time {trace['wall_time']:.1f}s. Share is summed stage time over wall time, "
+            "so stages running concurrently can exceed 100%."
+        )
+        st.dataframe(pd.DataFrame(trace["summary"]))
+        st.download_button(
+            "Download trace (JSON)",
+            data=json.dumps(trace, indent=2, default=str),
+            file_name="trace.json",
+            mime="application/json"
+        )
+    
     if st.button("Clear History"):
         st.session_state.eval_results = []
+        st.session_state.last_trace = None
         st.rerun()
 else:
     st.info("No results yet. Run an experiment!")
@@ -0,0 +1,132 @@
+"""
+Deterministic offline stand-ins for the chat and embedding models, used by the
+benchmark suite. They run the real LangChain chains (prompt, parser, stuff-documents)
+so only provider latency is simulated; no network or API key is needed.
+"""
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from pydantic import PrivateAttr
+
+JUDGE_MARKER = "You are an expert AI evaluator"
+BATCH_COUNT_PATTERN = re.compile(r"Return exactly (\d+) evaluations")
+
+
+class FakeProviderError(Exception):
+    """A transient provider failure (HTTP 503), injected at the configured error rate."""
+    status_code = 503
+
+
+def _seeded_rng(*parts: Any) -> random.Random:
+    digest = hashlib.sha256("\x1f".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return random.Random(int(digest[:16], 16))
+
+
+def _simulate_call(rng: random.Random, latency: float, jitter: float, error_rate: float):
+    delay = latency + rng.uniform(-jitter, jitter) if jitter else latency
+    if delay > 0:
+        time.sleep(delay)
+    if error_rate and rng.random() < error_rate:
+        raise FakeProviderError("Injected provider error")
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Answers RAG prompts with deterministic text and judge prompts with valid JSON
+    verdicts (single or batched). Output depends only on the prompt, the seed and
+    how many times that prompt has been sent, so runs are reproducible under concurrency.
+    """
+
+    latency: float = 0.0
+    jitter: float = 0.0
+    error_rate: float = 0.0
+    answer_words: int = 80
+    seed: int = 0
+
+    _attempts: Dict[str, int] = PrivateAttr(default_factory=dict)
+    _lock: Any = PrivateAttr(default_factory=threading.Lock)
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-offline"
+
+    def _next_rng(self, prompt: str) -> random.Random:
+        # Retries of the same prompt get a fresh draw, so an injected error is not permanent
+        with self._lock:
+            attempt = self._attempts.get(prompt, 0)
+            self._attempts[prompt] = attempt + 1
+        return _seeded_rng(self.seed, prompt, attempt)
+
+    def _respond(self, prompt: str, rng: random.Random) -> str:
+        if JUDGE_MARKER in prompt:
+            match = BATCH_COUNT_PATTERN.search(prompt)
+            verdicts = [self._verdict(rng) for _ in range(int(match.group(1)) if match else 1)]
+            return json.dumps({"evaluations": verdicts} if match else verdicts[0])
+
+        words = re.findall(r"[A-Za-z]{4,}", prompt) or ["policy"]
+        return " ".join(rng.choice(words) for _ in range(self.answer_words)) + "."
+
+    @staticmethod
+    def _verdict(rng: random.Random) -> Dict[str, Any]:
+        return {
+            "accuracy": rng.randint(0, 10),
+            "faithfulness": rng.randint(0, 10),
+            "relevance": rng.randint(0, 10),
+            "explanation": "Deterministic offline verdict."
+        }
+
+    def _generate(
+        self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any
+    ) -> ChatResult:
+        prompt = "\n".join(str(m.content) for m in messages)
+        rng = self._next_rng(prompt)
+        _simulate_call(rng, self.latency, self.jitter, self.error_rate)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self._respond(prompt, rng)))])
+
+
+class FakeEmbeddings(Embeddings):
+    """
+    Unit-length vectors derived from a hash of each text, so identical texts always
+    embed identically. Latency is charged per call plus per text, like a batched endpoint.
+    """
+
+    def __init__(
+        self, dimension: int = 768, latency_per_call: float = 0.0, latency_per_text: float = 0.0,
+        jitter: float = 0.0, error_rate: float = 0.0, seed: int = 0
+    ):
+        self.dimension = dimension
+        # Distinct per seed and dimension, so embedding cache entries never mix
+        self.model = f"fake-{dimension}-{seed}"
+        self.latency_per_call = latency_per_call
+        self.latency_per_text = latency_per_text
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.seed = seed
+        self._calls = 0
+        self._lock = threading.Lock()
+
+    def _vector(self, text: str) -> List[float]:
+        digest = hashlib.sha256(f"{self.seed}\x1f{text}".encode("utf-8")).digest()
+        vector = np.random.default_rng(int.from_bytes(digest[:8], "little")).standard_normal(self.dimension)
+        return (vector / np.linalg.norm(vector)).astype(np.float32).tolist()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        with self._lock:
+            self._calls += 1
+            call = self._calls
+        rng = _seeded_rng(self.seed, "embed", call)
+        _simulate_call(rng, self.latency_per_call + self.latency_per_text * len(texts), self.jitter, self.error_rate)
+        return [self._vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_documents([text])[0]
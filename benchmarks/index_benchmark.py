@@ -0,0 +1,211 @@
+"""
+Recall / latency / memory benchmark of the FAISS index backends.
+
+Builds each backend from src/utils/vectorstore.py (flat, IVF, HNSW, IVF-PQ) over
+the same vectors and reports build time, index size, single-query search latency
+and recall@k against the exact flat index, so a backend can be picked for a corpus
+size knowingly. Queries are held out from the indexed vectors. With --storage,
+each backend is also built with compressed vectors (fp16, int8, PQ), reporting the
+memory saved and recall before and after exact re-ranking.
+
+Vectors are synthetic by default (clustered, like real embeddings, so recall is
+not the pessimistic figure uniform noise gives). With --docs they are the chunk
+embeddings of real documents, from the fake embedding model or, with --ollama,
+from the configured embedding model.
+
+Usage:
+    python -m benchmarks.index_benchmark
+    python -m benchmarks.index_benchmark --vectors 200000 --dimension 384 --types flat,hnsw,ivfpq
+    python -m benchmarks.index_benchmark --types flat,hnsw --storage float32,fp16,int8,pq
+    python -m benchmarks.index_benchmark --docs Legal_Docs_Downloads --ollama --k 5
+"""
+import argparse
+import json
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+
+from benchmarks.fakes import FakeEmbeddings
+from benchmarks.run_benchmark import PERCENTILES, percentile
+from src.cli import collect_documents
+from src.utils.ingestion import load_documents, split_documents
+from src.utils.quantized import RERANK_FACTOR, rerank
+from src.utils.vectorstore import (
+    INDEX_TYPES, VECTOR_STORAGES, build_index, get_embeddings, index_memory_bytes, is_compressed, resolve_index_type,
+    vector_bytes
+)
+
+BACKENDS = [t for t in INDEX_TYPES if t != "auto"]
+
+
+def synthetic_vectors(count: int, dimension: int, clusters: int = 100, seed: int = 0) -> np.ndarray:
+    """Unit vectors scattered around random centres."""
+    rng = np.random.default_rng(seed)
+    centres = rng.standard_normal((clusters, dimension)).astype(np.float32)
+    vectors = centres[rng.integers(0, clusters, count)] + 0.5 * rng.standard_normal((count, dimension)).astype(np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def document_vectors(
+    docs_dirs: List[str], chunk_size: int, chunk_overlap: int, embeddings, max_files: Optional[int] = None
+) -> np.ndarray:
+    file_paths = []
+    for docs_dir in docs_dirs:
+        file_paths.extend(collect_documents(docs_dir))
+    if max_files:
+        file_paths = file_paths[:max_files]
+    chunks = split_documents(load_documents(file_paths), chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+    return np.asarray(embeddings.embed_documents([c.page_content for c in chunks]), dtype=np.float32)
+
+
+def benchmark_index_types(
+    vectors: np.ndarray, queries: np.ndarray, k: int = 5,
+    index_types: List[str] = BACKENDS, index_params: Optional[Dict[str, Any]] = None,
+    storages: List[str] = ["float32"], rerank_factor: int = RERANK_FACTOR
+) -> List[Dict[str, Any]]:
+    """
+    One row per backend and storage: build time, index size, stored-vector size,
+    per-query latency percentiles and recall@k against the exact flat index. For
+    compressed indexes latency includes re-ranking rerank_factor * k candidates
+    against the exact vectors, and recall is given with and without it.
+    """
+    exact = build_index(vectors, "flat")
+    exact.add(vectors)
+    _, truth = exact.search(queries, k)
+
+    def recall(found):
+        return round(float(np.mean([len(set(f) & set(t)) / k for f, t in zip(found, truth)])), 4)
+
+    rows = []
+    for index_type in index_types:
+        for storage in storages:
+            if index_type == "ivfpq" and storage != storages[0]:
+                continue  # always PQ codes
+            compressed = is_compressed(index_type, storage)
+            started = time.perf_counter()
+            if index_type == "flat" and not compressed:
+                index, build_s = exact, None
+            else:
+                index = build_index(vectors, index_type, index_params, storage)
+                index.add(vectors)
+                build_s = round(time.perf_counter() - started, 3)
+            fetch = k * max(rerank_factor, 1) if compressed else k
+
+            latencies = []
+            raw, reranked = [], []
+            for query in queries:
+                started = time.perf_counter()
+                _, ids = index.search(query[None, :], fetch)
+                if compressed:
+                    reranked.append(rerank(vectors, query, ids[0], k)[1])
+                latencies.append(time.perf_counter() - started)
+                raw.append(ids[0][:k])
+
+            stored, full = vector_bytes(index)
+            row = {
+                "index_type": index_type,
+                "storage": "pq" if index_type == "ivfpq" else storage,
+                "build_s": build_s,
+                "memory_mb": round(index_memory_bytes(index) / (1024 * 1024), 2),
+                "vector_mb": round(stored / (1024 * 1024), 2),
+                "float32_mb": round(full / (1024 * 1024), 2),
+                f"recall_at_{k}": recall(raw),
+                f"reranked_recall_at_{k}": recall(reranked) if compressed else None
+            }
+            for pct in PERCENTILES:
+                row[f"p{pct}_ms"] = round(percentile(latencies, pct) * 1000, 4)
+            rows.append(row)
+    return rows
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    k = report["k"]
+    lines = [
+        f"Vectors: {report['vectors']}  Dimension: {report['dimension']}  Queries: {report['queries']}  "
+        f"auto -> {report['auto']}  Re-rank: {report['rerank_factor']}x",
+        "",
+        f"{'index':<8}{'storage':<9}{'build s':>9}{'index MB':>10}{'vec MB':>9}{f'recall@{k}':>11}{'re-ranked':>11}"
+        + "".join(f"{'p' + str(p) + ' ms':>10}" for p in PERCENTILES)
+    ]
+    for row in report["rows"]:
+        build = f"{row['build_s']:.3f}" if row["build_s"] is not None else "-"
+        reranked = row[f"reranked_recall_at_{k}"]
+        lines.append(
+            f"{row['index_type']:<8}{row['storage']:<9}{build:>9}{row['memory_mb']:>10.2f}{row['vector_mb']:>9.2f}"
+            f"{row[f'recall_at_{k}']:>11.4f}{(f'{reranked:.4f}' if reranked is not None else '-'):>11}"
+            + "".join(f"{row[f'p{p}_ms']:>10.4f}" for p in PERCENTILES)
+        )
+    return "\n".join(lines)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Compare FAISS index backends on recall, latency and memory.")
+    parser.add_argument("--vectors", type=int, default=50000, help="Synthetic vectors to index (default: 50000).")
+    parser.add_argument("--dimension", type=int, default=768, help="Synthetic vector dimension (default: 768).")
+    parser.add_argument("--docs", nargs="+", help="Index the chunks of these document directories instead.")
+    parser.add_argument("--max-files", type=int, help="Use only the first N documents.")
+    parser.add_argument("--chunk-size", type=int, default=1000)
+    parser.add_argument("--chunk-overlap", type=int, default=200)
+    parser.add_argument("--ollama", action="store_true", help="Embed --docs with the configured embedding model instead of the fake one.")
+    parser.add_argument("--queries", type=int, default=200, help="Held-out query vectors (default: 200).")
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--types", default=",".join(BACKENDS), help=f"Comma-separated backends (default: {','.join(BACKENDS)}).")
+    parser.add_argument("--storage", default="float32", help=f"Comma-separated vector storages ({','.join(VECTOR_STORAGES)}; default: float32).")
+    parser.add_argument("--rerank-factor", type=int, default=RERANK_FACTOR, help=f"Candidates per result re-ranked for compressed storage (default: {RERANK_FACTOR}).")
+    parser.add_argument("--nlist", type=int, help="IVF lists.")
+    parser.add_argument("--nprobe", type=int, help="IVF lists searched per query.")
+    parser.add_argument("--ef-search", type=int, help="HNSW search breadth.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Write the report as JSON to this path.")
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    index_types = args.types.split(",")
+    for index_type in index_types:
+        if index_type not in BACKENDS:
+            print(f"Unknown index type '{index_type}' (expected one of {', '.join(BACKENDS)})", file=sys.stderr)
+            return 2
+    storages = args.storage.split(",")
+    for storage in storages:
+        if storage not in VECTOR_STORAGES:
+            print(f"Unknown vector storage '{storage}' (expected one of {', '.join(VECTOR_STORAGES)})", file=sys.stderr)
+            return 2
+
+    if args.docs:
+        embeddings = get_embeddings() if args.ollama else FakeEmbeddings(dimension=args.dimension, seed=args.seed)
+        vectors = document_vectors(args.docs, args.chunk_size, args.chunk_overlap, embeddings, args.max_files)
+    else:
+        vectors = synthetic_vectors(args.vectors + args.queries, args.dimension, seed=args.seed)
+    if len(vectors) <= args.queries:
+        print(f"Need more than {args.queries} vectors, got {len(vectors)}", file=sys.stderr)
+        return 2
+    rng = np.random.default_rng(args.seed)
+    order = rng.permutation(len(vectors))
+    queries, indexed = vectors[order[:args.queries]], vectors[order[args.queries:]]
+
+    index_params = {name: value for name, value in [
+        ("nlist", args.nlist), ("nprobe", args.nprobe), ("ef_search", args.ef_search)
+    ] if value is not None}
+    report = {
+        "vectors": len(indexed),
+        "dimension": indexed.shape[1],
+        "queries": len(queries),
+        "k": args.k,
+        "auto": resolve_index_type("auto", len(indexed)),
+        "index_params": index_params,
+        "rerank_factor": args.rerank_factor,
+        "rows": benchmark_index_types(indexed, queries, args.k, index_types, index_params, storages, args.rerank_factor)
+    }
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
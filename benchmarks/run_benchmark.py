@@ -0,0 +1,269 @@
+"""
+Offline end-to-end benchmark of the experiment engine.
+
+Runs run_batch_experiment over real documents with deterministic fake chat and
+embedding models (see benchmarks/fakes.py), so the numbers measure the engine's own
+overhead - loading, splitting, indexing, retrieval, chains, scheduling - plus the
+simulated provider latency. Needs no network, Ollama or API keys.
+
+Usage:
+    python -m benchmarks.run_benchmark
+    python -m benchmarks.run_benchmark --docs SPU_docs --max-files 2 --questions 10 --llm-latency 0.2 --concurrency 8
+    python -m benchmarks.run_benchmark --json bench_output.json
+"""
+import argparse
+import json
+import math
+import sys
+import time
+import tracemalloc
+from typing import Any, Dict, List
+
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings
+from src.cli import collect_documents
+from src.utils.experiment import run_batch_experiment
+from src.utils.llm_manager import register_model
+from src.utils.memory import peak_rss_mb
+from src.utils.reporting import Reporter
+from src.utils.tracing import Tracer
+from src.utils.vectorstore import (
+    EMBEDDING_BATCH_SIZE, EMBEDDING_CONCURRENCY, INDEX_TYPES, RERANK_FACTOR, VECTOR_STORAGES, set_embeddings
+)
+
+DEFAULT_DOC_DIRS = ["SPU_docs", "Legal_Docs_Downloads"]
+FAKE_MODEL_NAME = "Fake (Offline)"
+
+# Cycled to build as many questions as requested
+SAMPLE_QUESTIONS = [
+    "What are the drainage requirements for new development?",
+    "Who is responsible for maintaining a side sewer?",
+    "What physical security measures are required at pump stations?",
+    "When is a rezone of the official land use map allowed?",
+    "What are the off-street parking requirements for multifamily housing?",
+    "What electrical design standards apply to SPU facilities?",
+    "How must SCADA systems be protected?",
+    "What energy code provisions apply to residential buildings?"
+]
+
+PERCENTILES = [50, 90, 99]
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Nearest-rank percentile; 0.0 for an empty list."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100.0 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def stage_latencies(tracer: Tracer) -> List[Dict[str, Any]]:
+    """Per-stage call count, total and latency percentiles from a run's trace."""
+    durations: Dict[str, List[float]] = {}
+    for span in sorted(tracer.spans, key=lambda s: s.start):
+        durations.setdefault(span.name, []).append(span.duration)
+    rows = []
+    for name, values in durations.items():
+        row = {"stage": name, "calls": len(values), "total_s": round(sum(values), 4)}
+        for pct in PERCENTILES:
+            row[f"p{pct}_s"] = round(percentile(values, pct), 4)
+        row["max_s"] = round(max(values), 4)
+        rows.append(row)
+    return rows
+
+
+class _ErrorCounter(Reporter):
+    """Counts engine errors (failed cells, failed files) without printing each one."""
+
+    def __init__(self):
+        self.errors: List[str] = []
+
+    def error(self, message: str):
+        self.errors.append(message)
+
+
+def run_benchmark(
+    file_paths: List[str],
+    config: Dict[str, Any],
+    questions: List[Dict[str, Any]],
+    llm: FakeChatModel,
+    embeddings: FakeEmbeddings,
+    trace_memory: bool = False
+) -> Dict[str, Any]:
+    """
+    Runs one benchmark and returns its report. `llm` is registered under the
+    config's model and judge names and `embeddings` replaces the embedding model
+    for the run; the engine is otherwise unchanged.
+    """
+    tracer = Tracer()
+    reporter = _ErrorCounter()
+    rss_before = peak_rss_mb()
+    if trace_memory:
+        tracemalloc.start()
+
+    model_names = {config["model_name"], config["judge_model"]}
+    for name in model_names:
+        register_model(name, lambda **kwargs: llm)
+    set_embeddings(embeddings)
+    start = time.perf_counter()
+    try:
+        results = run_batch_experiment(
+            file_paths, config, questions[0]["question"], questions=questions, reporter=reporter, tracer=tracer
+        )
+    finally:
+        wall = time.perf_counter() - start
+        for name in model_names:
+            register_model(name, None)
+        set_embeddings(None)
+
+    python_peak_mb = None
+    if trace_memory:
+        python_peak_mb = tracemalloc.get_traced_memory()[1] / (1024 * 1024)
+        tracemalloc.stop()
+
+    index_spans = [s for s in tracer.spans if s.name == "create_vectorstore" and "embed_seconds" in s.attrs]
+    embed_seconds = sum(s.attrs["embed_seconds"] for s in index_spans)
+    embedded_chunks = sum(s.attrs.get("chunks", 0) for s in index_spans)
+
+    valid_indexes = [(s, o) for s in config["chunk_sizes"] for o in config["chunk_overlaps"] if o < s] if file_paths else [None]
+    expected_cells = (
+        len(valid_indexes) * (len(config["k_retrievals"]) if file_paths else 1)
+        * len(config["temperatures"]) * len(config["top_ps"]) * len(questions)
+    )
+    return {
+        "files": len(file_paths),
+        "questions": len(questions),
+        "cells_expected": expected_cells,
+        "cells_completed": len(results),
+        "errors": len(reporter.errors),
+        "wall_s": round(wall, 3),
+        "cells_per_s": round(len(results) / wall, 3) if wall else 0.0,
+        "embed_chunks_per_s": round(embedded_chunks / embed_seconds, 1) if embed_seconds else None,
+        "peak_rss_mb": round(peak_rss_mb(), 1),
+        "rss_before_mb": round(rss_before, 1),
+        "python_peak_mb": round(python_peak_mb, 1) if python_peak_mb is not None else None,
+        "stages": stage_latencies(tracer),
+        "config": {k: v for k, v in config.items() if k not in ("model_name", "judge_model")}
+    }
+
+
+def format_report(report: Dict[str, Any]) -> str:
+    lines = [
+        f"Files: {report['files']}  Questions: {report['questions']}  "
+        f"Cells: {report['cells_completed']}/{report['cells_expected']}  Errors: {report['errors']}",
+        f"Wall: {report['wall_s']:.2f}s  Throughput: {report['cells_per_s']:.2f} cells/s"
+        + (f"  Embedding: {report['embed_chunks_per_s']:.1f} chunks/s" if report["embed_chunks_per_s"] is not None else ""),
+        f"Peak RSS: {report['peak_rss_mb']:.1f} MB (before run: {report['rss_before_mb']:.1f} MB)"
+        + (f"  Python peak: {report['python_peak_mb']:.1f} MB" if report["python_peak_mb"] is not None else ""),
+        "",
+        f"{'stage':<20}{'calls':>7}{'total s':>10}" + "".join(f"{'p' + str(p) + ' s':>10}" for p in PERCENTILES) + f"{'max s':>10}"
+    ]
+    for row in report["stages"]:
+        lines.append(
+            f"{row['stage']:<20}{row['calls']:>7}{row['total_s']:>10.3f}"
+            + "".join(f"{row[f'p{p}_s']:>10.4f}" for p in PERCENTILES)
+            + f"{row['max_s']:>10.4f}"
+        )
+    return "\n".join(lines)
+
+
+def _int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",")]
+
+
+def _float_list(value: str) -> List[float]:
+    return [float(v) for v in value.split(",")]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmark the experiment engine offline with fake models.")
+    parser.add_argument("--docs", nargs="+", default=DEFAULT_DOC_DIRS, help="Document directories (default: SPU_docs Legal_Docs_Downloads).")
+    parser.add_argument("--max-files", type=int, help="Use only the first N documents.")
+    parser.add_argument("--questions", type=int, default=4, help="Number of questions (default: 4).")
+    parser.add_argument("--chunk-sizes", type=_int_list, default=[1000])
+    parser.add_argument("--chunk-overlaps", type=_int_list, default=[200])
+    parser.add_argument("--k", type=_int_list, default=[3, 5])
+    parser.add_argument("--temperatures", type=_float_list, default=[0.1, 0.7])
+    parser.add_argument("--top-ps", type=_float_list, default=[0.9])
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--judge-concurrency", type=int)
+    parser.add_argument("--judge-batch-size", type=int, default=1)
+    parser.add_argument("--execution-mode", choices=["pipelined", "phased"], default="pipelined")
+    parser.add_argument("--streaming", action="store_true", help="Stream documents into the index in bounded batches.")
+    parser.add_argument("--memory-limit-mb", type=float, help="Resident memory ceiling for ingestion.")
+    parser.add_argument("--embed-batch-size", type=int, default=EMBEDDING_BATCH_SIZE, help=f"Chunks per embedding request (default: {EMBEDDING_BATCH_SIZE}).")
+    parser.add_argument("--embed-concurrency", type=int, default=EMBEDDING_CONCURRENCY, help=f"Embedding requests in flight while indexing (default: {EMBEDDING_CONCURRENCY}).")
+    parser.add_argument("--index-type", choices=INDEX_TYPES, default="auto", help="FAISS backend (default: auto).")
+    parser.add_argument("--vector-storage", choices=VECTOR_STORAGES, default="float32", help="How index vectors are stored (default: float32).")
+    parser.add_argument("--rerank-factor", type=int, default=RERANK_FACTOR, help=f"Candidates per result re-ranked for compressed storage (default: {RERANK_FACTOR}).")
+    parser.add_argument("--no-citation-lookup", action="store_true", help="Retrieve by vector search only, without the RCW/WAC/SMC citation index.")
+    parser.add_argument("--embedding-cache", action="store_true", help="Reuse cached chunk embeddings (off by default so runs stay comparable).")
+    parser.add_argument("--index-store", action="store_true", help="Reuse and save persisted FAISS indexes (off by default so runs stay comparable).")
+    parser.add_argument("--document-cache", action="store_true", help="Reuse cached parsed documents (off by default so runs stay comparable).")
+    parser.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per chat call (default: 0.05).")
+    parser.add_argument("--llm-jitter", type=float, default=0.02, help="Uniform +/- jitter on chat latency.")
+    parser.add_argument("--llm-error-rate", type=float, default=0.0, help="Fraction of chat calls that fail.")
+    parser.add_argument("--embed-latency", type=float, default=0.01, help="Seconds per embedding call.")
+    parser.add_argument("--embed-latency-per-text", type=float, default=0.0005, help="Extra seconds per embedded text.")
+    parser.add_argument("--embed-error-rate", type=float, default=0.0, help="Fraction of embedding calls that fail.")
+    parser.add_argument("--dimension", type=int, default=768, help="Embedding dimension (nomic-embed-text is 768).")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--trace-memory", action="store_true", help="Also report peak Python allocations (tracemalloc; slows the run).")
+    parser.add_argument("--json", help="Write the report as JSON to this path.")
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+
+    file_paths = []
+    for docs_dir in args.docs:
+        file_paths.extend(collect_documents(docs_dir))
+    if args.max_files:
+        file_paths = file_paths[:args.max_files]
+    if not file_paths:
+        print(f"No documents found in {', '.join(args.docs)}", file=sys.stderr)
+        return 2
+
+    questions = [{"question": SAMPLE_QUESTIONS[i % len(SAMPLE_QUESTIONS)] + ("" if i < len(SAMPLE_QUESTIONS) else f" ({i})")}
+                 for i in range(args.questions)]
+    config = {
+        "model_name": FAKE_MODEL_NAME,
+        "judge_model": FAKE_MODEL_NAME,
+        "chunk_sizes": args.chunk_sizes,
+        "chunk_overlaps": args.chunk_overlaps,
+        "k_retrievals": args.k,
+        "temperatures": args.temperatures,
+        "top_ps": args.top_ps,
+        "max_concurrency": args.concurrency,
+        "max_judge_concurrency": args.judge_concurrency or args.concurrency,
+        "judge_batch_size": args.judge_batch_size,
+        "execution_mode": args.execution_mode,
+        "streaming_ingestion": args.streaming,
+        "memory_limit_mb": args.memory_limit_mb,
+        "embedding_batch_size": args.embed_batch_size,
+        "embedding_concurrency": args.embed_concurrency,
+        "index_type": args.index_type,
+        "vector_storage": args.vector_storage,
+        "rerank_factor": args.rerank_factor,
+        "citation_lookup": not args.no_citation_lookup,
+        "use_embedding_cache": args.embedding_cache,
+        "use_index_store": args.index_store,
+        "use_document_cache": args.document_cache
+    }
+    llm = FakeChatModel(latency=args.llm_latency, jitter=args.llm_jitter, error_rate=args.llm_error_rate, seed=args.seed)
+    embeddings = FakeEmbeddings(
+        dimension=args.dimension, latency_per_call=args.embed_latency, latency_per_text=args.embed_latency_per_text,
+        error_rate=args.embed_error_rate, seed=args.seed
+    )
+
+    report = run_benchmark(file_paths, config, questions, llm, embeddings, trace_memory=args.trace_memory)
+    print(format_report(report))
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return 0 if report["cells_completed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
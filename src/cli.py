@@ -0,0 +1,208 @@
+"""
+Headless batch-experiment runner. Does not import Streamlit.
+
+Usage:
+    python -m src.cli --spec experiment.yaml --docs Legal_Docs_Downloads --questions questions.jsonl
+    python -m src.cli --spec experiment.json --docs SPU_docs --question "What are the drainage requirements?"
+
+The spec holds the same keys as the sidebar config (model_name, judge_model,
+chunk_sizes, chunk_overlaps, k_retrievals, temperatures, top_ps, max_concurrency, ...).
+"""
+import argparse
+import json
+import os
+import sys
+from typing import Any, Dict, List
+
+from dotenv import load_dotenv
+
+from src.utils.adaptive import run_adaptive_search
+from src.utils.dataset import load_questions
+from src.utils.estimator import estimate_run, check_budget, format_duration
+from src.utils.experiment import run_batch_experiment
+from src.utils.ingestion import load_documents, get_document_cache
+from src.utils.reporting import ConsoleReporter
+from src.utils.run_log import new_run_id
+from src.utils.tracing import Tracer
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".md")
+
+# Same defaults as the sidebar's single-value mode
+DEFAULT_SPEC = {
+    "max_concurrency": 1,
+    "temperatures": [0.7],
+    "top_ps": [0.9],
+    "chunk_sizes": [1000],
+    "chunk_overlaps": [200],
+    "k_retrievals": [3],
+    "use_judge_cache": True,
+    "generation_cache_policy": "never"
+}
+REQUIRED_SPEC_KEYS = ["model_name", "judge_model"]
+
+
+def load_spec(spec_path: str) -> Dict[str, Any]:
+    """Loads an experiment spec from JSON or YAML and fills in defaults."""
+    with open(spec_path, "r", encoding="utf-8") as f:
+        if spec_path.endswith((".yaml", ".yml")):
+            try:
+                import yaml
+            except ImportError:
+                raise ValueError("YAML specs need PyYAML installed (pip install pyyaml), or use a JSON spec.")
+            spec = yaml.safe_load(f) or {}
+        else:
+            spec = json.load(f)
+
+    if not isinstance(spec, dict):
+        raise ValueError(f"Spec must be a mapping of config keys, got {type(spec).__name__}")
+    missing = [k for k in REQUIRED_SPEC_KEYS if k not in spec]
+    if missing:
+        raise ValueError(f"Spec is missing required key(s): {', '.join(missing)}")
+
+    config = dict(DEFAULT_SPEC)
+    config.update(spec)
+    # Allow scalars for grid dimensions in hand-written specs
+    for key in ["temperatures", "top_ps", "chunk_sizes", "chunk_overlaps", "k_retrievals"]:
+        if not isinstance(config[key], list):
+            config[key] = [config[key]]
+    return config
+
+
+def collect_documents(docs_dir: str) -> List[str]:
+    """Returns supported document paths under docs_dir, recursively, in a stable order."""
+    paths = []
+    for root, _, files in os.walk(docs_dir):
+        for name in files:
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+def write_results(results: List[Dict[str, Any]], output_dir: str, run_id: str) -> List[str]:
+    """Writes results as CSV and JSON. Returns the written paths."""
+    import pandas as pd
+
+    os.makedirs(output_dir, exist_ok=True)
+    csv_path = os.path.join(output_dir, f"{run_id}.csv")
+    json_path = os.path.join(output_dir, f"{run_id}.json")
+    pd.DataFrame(results).to_csv(csv_path, index=False)
+    with open(json_path, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False, default=str)
+    return [csv_path, json_path]
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Run a RAG evaluation grid without the Streamlit UI.")
+    parser.add_argument("--spec", required=True, help="Experiment spec (.json, .yaml or .yml).")
+    parser.add_argument("--docs", help="Directory of documents (PDF, TXT, MD). Omit to run without RAG.")
+    question_group = parser.add_mutually_exclusive_group(required=True)
+    question_group.add_argument("--questions", help="Question set (.jsonl or .csv).")
+    question_group.add_argument("--question", help="A single question.")
+    parser.add_argument("--output", default="results", help="Directory for result files (default: results).")
+    parser.add_argument("--run-id", help="Run ID for the checkpoint log (default: a new timestamped ID).")
+    parser.add_argument("--resume", action="store_true", help="Skip cells already completed under --run-id.")
+    parser.add_argument("--estimate-only", action="store_true", help="Print the pre-flight token/request/time estimate and exit.")
+    parser.add_argument("--no-citation-lookup", action="store_true", help="Retrieve by vector search only, without the RCW/WAC/SMC citation index.")
+    return parser
+
+
+def main(argv: List[str] = None) -> int:
+    args = build_parser().parse_args(argv)
+    load_dotenv()
+    reporter = ConsoleReporter()
+
+    try:
+        config = load_spec(args.spec)
+        questions = load_questions(args.questions) if args.questions else [{"question": args.question}]
+    except (OSError, ValueError) as e:
+        reporter.error(str(e))
+        return 2
+
+    if args.resume and not args.run_id:
+        reporter.error("--resume needs --run-id.")
+        return 2
+
+    file_paths = []
+    if args.docs:
+        file_paths = collect_documents(args.docs)
+        if not file_paths:
+            reporter.error(f"No supported documents ({', '.join(SUPPORTED_EXTENSIONS)}) found in {args.docs}")
+            return 2
+
+    config["run_id"] = args.run_id or new_run_id()
+    config["resume"] = args.resume
+    if args.no_citation_lookup:
+        config["citation_lookup"] = False
+    reporter.info(
+        f"Run {config['run_id']}: {len(file_paths)} document(s), {len(questions)} question(s), "
+        f"generator={config['model_name']}, judge={config['judge_model']}"
+    )
+
+    # Pre-flight estimate; the spec's token_budget / request_budget block oversized runs
+    documents = None
+    needs_estimate = args.estimate_only or config.get("token_budget") or config.get("request_budget")
+    if needs_estimate and config.get("search_mode") != "adaptive":
+        try:
+            documents = (
+                load_documents(file_paths, cache=get_document_cache(config))
+                if file_paths and not config.get("streaming_ingestion") else None
+            )
+            estimate = estimate_run(file_paths, config, questions, documents=documents)
+        except Exception as e:
+            reporter.error(f"Failed to load documents: {e}")
+            return 2
+        reporter.info(
+            f"Estimate: {estimate['cells']} cell(s), {estimate['requests']} request(s), {estimate['tokens']} token(s), "
+            f"~{format_duration(estimate['wall_time_s'])} ({estimate['latency_source']} latency)"
+        )
+        for provider, totals in estimate["providers"].items():
+            reporter.info(
+                f"  {provider}: {totals['requests']} request(s), {totals['input_tokens']} input / "
+                f"{totals['output_tokens']} output token(s)"
+            )
+        budget_error = check_budget(estimate, config)
+        if budget_error:
+            reporter.error(f"Run blocked: {budget_error}")
+            return 2
+        if args.estimate_only:
+            return 0
+
+    tracer = Tracer()
+    adaptive_summary = None
+    if config.get("search_mode") == "adaptive":
+        if not config.get("call_budget"):
+            reporter.error("Adaptive search needs a call_budget in the spec.")
+            return 2
+        results, adaptive_summary = run_adaptive_search(file_paths, config, questions, reporter=reporter, tracer=tracer)
+    else:
+        results = run_batch_experiment(
+            file_paths=file_paths,
+            config=config,
+            question=questions[0]["question"],
+            questions=questions,
+            reporter=reporter,
+            tracer=tracer,
+            documents=documents
+        )
+
+    for path in write_results(results, args.output, config["run_id"]):
+        reporter.info(f"Wrote {path}")
+    if adaptive_summary is not None:
+        summary_path = os.path.join(args.output, f"{config['run_id']}_adaptive.json")
+        with open(summary_path, "w", encoding="utf-8") as f:
+            json.dump(adaptive_summary, f, indent=2, default=str)
+        reporter.info(f"Wrote {summary_path}")
+    trace_path = os.path.join(args.output, f"{config['run_id']}_trace.json")
+    tracer.write(trace_path)
+    reporter.info(f"Wrote {trace_path}")
+    for row in tracer.summary():
+        reporter.info(
+            f"  {row['Stage']:<20} {row['Calls']:>5} call(s) {row['Total (s)']:>9.2f}s total "
+            f"{row['Mean (s)']:>7.2f}s mean {row['Share']:>7.1%} of wall"
+        )
+    reporter.info(f"Completed {len(results)} cell(s).")
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
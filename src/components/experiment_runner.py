@@ -0,0 +1,53 @@
+import pandas as pd
+import streamlit as st
+
+from src.utils.estimator import estimate_run, check_budget, format_duration
+from src.utils.experiment import run_batch_experiment
+from src.utils.ingestion import load_documents, get_document_cache
+
+
+def run_grid(file_paths, config, question, questions, reporter, tracer, estimate_only=False):
+    """
+    Runs the experiment grid for the Run and Estimate buttons; returns the result rows,
+    or None when the run was only estimated or the budget blocked it.
+
+    The pre-flight estimate (like the CLI's --estimate-only) loads the documents, so it
+    only runs when asked for or when a token/request budget has to be checked. Otherwise
+    the engine loads documents itself, and not at all when every index is already in
+    the index store.
+    """
+    documents = None
+    if estimate_only or config.get("token_budget") or config.get("request_budget"):
+        # Pre-flight: tokenize the real prompts and chunks to predict usage before any LLM call
+        reporter.info("Estimating tokens and run time...")
+        # Streaming runs never hold the whole corpus, so the estimate streams it too
+        documents = (
+            load_documents(file_paths, cache=get_document_cache(config))
+            if file_paths and not config.get("streaming_ingestion") else None
+        )
+        estimate = estimate_run(file_paths, config, questions or [{"question": question}], documents=documents)
+        st.info(
+            f"Estimate: {estimate['requests']:,} request(s), {estimate['tokens']:,} token(s), "
+            f"~{format_duration(estimate['wall_time_s'])} "
+            f"({'from past runs' if estimate['latency_source'] == 'history' else 'default latency'})."
+        )
+        st.dataframe(pd.DataFrame([
+            {"Provider": provider, **totals} for provider, totals in estimate["providers"].items()
+        ]))
+
+        budget_error = check_budget(estimate, config)
+        if budget_error:
+            st.error(f"Run blocked: {budget_error} Raise the budget in the sidebar or shrink the grid.")
+            return None
+        if estimate_only:
+            return None
+
+    return run_batch_experiment(
+        file_paths=file_paths,
+        config=config,
+        question=question,
+        questions=questions,
+        reporter=reporter,
+        tracer=tracer,
+        documents=documents
+    )
@@ -1,5 +1,9 @@
 import streamlit as st
 
+from src.utils.residency import same_local_model
+from src.utils.run_log import list_runs, new_run_id
+from src.utils.vectorstore import EMBEDDING_BATCH_SIZE, EMBEDDING_CONCURRENCY, INDEX_TYPES, VECTOR_STORAGES
+
 def render_sidebar():
     """Renders the sidebar and returns the configuration."""
     
@@ -20,6 +24,80 @@ def render_sidebar():
     
     # Concurrency
     max_concurrency = st.sidebar.slider("Concurrency (Max Threads)", 1, 10, 1, help="Limit parallel requests to avoid Rate Limits.")
+    max_judge_concurrency = st.sidebar.slider("Judge Concurrency (Max Threads)", 1, 10, max_concurrency, help="Parallel judge requests. Defaults to the generator limit.")
+    judge_batch_size = st.sidebar.slider("Judge Batch Size", 1, 8, 1, help="Score up to N answers that share a question and retrieved context (e.g. temperature/top_p variants) in one judge call. Batches are capped by the judge's context window; unparseable batch responses are re-judged one answer at a time.")
+    
+    # Execution Mode
+    # A single Ollama model serving both stages never needs unloading, so it can pipeline
+    uses_ollama = ("Ollama" in selected_model or "Ollama" in selected_judge) and not same_local_model(selected_model, selected_judge)
+    execution_mode_label = st.sidebar.radio(
+        "Execution Mode",
+        ["Pipelined", "Phased (unload between stages)"],
+        index=1 if uses_ollama else 0,
+        help="Pipelined judges each answer as soon as it is generated. Phased runs all generations, unloads the Ollama generator, then judges - use it when both models cannot be resident at once."
+    )
+    execution_mode = "pipelined" if execution_mode_label == "Pipelined" else "phased"
+    
+    # Caching
+    use_judge_cache = st.sidebar.checkbox("Use judge cache", value=True, help="Reuse stored verdicts for answers that were already judged with the same judge model and prompt.")
+    use_embedding_cache = st.sidebar.checkbox("Use embedding cache", value=True, help="Reuse stored vectors for chunks that were embedded before with the same embedding model.")
+    use_index_store = st.sidebar.checkbox("Reuse stored indexes", value=True, help="Load FAISS indexes saved by earlier runs on the same documents, chunk settings and embedding model instead of rebuilding them.")
+    use_document_cache = st.sidebar.checkbox("Use parsed-document cache", value=True, help="Reuse the extracted text of files that were parsed before (matched by content), skipping PDF parsing.")
+    generation_cache_options = {"Never": "never", "Only low temperature": "low_temperature", "Always": "always"}
+    generation_cache_label = st.sidebar.selectbox(
+        "Generation cache",
+        list(generation_cache_options.keys()),
+        index=0,
+        help="Reuse stored answers for identical prompts and model settings. 'Only low temperature' caches near-deterministic runs (temperature <= 0.2)."
+    )
+    generation_cache_policy = generation_cache_options[generation_cache_label]
+    
+    # Ingestion memory
+    streaming_ingestion = st.sidebar.checkbox(
+        "Streaming ingestion", value=False,
+        help="Read, split and embed documents in small batches instead of loading the whole corpus first. Use it for large corpora such as the full RCW/WAC downloads."
+    )
+    memory_limit_mb = st.sidebar.number_input(
+        "Memory ceiling in MB (0 = no limit)", min_value=0, value=0, step=512,
+        help="Stop building an index if the app's resident memory goes over this."
+    )
+    embedding_batch_size = st.sidebar.number_input(
+        "Embedding batch size", min_value=1, value=EMBEDDING_BATCH_SIZE, step=50,
+        help="Chunks sent to the embedding model per request while building an index."
+    )
+    embedding_concurrency = st.sidebar.number_input(
+        "Embedding requests in flight", min_value=1, value=EMBEDDING_CONCURRENCY, step=1,
+        help="Embedding batches sent at once. Higher values help when the embedding server can serve several requests in parallel."
+    )
+    index_type = st.sidebar.selectbox(
+        "Vector index", INDEX_TYPES, index=0,
+        help="FAISS backend. 'auto' uses the exact flat index for small corpora and approximate HNSW/IVF/IVF-PQ indexes as they grow; run benchmarks/index_benchmark.py to compare recall and latency."
+    )
+    vector_storage = st.sidebar.selectbox(
+        "Vector storage", VECTOR_STORAGES, index=0,
+        help="Keep index vectors as float16, int8 or product-quantized codes to hold more indexes in memory. Results are re-ranked against the exact vectors, which stay on disk."
+    )
+    citation_lookup = st.sidebar.checkbox(
+        "Citation lookup", value=True,
+        help="Index RCW/WAC/SMC section numbers found in chunks and file names, and put chunks citing a question's sections verbatim ahead of vector search results."
+    )
+    
+    # Checkpointing
+    save_run_log = st.sidebar.checkbox("Save run log", value=True, help="Append each completed cell to runs/<run id>.jsonl so an interrupted run can be resumed.")
+    resume_run_id = st.sidebar.selectbox(
+        "Resume run",
+        ["Start new run"] + list_runs(),
+        index=0,
+        disabled=not save_run_log,
+        help="Skip cells already completed in a previous run with the same documents and settings."
+    )
+    resume = save_run_log and resume_run_id != "Start new run"
+    run_id = None
+    if save_run_log:
+        # Streamlit reruns this on every widget change, so a new run's ID is drawn once and kept until it runs
+        if "new_run_id" not in st.session_state:
+            st.session_state.new_run_id = new_run_id()
+        run_id = resume_run_id if resume else st.session_state.new_run_id
     
     # Parameters
     st.sidebar.subheader("Model Parameters")
@@ -79,30 +157,71 @@ def render_sidebar():
         chunk_overlaps = [st.sidebar.number_input("Chunk Overlap", 0, 500, 200, 50)]
         k_retrievals = [st.sidebar.slider("Top-K Retrieval", 1, 10, 3)]
     
+    # Search Strategy
+    st.sidebar.subheader("Search Strategy")
+    search_mode_label = st.sidebar.radio(
+        "Strategy",
+        ["Exhaustive grid", "Adaptive (successive halving)"],
+        help="Adaptive evaluates every configuration on a few questions, drops the weakest each round and spends the rest of the budget on the best. Works best with an uploaded question set."
+    )
+    search_mode = "adaptive" if search_mode_label.startswith("Adaptive") else "exhaustive"
+    call_budget = None
+    halving_rate = 2
+    if search_mode == "adaptive":
+        call_budget = st.sidebar.number_input("Call budget (LLM calls)", min_value=2, max_value=10000, value=40, step=2)
+        halving_rate = st.sidebar.slider("Halving rate", 2, 4, 2, help="Keep 1/N of the configurations after each round.")
+    
     config = {
         "model_name": selected_model,
         "judge_model": selected_judge,
         "mode": mode,
         "max_concurrency": max_concurrency,
+        "max_judge_concurrency": max_judge_concurrency,
+        "judge_batch_size": judge_batch_size,
+        "execution_mode": execution_mode,
+        "use_judge_cache": use_judge_cache,
+        "use_document_cache": use_document_cache,
+        "use_embedding_cache": use_embedding_cache,
+        "use_index_store": use_index_store,
+        "streaming_ingestion": streaming_ingestion,
+        "embedding_batch_size": int(embedding_batch_size),
+        "embedding_concurrency": int(embedding_concurrency),
+        "index_type": index_type,
+        "vector_storage": vector_storage,
+        "citation_lookup": citation_lookup,
+        "memory_limit_mb": memory_limit_mb,
+        "generation_cache_policy": generation_cache_policy,
+        "run_id": run_id,
+        "resume": resume,
         "temperatures": temperatures,     # List
         "top_ps": top_ps,                 # List
         "chunk_sizes": chunk_sizes,       # List
         "chunk_overlaps": chunk_overlaps, # List
-        "k_retrievals": k_retrievals      # List
+        "k_retrievals": k_retrievals,     # List
+        "search_mode": search_mode,
+        "call_budget": call_budget,
+        "halving_rate": halving_rate
     }
     
-    # Cost Estimation Display
     total_combinations = len(chunk_sizes) * len(chunk_overlaps) * len(k_retrievals) * len(temperatures) * len(top_ps)
-    total_calls = total_combinations * 2 # Generator + Judge
     
     st.sidebar.markdown("---")
     st.sidebar.subheader("Safety Guardrails")
     st.sidebar.write(f"**Total Experiment Runs:** {total_combinations}")
-    st.sidebar.write(f"**Est. API Calls:** {total_calls}")
+    config["token_budget"] = st.sidebar.number_input(
+        "Token budget (0 = no limit)", min_value=0, value=0, step=10000,
+        help="Block the run if the pre-flight estimate (exact prompt, chunk and judge token counts) exceeds this many tokens."
+    )
+    config["request_budget"] = st.sidebar.number_input(
+        "Request budget (0 = no limit)", min_value=0, value=0, step=10,
+        help="Block the run if it would send more LLM requests than this."
+    )
     
-    if total_calls > 10:
-        st.sidebar.error(f"⚠️ High usage! This will consume {total_calls} calls. Daily limit is ~15.")
-    else:
-        st.sidebar.success(f"✅ Safe. {total_calls} calls within typical daily limits.")
+    if search_mode == "adaptive":
+        # The budget caps usage regardless of grid size
+        st.sidebar.info(f"Adaptive search is capped at roughly {call_budget} calls.")
+    # Request and token counts depend on the documents, questions, cache and batching,
+    # so they come from the pre-flight estimate rather than the grid size
+    st.sidebar.caption("Click **Estimate** to see the requests, tokens and run time this grid needs before running it.")
     
     return config
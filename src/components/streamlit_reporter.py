@@ -0,0 +1,10 @@
+import streamlit as st
+
+from src.utils.reporting import PlaceholderReporter
+
+
+class StreamlitReporter(PlaceholderReporter):
+    """Reports engine progress to a Streamlit progress bar / status placeholder and errors via st.error."""
+
+    def error(self, message: str):
+        st.error(message)
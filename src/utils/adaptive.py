@@ -0,0 +1,184 @@
+import itertools
+import math
+from collections import defaultdict
+from typing import Any, Dict, List, Tuple
+
+from src.utils.experiment import run_batch_experiment
+from src.utils.reporting import Reporter, PlaceholderReporter
+from src.utils.tracing import Span, Tracer
+
+# Generator + judge, at most
+CALLS_PER_CELL = 2
+# Trace stages that each stand for one LLM request unless served from a cache
+LLM_CALL_STAGES = ("generation", "judging", "judging_batch")
+# Keep 1/HALVING_RATE of the configurations after each round
+DEFAULT_HALVING_RATE = 2
+
+
+def grid_arms(config: Dict[str, Any], has_documents: bool) -> List[Tuple]:
+    """All valid (chunk_size, chunk_overlap, k, temperature, top_p) configurations in the grid."""
+    if not has_documents:
+        # No RAG: only the sampling parameters vary (matches run_batch_experiment's no-file grid)
+        return [(None, None, 0, t, p) for t, p in itertools.product(config["temperatures"], config["top_ps"])]
+    return [
+        (size, overlap, k, t, p)
+        for size, overlap, k, t, p in itertools.product(
+            config["chunk_sizes"], config["chunk_overlaps"], config["k_retrievals"],
+            config["temperatures"], config["top_ps"]
+        )
+        if overlap < size
+    ]
+
+
+def row_arm(row: Dict[str, Any]) -> Tuple:
+    return (row["Chunk Size"], row["Overlap"], row["Top-K"], row["Temperature"], row["Top P"])
+
+
+def row_score(row: Dict[str, Any]) -> float:
+    """Mean of the judge's three 0-10 scores; missing scores count as 0."""
+    return sum(row.get(metric) or 0 for metric in ("Accuracy", "Faithfulness", "Relevance")) / 3.0
+
+
+def llm_calls(spans: List[Span]) -> int:
+    """
+    LLM requests actually sent in a run's spans: cache hits are free, a batched judge
+    call counts once and every retry of a call counts again.
+    """
+    return sum(1 + s.attrs.get("retries", 0) for s in spans if s.name in LLM_CALL_STAGES and not s.attrs.get("cached"))
+
+
+def run_adaptive_search(
+    file_paths: List[str],
+    config: Dict[str, Any],
+    questions: List[Dict[str, Any]],
+    reporter: Reporter = None,
+    progress_bar: Any = None,
+    status_placeholder: Any = None,
+    tracer: Tracer = None
+) -> Tuple[List[Dict[str, Any]], Dict[str, Any]]:
+    """
+    Successive halving over the configuration grid under config["call_budget"] LLM calls.
+
+    Each round evaluates every surviving configuration on the same batch of new
+    questions, ranks configurations by their mean judge score so far and keeps the
+    top 1/halving_rate. Budget is spread over the rounds still needed, so budget left
+    over by early rounds goes to the promising configurations in later ones.
+
+    The budget is charged with the LLM requests each round actually made, read from
+    its trace (see llm_calls), so cached generations and verdicts and batched judging
+    leave more of it for later rounds, and retries use it up faster. Each round is
+    sized at the calls per cell seen so far (never below CALLS_PER_CELL, the first
+    round's assumption), and a round that would not fit in what is left is not
+    started. Retries cannot be known in advance, though, so a round that hits more
+    of them than earlier ones can still end slightly over budget.
+
+    Returns (rows, summary); rows carry the round they were evaluated in, and summary
+    reports the calls used versus the exhaustive grid. All rounds record into `tracer`.
+    """
+    if reporter is None:
+        reporter = PlaceholderReporter(progress_bar, status_placeholder)
+    if tracer is None:
+        tracer = Tracer()
+
+    budget = int(config["call_budget"])
+    eta = max(int(config.get("halving_rate", DEFAULT_HALVING_RATE)), 2)
+    arms = grid_arms(config, bool(file_paths))
+    exhaustive_calls = len(arms) * len(questions) * CALLS_PER_CELL
+
+    summary = {
+        "configurations": len(arms),
+        "questions": len(questions),
+        "exhaustive_calls": exhaustive_calls,
+        "call_budget": budget,
+        "rounds": [],
+        "calls_used": 0,
+        "calls_saved": exhaustive_calls,
+        "best_configuration": None,
+        "best_score": None
+    }
+
+    if not arms:
+        reporter.error("No valid configurations in the grid.")
+        return [], summary
+    if budget < len(arms) * CALLS_PER_CELL:
+        reporter.error(
+            f"Call budget {budget} is too small to evaluate each of the {len(arms)} configuration(s) once "
+            f"(needs at least {len(arms) * CALLS_PER_CELL})."
+        )
+        return [], summary
+
+    n_rounds = max(1, math.ceil(math.log(len(arms), eta)))
+    survivors = list(arms)
+    scores = defaultdict(list)
+    vectorstores = {}
+    results = []
+    calls_used = 0
+    cells_run = 0
+    next_question = 0
+
+    for round_index in range(n_rounds):
+        remaining = budget - calls_used
+        # Requests per cell observed so far, retries included
+        calls_per_cell = CALLS_PER_CELL
+        if cells_run:
+            calls_per_cell = max(CALLS_PER_CELL, math.ceil(calls_used / cells_run))
+        cost_per_question = len(survivors) * calls_per_cell
+        if remaining < cost_per_question or next_question >= len(questions):
+            break
+
+        # Share what's left evenly over the rounds still to run, but always afford one question
+        round_budget = remaining // (n_rounds - round_index)
+        per_arm = max(1, round_budget // cost_per_question)
+        per_arm = min(per_arm, remaining // cost_per_question, len(questions) - next_question)
+        batch = questions[next_question:next_question + per_arm]
+        next_question += per_arm
+
+        reporter.info(
+            f"Adaptive round {round_index + 1}/{n_rounds}: {len(survivors)} configuration(s) x {len(batch)} question(s)..."
+        )
+        round_config = dict(config, cell_filter=survivors)
+        spans_before = len(tracer.spans)
+        rows = run_batch_experiment(
+            file_paths, round_config, batch[0]["question"],
+            questions=batch, reporter=reporter, vectorstores=vectorstores, tracer=tracer
+        )
+        round_calls = llm_calls(tracer.spans[spans_before:])
+        calls_used += round_calls
+        cells_run += len(survivors) * len(batch)
+
+        for row in rows:
+            row["Round"] = round_index + 1
+            scores[row_arm(row)].append(row_score(row))
+        results.extend(rows)
+
+        # Configurations whose every cell failed rank last
+        def mean_score(arm):
+            return sum(scores[arm]) / len(scores[arm]) if scores[arm] else -1.0
+
+        ranked = sorted(survivors, key=mean_score, reverse=True)
+        keep = max(1, math.ceil(len(survivors) / eta))
+        summary["rounds"].append({
+            "round": round_index + 1,
+            "configurations": len(survivors),
+            "questions": len(batch),
+            "calls": round_calls,
+            "kept": keep,
+            "best_score": mean_score(ranked[0])
+        })
+        survivors = ranked[:keep]
+        reporter.progress(calls_used / budget)
+        if len(survivors) == 1:
+            break
+
+    best = survivors[0]
+    summary["calls_used"] = calls_used
+    summary["calls_saved"] = exhaustive_calls - calls_used
+    if scores[best]:
+        summary["best_configuration"] = dict(zip(["Chunk Size", "Overlap", "Top-K", "Temperature", "Top P"], best))
+        summary["best_score"] = sum(scores[best]) / len(scores[best])
+
+    reporter.info(
+        f"Adaptive search used {calls_used} of {budget} budgeted call(s); "
+        f"exhaustive grid would need {exhaustive_calls} ({summary['calls_saved']} saved)."
+    )
+    return results, summary
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Optional
+
+# Root directory for all on-disk caches (override with RAG_EVAL_CACHE_DIR)
+CACHE_DIR = os.getenv(
+    "RAG_EVAL_CACHE_DIR",
+    os.path.join(os.path.dirname(__file__), "../../.cache")
+)
+# Hits record their access time in memory; the times are written in one batch once
+# this many are pending, or sooner when an entry is set, the cache evicts or it closes
+ACCESS_FLUSH_SIZE = 256
+
+
+def hash_key(*parts: Any) -> str:
+    """Builds a stable SHA-256 cache key from JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def hash_file(file_path: str, chunk_size: int = 1024 * 1024) -> str:
+    """SHA-256 of a file's contents, streamed so large PDFs aren't read into memory at once."""
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class DiskCache:
+    """
+    A small thread-safe key/value cache stored in one SQLite file.
+    Values are JSON-serialized. When the stored size exceeds max_bytes the least
+    recently used entries are evicted; entries older than ttl_seconds (if set)
+    are treated as misses. Access times of hits are written in batches, so reads
+    don't each commit. Hit/miss counters are kept per instance.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        max_bytes: int = 100 * 1024 * 1024,
+        cache_dir: Optional[str] = None,
+        ttl_seconds: Optional[float] = None
+    ):
+        cache_dir = cache_dir or CACHE_DIR
+        os.makedirs(cache_dir, exist_ok=True)
+        self.path = os.path.join(cache_dir, f"{name}.sqlite")
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._accessed = {}
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_entries_accessed ON entries(accessed_at)")
+        self._conn.commit()
+        self._total_bytes = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+
+    def get(self, key: str) -> Optional[Any]:
+        """Returns the cached value for key, or None on a miss."""
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, size, created_at FROM entries WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            if self.ttl_seconds is not None and now - row[2] > self.ttl_seconds:
+                self._conn.execute("DELETE FROM entries WHERE key = ?", (key,))
+                self._conn.commit()
+                self._total_bytes -= row[1]
+                self.misses += 1
+                return None
+            self._accessed[key] = now
+            if len(self._accessed) >= ACCESS_FLUSH_SIZE:
+                self._flush_access_times()
+                self._conn.commit()
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key: str, value: Any):
+        """Stores value under key, evicting least recently used entries if over the size limit."""
+        data = json.dumps(value, ensure_ascii=False)
+        size = len(data.encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            # Written first so this insert's own access time isn't overwritten by an older hit
+            self._flush_access_times()
+            old = self._conn.execute("SELECT size FROM entries WHERE key = ?", (key,)).fetchone()
+            if old is not None:
+                self._total_bytes -= old[0]
+            self._conn.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, data, size, now, now)
+            )
+            self._total_bytes += size
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+            self._conn.commit()
+
+    def _flush_access_times(self):
+        if self._accessed:
+            self._conn.executemany(
+                "UPDATE entries SET accessed_at = ? WHERE key = ?",
+                [(accessed_at, key) for key, accessed_at in self._accessed.items()]
+            )
+            self._accessed.clear()
+
+    def _evict(self):
+        # Trim to 90% of the limit so we don't evict again on every insert
+        target = int(self.max_bytes * 0.9)
+        rows = self._conn.execute("SELECT key, size FROM entries ORDER BY accessed_at ASC").fetchall()
+        evicted = []
+        for key, size in rows:
+            if self._total_bytes <= target:
+                break
+            evicted.append((key,))
+            self._total_bytes -= size
+        self._conn.executemany("DELETE FROM entries WHERE key = ?", evicted)
+
+    def clear(self):
+        """Removes every entry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.commit()
+            self._accessed.clear()
+            self._total_bytes = 0
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    @property
+    def size_bytes(self) -> int:
+        return self._total_bytes
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters for this instance."""
+        return {"hits": self.hits, "misses": self.misses}
+
+    def close(self):
+        with self._lock:
+            self._flush_access_times()
+            self._conn.commit()
+            self._conn.close()
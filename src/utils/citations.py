@@ -0,0 +1,159 @@
+import os
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+# Dotted numbers (RCW, SMC): 36.70A, 19.27.031, 28A.320.125. Dashed (WAC): 51-11C, 51-50-0100.
+# A letter suffix followed by lowercase is the start of a glued word, not part of the number.
+_PART = r"\d+(?:[A-Za-z](?![a-z]))?"
+_NUMBER = rf"{_PART}(?:[.-]{_PART}){{1,2}}(?!\d)"
+
+_PREFIXED = re.compile(rf"\b(?i:(RCW|WAC|SMC))\s*(?:§+\s*)?({_NUMBER})")
+_SUFFIXED = re.compile(rf"\b(?i:chapters?)\s+({_NUMBER})\s+(?i:(RCW|WAC))\b")
+_FILE_NAME = re.compile(rf"^(?i:(RCW|WAC|SMC))[\s_]+({_NUMBER})")
+# Municode downloads: "Chapter 23.40 - COMPLIANCE ... _ Municipal Code _ Seattle, WA _ ...pdf"
+_MUNICODE_FILE = re.compile(rf"^Chapter\s+({_NUMBER})\b.*Municipal Code", re.IGNORECASE)
+
+
+def _separator(code: str) -> str:
+    return "-" if code == "WAC" else "."
+
+
+def normalize_citation(code: str, number: str) -> Optional[str]:
+    """"RCW 36.70A"-style key, or None if the number's shape doesn't fit the code (WAC is dashed, RCW/SMC dotted)."""
+    code = code.upper()
+    other = "." if code == "WAC" else "-"
+    if other in number:
+        return None
+    return f"{code} {number.upper()}"
+
+
+def chapter_of(citation: str) -> Optional[str]:
+    """The chapter a section citation belongs to ("RCW 19.27.031" -> "RCW 19.27"); None for a chapter."""
+    code, number = citation.split(" ", 1)
+    parts = number.split(_separator(code))
+    return f"{code} {_separator(code).join(parts[:2])}" if len(parts) > 2 else None
+
+
+def file_citation(file_path: str) -> Optional[str]:
+    """
+    The chapter a document is named after: "WAC 51-50.pdf", "RCW_36.70A.pdf" and
+    "WAC_51-11C_..." from the download scripts, or a Municode "Chapter 23.40 - ..."
+    Seattle Municipal Code page. None for other names.
+    """
+    name = os.path.splitext(os.path.basename(file_path))[0]
+    match = _FILE_NAME.match(name)
+    if match:
+        citation = normalize_citation(match.group(1), match.group(2))
+    else:
+        match = _MUNICODE_FILE.match(name)
+        citation = normalize_citation("SMC", match.group(1)) if match else None
+    if citation is None:
+        return None
+    return chapter_of(citation) or citation
+
+
+def find_citations(text: str, context: Optional[str] = None) -> List[str]:
+    """
+    Every citation in text, normalized, in order (repeats included). Recognizes
+    "RCW 19.27.031", "WAC 51-50-0100", "SMC 23.40.020" and "chapter 19.27 RCW".
+    With a context chapter (the document's file_citation), bare section numbers in
+    that chapter, such as "51-50-0100" headings inside WAC 51-50, count as well.
+    """
+    found = {}
+    numbers = set()  # where already-matched numbers start, so bare matches don't count them again
+    for match in _PREFIXED.finditer(text):
+        found.setdefault(match.start(), normalize_citation(match.group(1), match.group(2)))
+        numbers.add(match.start(2))
+    for match in _SUFFIXED.finditer(text):
+        found.setdefault(match.start(), normalize_citation(match.group(2), match.group(1)))
+        numbers.add(match.start(1))
+    if context is not None:
+        code, chapter = context.split(" ", 1)
+        pattern = rf"(?<![\w.-]){re.escape(chapter)}{re.escape(_separator(code))}{_PART}(?![\w-]|\.\d)"
+        for match in re.finditer(pattern, text, re.IGNORECASE):
+            if match.start() not in numbers:
+                found.setdefault(match.start(), normalize_citation(code, match.group(0)))
+    return [c for _, c in sorted(found.items()) if c is not None]
+
+
+def extract_citations(text: str, context: Optional[str] = None) -> List[str]:
+    """The distinct citations in text in order of first appearance (see find_citations)."""
+    return list(dict.fromkeys(find_citations(text, context)))
+
+
+class CitationIndex:
+    """
+    Exact lookup from RCW/WAC/SMC citations to chunk ids (docstore ids), filled as
+    chunks are indexed. `cited` holds the chunks whose text cites each citation,
+    with the number of mentions; `sections` the chunks citing any section of a
+    chapter; `files` the chunks of documents named after a chapter. Ids keep
+    insertion (chunk) order.
+    """
+
+    def __init__(self):
+        self.cited: Dict[str, Dict[str, int]] = {}
+        self.sections: Dict[str, Dict[str, None]] = {}
+        self.files: Dict[str, Dict[str, None]] = {}
+        self._file_citations: Dict[str, Optional[str]] = {}
+
+    def add(self, ids: Iterable[str], documents: Iterable[Document]):
+        for id_, doc in zip(ids, documents):
+            source = doc.metadata.get("source")
+            if source not in self._file_citations:
+                self._file_citations[source] = file_citation(source) if isinstance(source, str) else None
+            context = self._file_citations[source]
+            for citation, count in Counter(find_citations(doc.page_content, context)).items():
+                self.cited.setdefault(citation, {})[id_] = count
+                chapter = chapter_of(citation)
+                if chapter is not None:
+                    self.sections.setdefault(chapter, {})[id_] = None
+            if context is not None:
+                self.files.setdefault(context, {})[id_] = None
+
+    def lookup(self, question: str) -> Tuple[List[str], List[str]]:
+        """
+        (exact, related) chunk ids for the citations in question. exact are chunks
+        citing them verbatim, most mentions first, then those from the cited
+        chapter's own document, then in chunk order. related are chunks that only
+        cite a section of a cited chapter or come from a file named after the cited
+        chapter (or the cited section's chapter), in chunk order.
+        """
+        mentions, in_file, related = {}, {}, {}
+        for citation in extract_citations(question):
+            file_ids = self.files.get(chapter_of(citation) or citation, {})
+            for id_, count in self.cited.get(citation, {}).items():
+                mentions[id_] = mentions.get(id_, 0) + count
+                in_file[id_] = in_file.get(id_, False) or id_ in file_ids
+            related.update(self.sections.get(citation, {}))
+            related.update(file_ids)
+        exact = sorted(mentions, key=lambda id_: (-mentions[id_], not in_file[id_]))
+        return exact, [id_ for id_ in related if id_ not in mentions]
+
+    def __len__(self) -> int:
+        return len(self.cited)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "cited": self.cited,
+            "sections": {k: list(v) for k, v in self.sections.items()},
+            "files": {k: list(v) for k, v in self.files.items()}
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CitationIndex":
+        index = cls()
+        index.cited = {k: dict(v) for k, v in data.get("cited", {}).items()}
+        index.sections = {k: dict.fromkeys(v) for k, v in data.get("sections", {}).items()}
+        index.files = {k: dict.fromkeys(v) for k, v in data.get("files", {}).items()}
+        return index
+
+    @classmethod
+    def from_docstore(cls, docstore, index_to_docstore_id: Dict[int, str]) -> "CitationIndex":
+        """Rebuilds the index for an existing vector store's chunks, in index order."""
+        index = cls()
+        ids = [index_to_docstore_id[i] for i in sorted(index_to_docstore_id)]
+        index.add(ids, [docstore.search(id_) for id_ in ids])
+        return index
@@ -0,0 +1,63 @@
+import csv
+import io
+import json
+from typing import Any, Dict, List
+
+# Accepted column/field names, in order of preference
+QUESTION_FIELDS = ["question", "query", "input"]
+REFERENCE_FIELDS = ["reference", "reference_answer", "expected_answer", "answer"]
+
+
+def _normalize_record(record: Dict[str, Any], line_no: int) -> Dict[str, Any]:
+    """Maps a raw record to {"question": ..., "reference": ...}."""
+    lowered = {str(k).strip().lower(): v for k, v in record.items()}
+
+    question = next((lowered[f] for f in QUESTION_FIELDS if lowered.get(f)), None)
+    if not question or not str(question).strip():
+        raise ValueError(f"Row {line_no}: missing a question (expected one of {QUESTION_FIELDS})")
+
+    reference = next((lowered[f] for f in REFERENCE_FIELDS if lowered.get(f)), None)
+    return {
+        "question": str(question).strip(),
+        "reference": str(reference).strip() if reference else None
+    }
+
+
+def parse_questions(content: str, file_format: str) -> List[Dict[str, Any]]:
+    """
+    Parses a question set from JSONL or CSV text.
+    Each record needs a question and may carry a reference answer.
+    """
+    file_format = file_format.lower().lstrip(".")
+    questions = []
+
+    if file_format == "jsonl":
+        for line_no, line in enumerate(content.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                raise ValueError(f"Row {line_no}: invalid JSON ({e})")
+            if isinstance(record, str):
+                record = {"question": record}
+            elif not isinstance(record, dict):
+                raise ValueError(f"Row {line_no}: expected a JSON object or string, got {type(record).__name__}")
+            questions.append(_normalize_record(record, line_no))
+    elif file_format == "csv":
+        reader = csv.DictReader(io.StringIO(content))
+        for line_no, record in enumerate(reader, start=2):
+            questions.append(_normalize_record(record, line_no))
+    else:
+        raise ValueError(f"Unsupported question set format: {file_format}")
+
+    if not questions:
+        raise ValueError("Question set is empty.")
+    return questions
+
+
+def load_questions(file_path: str) -> List[Dict[str, Any]]:
+    """Loads a question set from a .jsonl or .csv file."""
+    with open(file_path, "r", encoding="utf-8-sig") as f:
+        content = f.read()
+    return parse_questions(content, file_path.rsplit(".", 1)[-1])
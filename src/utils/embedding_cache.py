@@ -0,0 +1,179 @@
+import os
+import sqlite3
+import threading
+from typing import List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from src.utils.cache import CACHE_DIR, hash_key
+
+# Misses are sent to the embedding model this many texts at a time
+EMBEDDING_CACHE_BATCH_SIZE = 100
+# SQLite's default limit on bound parameters is 999
+_LOOKUP_BATCH = 500
+
+
+def embedding_model_id(embeddings: Embeddings) -> str:
+    """Identifies an embedding model for cache keys (e.g. "OllamaEmbeddings:nomic-embed-text")."""
+    return f"{type(embeddings).__name__}:{getattr(embeddings, 'model', '')}"
+
+
+class EmbeddingCache:
+    """
+    Persistent chunk embeddings for one embedding model.
+
+    Vectors are appended as float32 rows to a flat file that is read through a
+    memory map; a SQLite table maps hash_key(text, model) to the row. Appends take
+    SQLite's write lock and derive the next row from the file size, so concurrent
+    processes can share the cache. Entries are never evicted; clear() empties it.
+    Hit/miss counters are kept per instance (one text = one hit or miss).
+    """
+
+    def __init__(self, model: str, cache_dir: Optional[str] = None):
+        self.model = model
+        directory = os.path.join(cache_dir or CACHE_DIR, "embeddings")
+        os.makedirs(directory, exist_ok=True)
+        name = hash_key(model)[:16]
+        self.path = os.path.join(directory, f"{name}.sqlite")
+        self.vectors_path = os.path.join(directory, f"{name}.f32")
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._mmap = None
+
+        self._conn = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS entries (key TEXT PRIMARY KEY, row INTEGER NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        row = self._conn.execute("SELECT value FROM meta WHERE name = 'dimension'").fetchone()
+        self.dimension = int(row[0]) if row else None
+
+    def _key(self, text: str) -> str:
+        return hash_key(text, self.model)
+
+    def _vectors(self, needed_rows: int) -> np.ndarray:
+        # Re-map only when rows were appended (by this or another process) since the last map
+        if self._mmap is None or len(self._mmap) < needed_rows:
+            rows = os.path.getsize(self.vectors_path) // (4 * self.dimension)
+            self._mmap = np.memmap(self.vectors_path, dtype=np.float32, mode="r", shape=(rows, self.dimension))
+        return self._mmap
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """Cached vectors for texts, in order, with None for each miss."""
+        keys = [self._key(t) for t in texts]
+        rows = {}
+        with self._lock:
+            if self.dimension is not None:
+                for start in range(0, len(keys), _LOOKUP_BATCH):
+                    batch = keys[start:start + _LOOKUP_BATCH]
+                    placeholders = ",".join("?" * len(batch))
+                    rows.update(self._conn.execute(
+                        f"SELECT key, row FROM entries WHERE key IN ({placeholders})", batch
+                    ).fetchall())
+            results = []
+            if rows:
+                vectors = self._vectors(max(rows.values()) + 1)
+            for key in keys:
+                row = rows.get(key)
+                results.append(vectors[row].tolist() if row is not None else None)
+            found = sum(r is not None for r in results)
+            self.hits += found
+            self.misses += len(results) - found
+        return results
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]):
+        """Stores vectors for texts (texts already cached are skipped)."""
+        if not texts:
+            return
+        array = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                if self.dimension is None:
+                    row = self._conn.execute("SELECT value FROM meta WHERE name = 'dimension'").fetchone()
+                    self.dimension = int(row[0]) if row else array.shape[1]
+                    self._conn.execute("INSERT OR IGNORE INTO meta (name, value) VALUES ('dimension', ?)", (str(self.dimension),))
+                if array.shape[1] != self.dimension:
+                    raise ValueError(f"Embedding dimension {array.shape[1]} does not match the cache's {self.dimension}")
+
+                keys = [self._key(t) for t in texts]
+                existing = set()
+                for start in range(0, len(keys), _LOOKUP_BATCH):
+                    batch = keys[start:start + _LOOKUP_BATCH]
+                    existing.update(k for (k,) in self._conn.execute(
+                        f"SELECT key FROM entries WHERE key IN ({','.join('?' * len(batch))})", batch
+                    ))
+                new = {}
+                for i, key in enumerate(keys):
+                    if key not in existing and key not in new:
+                        new[key] = i
+                if new:
+                    # A partial row left by an interrupted append is overwritten
+                    first_row = (os.path.getsize(self.vectors_path) if os.path.exists(self.vectors_path) else 0) // (4 * self.dimension)
+                    with open(self.vectors_path, "r+b" if os.path.exists(self.vectors_path) else "wb") as f:
+                        f.seek(first_row * 4 * self.dimension)
+                        f.write(array[list(new.values())].tobytes())
+                        f.truncate()
+                    self._conn.executemany(
+                        "INSERT INTO entries (key, row) VALUES (?, ?)",
+                        [(key, first_row + n) for n, key in enumerate(new)]
+                    )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    def clear(self):
+        """Removes every entry and the vector file."""
+        with self._lock:
+            self._conn.execute("DELETE FROM entries")
+            self._conn.execute("DELETE FROM meta")
+            self.dimension = None
+            self._mmap = None
+            if os.path.exists(self.vectors_path):
+                os.remove(self.vectors_path)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM entries").fetchone()[0]
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters for this instance."""
+        return {"hits": self.hits, "misses": self.misses}
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def close(self):
+        with self._lock:
+            self._mmap = None
+            self._conn.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embedding model so embed_documents only sends texts missing from the
+    cache, EMBEDDING_CACHE_BATCH_SIZE at a time (each distinct text once), and stores
+    the results. Queries are passed through uncached.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, batch_size: int = EMBEDDING_CACHE_BATCH_SIZE):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.batch_size = batch_size
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.cache.get_many(texts)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        embedded = {}
+        for start in range(0, len(missing), self.batch_size):
+            batch = missing[start:start + self.batch_size]
+            batch_vectors = self.embeddings.embed_documents(batch)
+            self.cache.put_many(batch, batch_vectors)
+            embedded.update(zip(batch, batch_vectors))
+        return [v if v is not None else embedded[t] for t, v in zip(texts, vectors)]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embeddings.embed_query(text)
@@ -0,0 +1,221 @@
+import glob
+import itertools
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from langchain_core.documents import Document
+from langchain_core.output_parsers import JsonOutputParser
+
+from src.utils.experiment import (
+    get_provider_name, get_retry_config, resolve_execution_mode, judge_token_limit, split_for_token_limit,
+    ESTIMATED_OUTPUT_TOKENS, JUDGE_OUTPUT_TOKENS_PER_ANSWER, JUDGE_PROMPT_OVERHEAD_TOKENS
+)
+from src.utils.ingestion import load_documents, iter_documents, get_document_cache, MultiConfigSplitter
+from src.utils.judge import EvaluationScore, BatchEvaluationScore, JUDGE_PROMPT_TEMPLATE, BATCH_JUDGE_PROMPT_TEMPLATE
+from src.utils.rag_chain import render_rag_prompt
+from src.utils.run_log import RUNS_DIR
+from src.utils.tokens import count_tokens
+
+# Per-call latency assumed for a model with no uncached calls in past run logs
+DEFAULT_CALL_LATENCY_S = 3.0
+
+
+def _template_tokens(template: str, parser_model, **values) -> int:
+    """Tokens in a judge template with its format instructions and the given values filled in."""
+    format_instructions = JsonOutputParser(pydantic_object=parser_model).get_format_instructions()
+    return count_tokens(template.format(format_instructions=format_instructions, **values))
+
+
+def historical_latencies(runs_dir: Optional[str] = None) -> Dict[str, Dict[str, float]]:
+    """
+    Mean per-call latency of each generator and judge model, and mean answer length
+    of each generator, over the uncached cells in past run logs.
+    """
+    samples = {"generation": {}, "judging": {}, "answer_tokens": {}}
+    for path in glob.glob(os.path.join(runs_dir or RUNS_DIR, "*.jsonl")):
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    row = json.loads(line)["row"]
+                except (json.JSONDecodeError, KeyError):
+                    continue
+                if not row.get("generation_cached") and row.get("latency_rag"):
+                    samples["generation"].setdefault(row["Model"], []).append(row["latency_rag"])
+                    samples["answer_tokens"].setdefault(row["Model"], []).append(count_tokens(row.get("Answer") or ""))
+                if not row.get("judge_cached") and row.get("latency_judge"):
+                    samples["judging"].setdefault(row["Judge"], []).append(row["latency_judge"])
+    return {
+        kind: {model: sum(values) / len(values) for model, values in by_model.items()}
+        for kind, by_model in samples.items()
+    }
+
+
+def _stage_time(provider_config: Dict[str, Any], requests: int, tokens: int, latency: float, workers: int) -> float:
+    """Seconds for a stage: the slower of latency over the worker pool and the provider's rate limits."""
+    seconds = requests * latency / max(workers, 1)
+    if provider_config.get("requests_per_minute"):
+        seconds = max(seconds, requests * 60.0 / provider_config["requests_per_minute"])
+    if provider_config.get("tokens_per_minute"):
+        seconds = max(seconds, tokens * 60.0 / provider_config["tokens_per_minute"])
+    return seconds
+
+
+def estimate_run(
+    file_paths: List[str],
+    config: Dict[str, Any],
+    questions: List[Dict[str, Any]],
+    documents: Optional[List[Document]] = None,
+    history: Optional[Dict[str, Dict[str, float]]] = None
+) -> Dict[str, Any]:
+    """
+    Predicts requests, input/output tokens per provider and wall time for a grid run.
+
+    Prompts are tokenized exactly: the rendered RAG prompt (system prompt included),
+    the judge template with its format instructions, and the real chunks each
+    (chunk_size, chunk_overlap) config produces. Retrieved context is estimated as
+    k chunks of that config's mean size. Answer length and call latency come from
+    `history` (see historical_latencies) when available. Judge batches are split to
+    fit the judge's token limit exactly as the engine splits them.
+
+    Pass the already-loaded `documents` for file_paths to avoid parsing them twice.
+    With config["streaming_ingestion"] and no `documents`, files are streamed once
+    and every config's chunks counted as each page arrives, so the estimate stays
+    within bounded memory too.
+    """
+    model_name = config["model_name"]
+    judge_model = config["judge_model"]
+    if history is None:
+        history = historical_latencies(config.get("runs_dir"))
+
+    answer_tokens = int(history.get("answer_tokens", {}).get(model_name, ESTIMATED_OUTPUT_TOKENS))
+    gen_latency = history.get("generation", {}).get(model_name, DEFAULT_CALL_LATENCY_S)
+    judge_latency = history.get("judging", {}).get(judge_model, DEFAULT_CALL_LATENCY_S)
+    judge_output_tokens = JUDGE_OUTPUT_TOKENS_PER_ANSWER
+
+    gen_workers = config.get("max_concurrency", 1)
+    judge_workers = config.get("max_judge_concurrency", gen_workers)
+    batch_size = max(int(config.get("judge_batch_size", 1)), 1)
+    pipelined = resolve_execution_mode(config) == "pipelined"
+    generation_params = list(itertools.product(config["temperatures"], config["top_ps"]))
+    variants = len(generation_params)
+
+    # Fixed prompt scaffolding, measured once
+    rag_prompt_tokens = count_tokens(render_rag_prompt("", [] if file_paths else None))
+    judge_base_tokens = _template_tokens(JUDGE_PROMPT_TEMPLATE, EvaluationScore, question="", context="", answer="")
+    batch_base_tokens = _template_tokens(
+        BATCH_JUDGE_PROMPT_TEMPLATE, BatchEvaluationScore, answer_count=batch_size, question="", context="", answers=""
+    )
+    question_tokens = [count_tokens(q["question"]) for q in questions]
+    judge_limit = judge_token_limit(judge_model)
+
+    streaming = bool(config.get("streaming_ingestion")) and documents is None
+    document_cache = get_document_cache(config) if file_paths else None
+    if file_paths and documents is None and not streaming:
+        documents = load_documents(file_paths, cache=document_cache)
+
+    # Expected context tokens for each index and Top-K
+    indexes = []
+    if file_paths:
+        configs = [
+            (chunk_size, chunk_overlap)
+            for chunk_size, chunk_overlap in itertools.product(config["chunk_sizes"], config["chunk_overlaps"])
+            if chunk_overlap < chunk_size
+        ]
+        # One pass over the documents (or the page stream) counts every config's chunks
+        counts = {c: [0, 0] for c in configs}
+        source = iter_documents(file_paths, cache=document_cache) if streaming else documents
+        for document_chunks in MultiConfigSplitter(source, configs).iter_split():
+            for c, chunks in document_chunks.items():
+                counts[c][0] += len(chunks)
+                counts[c][1] += sum(count_tokens(chunk.page_content) for chunk in chunks)
+        for chunk_size, chunk_overlap in configs:
+            chunk_count, total_tokens = counts[(chunk_size, chunk_overlap)]
+            mean_chunk = total_tokens / chunk_count if chunk_count else 0.0
+            indexes.append({
+                "chunk_size": chunk_size,
+                "chunk_overlap": chunk_overlap,
+                "chunks": chunk_count,
+                "mean_chunk_tokens": round(mean_chunk, 1),
+                "context_tokens": {k: int(mean_chunk * min(k, chunk_count)) for k in config["k_retrievals"]}
+            })
+    else:
+        indexes.append({"chunk_size": None, "chunk_overlap": None, "chunks": 0, "mean_chunk_tokens": 0.0, "context_tokens": {0: 0}})
+
+    gen = {"requests": 0, "input_tokens": 0, "output_tokens": 0}
+    judge = {"requests": 0, "input_tokens": 0, "output_tokens": 0}
+    for index in indexes:
+        for k, context_tokens in index["context_tokens"].items():
+            for q_tokens in question_tokens:
+                gen["requests"] += variants
+                gen["input_tokens"] += variants * (rag_prompt_tokens + q_tokens + context_tokens)
+                gen["output_tokens"] += variants * answer_tokens
+
+                # Variants of one (question, Top-K) share a context, so batching packs them together
+                if batch_size > 1 and variants > 1:
+                    # Each batch is packed into calls that fit the judge's limit, as in the engine
+                    split_base = q_tokens + context_tokens + JUDGE_PROMPT_OVERHEAD_TOKENS
+                    for start in range(0, variants, batch_size):
+                        items = [answer_tokens + judge_output_tokens] * min(batch_size, variants - start)
+                        for call in split_for_token_limit(split_base, items, judge_limit):
+                            n = len(call)
+                            base = judge_base_tokens if n == 1 else batch_base_tokens
+                            judge["requests"] += 1
+                            judge["input_tokens"] += base + q_tokens + context_tokens + n * answer_tokens
+                            judge["output_tokens"] += n * judge_output_tokens
+                else:
+                    judge["requests"] += variants
+                    judge["input_tokens"] += variants * (judge_base_tokens + q_tokens + context_tokens + answer_tokens)
+                    judge["output_tokens"] += variants * judge_output_tokens
+
+    gen_config = get_retry_config(model_name)
+    judge_config = get_retry_config(judge_model)
+    gen_time = _stage_time(gen_config, gen["requests"], gen["input_tokens"] + gen["output_tokens"], gen_latency, gen_workers)
+    judge_time = _stage_time(judge_config, judge["requests"], judge["input_tokens"] + judge["output_tokens"], judge_latency, judge_workers)
+    wall_time = max(gen_time, judge_time) if pipelined else gen_time + judge_time
+    if get_provider_name(model_name) == get_provider_name(judge_model):
+        # Both stages draw on one shared rate limit
+        gen_tokens = gen["input_tokens"] + gen["output_tokens"]
+        judge_tokens = judge["input_tokens"] + judge["output_tokens"]
+        shared_time = _stage_time(gen_config, gen["requests"] + judge["requests"], gen_tokens + judge_tokens, 0.0, 1)
+        wall_time = max(wall_time, shared_time)
+
+    providers = {}
+    for stage, model, totals in [("generation", model_name, gen), ("judging", judge_model, judge)]:
+        provider = providers.setdefault(get_provider_name(model), {"requests": 0, "input_tokens": 0, "output_tokens": 0})
+        for key, value in totals.items():
+            provider[key] += value
+
+    return {
+        "cells": gen["requests"],
+        "indexes": indexes,
+        "generation": dict(gen, model=model_name, latency_s=round(gen_latency, 3), time_s=round(gen_time, 1)),
+        "judging": dict(judge, model=judge_model, latency_s=round(judge_latency, 3), time_s=round(judge_time, 1)),
+        "providers": providers,
+        "requests": gen["requests"] + judge["requests"],
+        "tokens": gen["input_tokens"] + gen["output_tokens"] + judge["input_tokens"] + judge["output_tokens"],
+        "wall_time_s": round(wall_time, 1),
+        "latency_source": "history" if model_name in history.get("generation", {}) else "default"
+    }
+
+
+def check_budget(estimate: Dict[str, Any], config: Dict[str, Any]) -> Optional[str]:
+    """
+    Returns why the run exceeds config["token_budget"] / config["request_budget"], or
+    None if it fits (unset or 0 budgets are unlimited).
+    """
+    token_budget = config.get("token_budget") or 0
+    request_budget = config.get("request_budget") or 0
+    if token_budget and estimate["tokens"] > token_budget:
+        return f"Estimated {estimate['tokens']:,} tokens exceeds the token budget of {token_budget:,}."
+    if request_budget and estimate["requests"] > request_budget:
+        return f"Estimated {estimate['requests']:,} requests exceeds the request budget of {request_budget:,}."
+    return None
+
+
+def format_duration(seconds: float) -> str:
+    if seconds < 90:
+        return f"{seconds:.0f}s"
+    if seconds < 90 * 60:
+        return f"{seconds / 60:.1f} min"
+    return f"{seconds / 3600:.1f} h"
@@ -1,5 +1,4 @@
 import itertools
-import streamlit as st
 import pandas as pd
 import concurrent.futures
 import time
@@ -8,13 +7,32 @@ import os
 from typing import List, Dict, Any
 from openai import RateLimitError, InternalServerError
 import tenacity
-from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
+from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type, retry_if_exception
 
-from src.utils.ingestion import load_document, split_documents
-from src.utils.vectorstore import create_vectorstore
-from src.utils.llm_manager import get_llm, ensure_ollama_reachable, unload_ollama_model
-from src.utils.rag_chain import get_rag_chain
-from src.utils.judge import get_judge_chain
+from src.utils.ingestion import (
+    load_documents, iter_documents, iter_chunks, get_document_cache, MultiConfigSplitter, DocumentLoadError,
+    MAX_HELD_CHUNK_SETS
+)
+from src.utils.memory import check_memory, peak_rss_mb
+from src.utils.index_store import get_index_store, corpus_key, index_key
+from src.utils.vectorstore import (
+    create_vectorstore, create_vectorstore_streaming, get_embedding_cache, retrieve_for_k_values, embed_queries,
+    current_embedding_model, load_vectorstore, citation_matches, needs_query_embedding, is_compressed,
+    EMBEDDING_BATCH_SIZE, EMBEDDING_CONCURRENCY, RERANK_FACTOR
+)
+from src.utils.llm_manager import get_llm, ensure_ollama_reachable
+from src.utils.rag_chain import get_rag_chain, get_context_rag_chain, load_system_prompt, generation_cache_key
+from src.utils.judge import (
+    get_judge_chain, get_batch_judge_chain, judge_cache_key, format_answers, parse_score, parse_batch_scores,
+    BATCH_JUDGE_PROMPT_VERSION
+)
+from src.utils.cache import DiskCache
+from src.utils.run_log import RunLog, cell_key, corpus_fingerprint, run_settings
+from src.utils.reporting import Reporter, PlaceholderReporter
+from src.utils.rate_limiter import get_rate_limiter, is_rate_limit_error
+from src.utils.tokens import count_tokens
+from src.utils.tracing import Tracer
+from src.utils.residency import ModelResidency, same_local_model, stage_keep_alive
 
 # Load Model Config
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), "../../config/model_config.json")
@@ -25,44 +43,99 @@ try:
 except FileNotFoundError:
     print(f"Warning: Config file not found at {CONFIG_PATH}. Using defaults (no retry).")
 
-def get_retry_config(model_name: str) -> Dict[str, Any]:
-    """Gets retry config for a model, falling back to default."""
+# Token reservation for a response, since output length isn't known before the call
+ESTIMATED_OUTPUT_TOKENS = 512
+# Judge template + format instructions, on top of question/answer/context
+JUDGE_PROMPT_OVERHEAD_TOKENS = 400
+# Reserved output per answer in a batched judge call (scores + a short explanation)
+JUDGE_OUTPUT_TOKENS_PER_ANSWER = 200
+# Used when the provider config has no context_window
+DEFAULT_CONTEXT_WINDOW = 8192
+# Default on-disk budget for cached judge verdicts
+JUDGE_CACHE_MAX_MB = 100
+# Generation cache defaults
+GENERATION_CACHE_MAX_MB = 200
+GENERATION_CACHE_TTL_HOURS = 24 * 7
+# "low_temperature" policy only caches at or below this temperature
+LOW_TEMPERATURE_THRESHOLD = 0.2
+
+def get_provider_name(model_name: str) -> str:
+    """Maps a UI model name to its provider key in the model config."""
     for provider in ["Ollama", "Groq", "GitHub", "Gemini"]:
         if provider in model_name:
-            return MODEL_CONFIG.get(provider, MODEL_CONFIG.get("default", {"enable_retry": False}))
-    return MODEL_CONFIG.get("default", {"enable_retry": False})
+            return provider
+    return "default"
+
+def get_retry_config(model_name: str) -> Dict[str, Any]:
+    """Gets retry config for a model, falling back to default."""
+    provider = get_provider_name(model_name)
+    return MODEL_CONFIG.get(provider, MODEL_CONFIG.get("default", {"enable_retry": False}))
 
 def create_retryer(config: Dict[str, Any]):
     """Creates a tenacity Retrying object from config, or None if disabled."""
     if not config.get("enable_retry", False):
         return None
     return tenacity.Retrying(
-        retry=retry_if_exception_type((RateLimitError, InternalServerError)),
+        retry=retry_if_exception_type((RateLimitError, InternalServerError)) | retry_if_exception(is_rate_limit_error),
         wait=wait_exponential(multiplier=2, min=config.get("wait_min", 4), max=config.get("wait_max", 60)),
         stop=stop_after_attempt(config.get("max_attempts", 5)),
         reraise=True
     )
 
+def _invoke_with_limits(chain, payload: Dict[str, Any], model_name: str, estimated_tokens: int = 0, span=None):
+    """
+    Invokes a chain behind the provider's shared rate limiter and retry policy.
+    A rate-limit error pauses every worker sharing the provider, not just this one.
+    If a trace span is given, retries and time spent waiting on the limiter are recorded on it.
+    """
+    retry_config = get_retry_config(model_name)
+    retryer = create_retryer(retry_config)
+    limiter = get_rate_limiter(get_provider_name(model_name), retry_config)
+    attempts = 0
+    waited = 0.0
+    
+    def call():
+        nonlocal attempts, waited
+        attempts += 1
+        waited += limiter.acquire(estimated_tokens) or 0.0
+        try:
+            return chain.invoke(payload)
+        except Exception as e:
+            limiter.observe_error(e)
+            raise
+    
+    try:
+        if retryer:
+            for attempt in retryer:
+                with attempt:
+                    response = call()
+            return response
+        return call()
+    finally:
+        if span is not None:
+            span.set(retries=max(attempts - 1, 0), rate_limit_wait=waited)
+
+
 def _run_generation(
-    rag_chain, question: str, model_name: str
+    rag_chain, question: str, model_name: str, estimated_tokens: int = 0, context_docs: List[Any] = None,
+    span=None
 ) -> Dict[str, Any]:
-    """Runs the generation phase only. Returns answer and context."""
+    """
+    Runs the generation phase only. Returns answer and context.
+    If context_docs is given, it is passed to a context-fed chain instead of retrieving.
+    """
     try:
-        gen_retry_config = get_retry_config(model_name)
-        gen_retryer = create_retryer(gen_retry_config)
+        payload = {"input": question}
+        if context_docs is not None:
+            payload["context"] = context_docs
         
         start_rag = time.time()
-        response = None
-        if gen_retryer:
-            for attempt in gen_retryer:
-                with attempt:
-                    response = rag_chain.invoke({"input": question})
-        else:
-            response = rag_chain.invoke({"input": question})
-                    
+        response = _invoke_with_limits(rag_chain, payload, model_name, estimated_tokens, span=span)
         rag_time = time.time() - start_rag
         
         answer = response["answer"]
+        if span is not None:
+            span.set(output_tokens=count_tokens(answer))
         context_text = "\n\n".join([doc.page_content for doc in response["context"]])
         
         return {
@@ -76,54 +149,460 @@ def _run_generation(
 
 
 def _run_judging(
-    judge_chain, question: str, answer: str, context: str, judge_model: str
+    judge_chain, question: str, answer: str, context: str, judge_model: str, cache: DiskCache = None,
+    span=None
 ) -> Dict[str, Any]:
-    """Runs the judging phase only. Returns scores."""
+    """
+    Runs the judging phase only. Returns scores.
+    If a cache is given, a stored verdict for the same content/judge/prompt is returned without calling the LLM.
+    """
     try:
-        eval_input = {"question": question, "answer": answer, "context": context}
+        cache_key = None
+        if cache is not None:
+            cache_key = judge_cache_key(question, answer, context, judge_model)
+            cached_score = cache.get(cache_key)
+            if isinstance(cached_score, dict):
+                return {
+                    "successful": True,
+                    "score": cached_score,
+                    "latency_judge": 0.0,
+                    "cached": True
+                }
         
-        judge_retry_config = get_retry_config(judge_model)
-        judge_retryer = create_retryer(judge_retry_config)
+        eval_input = {"question": question, "answer": answer, "context": context}
+        input_tokens = (
+            count_tokens(question) + count_tokens(answer) + count_tokens(context) + JUDGE_PROMPT_OVERHEAD_TOKENS
+        )
+        if span is not None:
+            span.set(input_tokens=input_tokens)
         
         start_judge = time.time()
-        score = None
-        if judge_retryer:
-            for attempt in judge_retryer:
-                with attempt:
-                    score = judge_chain.invoke(eval_input)
-        else:
-            score = judge_chain.invoke(eval_input)
-                    
+        score = _invoke_with_limits(judge_chain, eval_input, judge_model, input_tokens + ESTIMATED_OUTPUT_TOKENS, span=span)
         judge_time = time.time() - start_judge
+        if span is not None:
+            span.set(output_tokens=count_tokens(json.dumps(score)))
+        # A verdict that is not a score object fails this cell only, and is never cached
+        score = parse_score(score)
+        
+        if cache is not None:
+            cache.set(cache_key, score)
         
         return {
             "successful": True,
             "score": score,
-            "latency_judge": judge_time
+            "latency_judge": judge_time,
+            "cached": False
         }
     except Exception as e:
         return {"successful": False, "error": str(e)}
 
 
+def judge_token_limit(judge_model: str) -> int:
+    """
+    Largest judge request, in tokens, that the provider can take: its context window,
+    or its per-minute token budget if that is smaller (a bigger request can never be admitted).
+    """
+    provider_config = get_retry_config(judge_model)
+    limit = provider_config.get("context_window") or DEFAULT_CONTEXT_WINDOW
+    if provider_config.get("tokens_per_minute"):
+        limit = min(limit, provider_config["tokens_per_minute"])
+    return limit
+
+
+def split_for_token_limit(base_tokens: int, item_tokens: List[int], limit: int) -> List[List[int]]:
+    """Greedily packs item indices into batches whose base + item tokens stay within limit. Never returns an empty batch."""
+    batches = []
+    current = []
+    current_tokens = base_tokens
+    for i, tokens in enumerate(item_tokens):
+        if current and current_tokens + tokens > limit:
+            batches.append(current)
+            current = []
+            current_tokens = base_tokens
+        current.append(i)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def _run_batch_judging(
+    batch_chain, judge_chain, question: str, context: str, answers: List[str], judge_model: str,
+    cache: DiskCache = None, tracer: Tracer = None
+) -> List[Dict[str, Any]]:
+    """
+    Judges several answers to the same question and context, packing as many as fit
+    in the judge's context window into each call. A call whose response cannot be
+    parsed into one verdict per answer falls back to judging those answers one by one.
+    Returns one result per answer, in order, each shaped like _run_judging's.
+    """
+    tracer = tracer or Tracer()
+    results = [None] * len(answers)
+    
+    cache_keys = [None] * len(answers)
+    if cache is not None:
+        for i, answer in enumerate(answers):
+            cache_keys[i] = judge_cache_key(question, answer, context, judge_model, BATCH_JUDGE_PROMPT_VERSION)
+            cached_score = cache.get(cache_keys[i])
+            if cached_score is not None:
+                results[i] = {"successful": True, "score": cached_score, "latency_judge": 0.0, "cached": True}
+    
+    pending = [i for i in range(len(answers)) if results[i] is None]
+    base_tokens = count_tokens(question) + count_tokens(context) + JUDGE_PROMPT_OVERHEAD_TOKENS
+    answer_tokens = [count_tokens(answers[i]) + JUDGE_OUTPUT_TOKENS_PER_ANSWER for i in pending]
+    
+    for batch in split_for_token_limit(base_tokens, answer_tokens, judge_token_limit(judge_model)):
+        indices = [pending[j] for j in batch]
+        
+        if len(indices) > 1:
+            batch_input = {
+                "question": question,
+                "context": context,
+                "answers": format_answers([answers[i] for i in indices]),
+                "answer_count": len(indices)
+            }
+            estimated_tokens = base_tokens + sum(answer_tokens[j] for j in batch)
+            try:
+                with tracer.span("judging_batch", model=judge_model, batch_size=len(indices)) as span:
+                    span.set(input_tokens=estimated_tokens - JUDGE_OUTPUT_TOKENS_PER_ANSWER * len(indices))
+                    start_judge = time.time()
+                    output = _invoke_with_limits(batch_chain, batch_input, judge_model, estimated_tokens, span=span)
+                    span.set(output_tokens=count_tokens(json.dumps(output)))
+                    scores = parse_batch_scores(output, len(indices))
+                # The call is shared, so each verdict is charged an equal share of its latency
+                judge_time = (time.time() - start_judge) / len(indices)
+                for i, score in zip(indices, scores):
+                    if cache is not None:
+                        cache.set(cache_keys[i], score)
+                    results[i] = {"successful": True, "score": score, "latency_judge": judge_time, "cached": False}
+                continue
+            except Exception as e:
+                print(f"Warning: batched judging of {len(indices)} answers failed ({e}); judging them one by one.")
+        
+        for i in indices:
+            with tracer.span("judging", model=judge_model) as span:
+                results[i] = _run_judging(judge_chain, question, answers[i], context, judge_model, cache=cache, span=span)
+                span.set(cached=results[i].get("cached", False))
+    
+    return results
+
+
+def _group_for_judging(tasks: List[Dict[str, Any]], indices: List[int], batch_size: int) -> List[List[int]]:
+    """
+    Groups task indices whose answers share a question and retrieved context (same
+    question and Top-K within one index) into batches of at most batch_size.
+    Tasks from different (chunk_size, chunk_overlap) indexes are never grouped.
+    """
+    groups = {}
+    for i in indices:
+        groups.setdefault(_judge_group_key(tasks[i]), []).append(i)
+    return [
+        group[start:start + batch_size]
+        for group in groups.values()
+        for start in range(0, len(group), batch_size)
+    ]
+
+
+def _judge_group_key(task: Dict[str, Any]):
+    # Everything that decides a task's retrieved context: its index (tasks from every
+    # index are pooled into one run), question and Top-K
+    return (task["chunk_size"], task["chunk_overlap"], task["question"], task["k"])
+
+
+def _estimate_prompt_tokens(question: str, task: Dict[str, Any]) -> int:
+    """Counts prompt tokens for one generation: system prompt, question and retrieved context."""
+    context_tokens = 0
+    if task.get("context_docs"):
+        context_tokens = count_tokens("\n\n".join(doc.page_content for doc in task["context_docs"]))
+    return _system_prompt_tokens() + count_tokens(question) + context_tokens
+
+
+_SYSTEM_PROMPT_TOKENS = None
+
+def _system_prompt_tokens() -> int:
+    global _SYSTEM_PROMPT_TOKENS
+    if _SYSTEM_PROMPT_TOKENS is None:
+        _SYSTEM_PROMPT_TOKENS = count_tokens(load_system_prompt())
+    return _SYSTEM_PROMPT_TOKENS
+
+
+def _run_concurrently(fn, items: List[Any], max_workers: int, on_complete=None) -> List[Any]:
+    """
+    Runs fn over items with at most max_workers threads.
+    Results are returned in input order regardless of completion order.
+    on_complete(done_count, index, result) is called from the calling thread
+    so it is safe to update Streamlit placeholders from it.
+    """
+    results = [None] * len(items)
+    
+    if max_workers <= 1 or len(items) <= 1:
+        for i, item in enumerate(items):
+            results[i] = fn(item)
+            if on_complete:
+                on_complete(i + 1, i, results[i])
+        return results
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(fn, item): i for i, item in enumerate(items)}
+        for done_count, future in enumerate(concurrent.futures.as_completed(futures), start=1):
+            i = futures[future]
+            results[i] = future.result()
+            if on_complete:
+                on_complete(done_count, i, results[i])
+    
+    return results
+
+
+def _run_pipelined(
+    items: List[Any], generate_fn, judge_fn, gen_workers: int, judge_workers: int,
+    on_generated=None, on_judged=None, group_fn=None, batch_size: int = 1
+):
+    """
+    Streams items through two bounded worker pools: each successful generation is
+    handed to the judge pool as soon as it finishes, so neither provider sits idle.
+    Returns (generation_results, judge_results) in input order; judge_results[i]
+    is None when generation i failed. Callbacks run on the calling thread.
+    
+    If group_fn is given, judge_fn takes a list of generation results and returns a
+    list of judge results. Successful generations are held per group_fn(item) and
+    handed over once batch_size of them are ready or the whole group has generated.
+    """
+    generation_results = [None] * len(items)
+    judge_results = [None] * len(items)
+    gen_done = 0
+    judge_done = 0
+    
+    # Generations still outstanding, and successful ones waiting for a batch, per group
+    outstanding = {}
+    ready = {}
+    if group_fn is not None:
+        for item in items:
+            key = group_fn(item)
+            outstanding[key] = outstanding.get(key, 0) + 1
+    
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(gen_workers, 1)) as gen_pool, \
+         concurrent.futures.ThreadPoolExecutor(max_workers=max(judge_workers, 1)) as judge_pool:
+        pending = {gen_pool.submit(generate_fn, item): ("generate", i) for i, item in enumerate(items)}
+        
+        while pending:
+            done, _ = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+            for future in done:
+                stage, i = pending.pop(future)
+                result = future.result()
+                
+                if stage == "generate":
+                    generation_results[i] = result
+                    gen_done += 1
+                    if group_fn is None:
+                        if result["successful"]:
+                            pending[judge_pool.submit(judge_fn, result)] = ("judge", i)
+                    else:
+                        key = group_fn(items[i])
+                        outstanding[key] -= 1
+                        batch = ready.setdefault(key, [])
+                        if result["successful"]:
+                            batch.append(i)
+                        if batch and (len(batch) >= batch_size or outstanding[key] == 0):
+                            ready[key] = []
+                            future_batch = judge_pool.submit(judge_fn, [generation_results[j] for j in batch])
+                            pending[future_batch] = ("judge_batch", batch)
+                    if on_generated:
+                        on_generated(gen_done, i, result)
+                elif stage == "judge_batch":
+                    for j, judge_result in zip(i, result):
+                        judge_results[j] = judge_result
+                        judge_done += 1
+                        if on_judged:
+                            on_judged(judge_done, j, judge_result)
+                else:
+                    judge_results[i] = result
+                    judge_done += 1
+                    if on_judged:
+                        on_judged(judge_done, i, result)
+    
+    return generation_results, judge_results
+
+
+def resolve_execution_mode(config: Dict[str, Any]) -> str:
+    """
+    Returns "pipelined" or "phased". Defaults to phased (unload between stages)
+    when an Ollama model is involved, since both models may not fit in memory,
+    unless generator and judge are the same Ollama model and nothing needs unloading.
+    """
+    mode = config.get("execution_mode")
+    if mode in ("pipelined", "phased"):
+        return mode
+    if same_local_model(config["model_name"], config["judge_model"]):
+        return "pipelined"
+    if "Ollama" in config["model_name"] or "Ollama" in config["judge_model"]:
+        return "phased"
+    return "pipelined"
+
+
+def _should_cache_generation(policy: str, temperature: float) -> bool:
+    """Applies the generation cache policy: "always", "low_temperature" or "never"."""
+    if policy == "always":
+        return True
+    if policy == "low_temperature":
+        return temperature <= LOW_TEMPERATURE_THRESHOLD
+    return False
+
+
+def _generate_for_task(
+    task: Dict[str, Any], model_name: str, cache: DiskCache = None, cache_policy: str = "never", span=None
+) -> Dict[str, Any]:
+    """Builds the LLM and RAG chain for a task and runs generation. Never raises."""
+    question = task["question"]
+    try:
+        cache_key = None
+        if cache is not None and _should_cache_generation(cache_policy, task["temperature"]):
+            cache_key = generation_cache_key(
+                model_name, task["temperature"], task["top_p"], question, task["context_docs"]
+            )
+            cached_answer = cache.get(cache_key)
+            if cached_answer is not None:
+                return {
+                    "successful": True,
+                    "answer": cached_answer,
+                    "context": "\n\n".join(doc.page_content for doc in task["context_docs"] or []),
+                    "latency_rag": 0.0,
+                    "cached": True,
+                    "task": task
+                }
+        
+        # Create LLM with this task's temperature/top_p
+        llm = get_llm(model_name, task["temperature"], task["top_p"], keep_alive=stage_keep_alive(model_name))
+        prompt_tokens = _estimate_prompt_tokens(question, task)
+        estimated_tokens = prompt_tokens + ESTIMATED_OUTPUT_TOKENS
+        if span is not None:
+            span.set(input_tokens=prompt_tokens)
+        if task["context_docs"] is None:
+            # No documents: plain LLM chain
+            rag_chain = get_rag_chain(llm, None)
+            gen_result = _run_generation(rag_chain, question, model_name, estimated_tokens, span=span)
+        else:
+            rag_chain = get_context_rag_chain(llm)
+            gen_result = _run_generation(
+                rag_chain, question, model_name, estimated_tokens, task["context_docs"], span=span
+            )
+        
+        gen_result["cached"] = False
+        if cache_key is not None and gen_result["successful"]:
+            cache.set(cache_key, gen_result["answer"])
+    except Exception as e:
+        gen_result = {"successful": False, "error": str(e)}
+    
+    gen_result["task"] = task
+    return gen_result
+
+
+def _build_result_row(
+    gen_result: Dict[str, Any], judge_result: Dict[str, Any], model_name: str, judge_model: str
+) -> Dict[str, Any]:
+    """Flattens a generation and its judgement into one results-table row."""
+    task = gen_result["task"]
+    score = judge_result["score"]
+    return {
+        "Question": task["question"],
+        "Reference": task.get("reference"),
+        "Answer": gen_result["answer"],
+        "Top-K": task["k"],
+        "Model": model_name,
+        "Judge": judge_model,
+        "Accuracy": score.get("accuracy"),
+        "Faithfulness": score.get("faithfulness"),
+        "Relevance": score.get("relevance"),
+        "Explanation": score.get("explanation"),
+        "Chunk Size": task["chunk_size"],
+        "Overlap": task["chunk_overlap"],
+        "Temperature": task["temperature"],
+        "Top P": task["top_p"],
+        "latency_rag": gen_result["latency_rag"],
+        "latency_judge": judge_result["latency_judge"],
+        "generation_cached": gen_result.get("cached", False),
+        "judge_cached": judge_result.get("cached", False)
+    }
+
+
 def run_batch_experiment(
     file_paths: List[str],
     config: Dict[str, Any],
     question: str,
     progress_bar: Any = None,
-    status_placeholder: Any = None
+    status_placeholder: Any = None,
+    questions: List[Dict[str, Any]] = None,
+    reporter: Reporter = None,
+    vectorstores: Dict[Any, Any] = None,
+    tracer: Tracer = None,
+    documents: List[Any] = None
 ) -> List[Dict[str, Any]]:
     """
     Runs a batch of experiments based on the configuration grid.
+    
+    If `questions` is given (dataset mode: [{"question": ..., "reference": ...}, ...]),
+    the whole grid runs over every question and `question` is ignored. Each
+    (chunk_size, chunk_overlap) index is still built exactly once.
+    
+    If config["run_id"] is set, every completed cell is appended to that run's log;
+    with config["resume"] the cells already in the log are skipped and their stored
+    rows returned in place. Cells are keyed by their grid values and the run's
+    result-affecting settings (run_log.run_settings), so a resume with a different
+    index type, vector storage, citation lookup or judge batch size recomputes them.
+    
+    Progress and errors go to `reporter`; if none is given, progress_bar and
+    status_placeholder are wrapped so the engine itself never imports a UI library.
+    
+    config["cell_filter"] optionally restricts the grid to specific
+    (chunk_size, chunk_overlap, k, temperature, top_p) tuples. `vectorstores` is an
+    optional dict of built indexes keyed by (chunk_size, chunk_overlap); new indexes
+    are added to it, so callers running several batches build each index once.
+    Without it each index is released as soon as its retrieval is done.
+    
+    Every stage (loading, splitting, indexing, retrieval, generation, judging) is
+    recorded as a span on `tracer`; pass one in to read the trace afterwards.
+    
+    `documents` optionally holds the already-loaded contents of file_paths (e.g. from
+    the pre-flight estimate) so they are not parsed again.
+    
+    With config["streaming_ingestion"] (and no `documents`) each index is built from
+    a stream: pages are read lazily, split as they arrive and embedded
+    config["embedding_batch_size"] chunks at a time, so no corpus-wide list of pages
+    or chunks is ever held. config["memory_limit_mb"] stops ingestion of an index
+    once resident memory goes over it. Peak RSS is reported after ingestion.
+    Otherwise one pass over the loaded documents splits them for up to
+    config["max_held_chunk_sets"] of the indexes still to build (see MultiConfigSplitter).
+    
+    Either way chunks are embedded config["embedding_batch_size"] at a time with up
+    to config["embedding_concurrency"] batches in flight, and the embedding
+    throughput of each index is reported.
+    
+    config["index_type"] picks the FAISS backend ("auto", "flat", "ivf", "hnsw",
+    "ivfpq"; see vectorstore.build_index) and config["index_params"] tunes it.
+    config["vector_storage"] ("float32", "fp16", "int8", "pq") keeps compressed
+    vectors in the index and re-ranks config["rerank_factor"] * k candidates per
+    search against the exact vectors on disk; the memory saved is reported.
+    
+    With config["citation_lookup"] (default on) each index also maps the RCW/WAC/SMC
+    citations in its chunks and file names to chunk ids. Chunks citing a question's
+    citations verbatim are retrieved first, and questions they fully answer are
+    neither embedded nor searched.
     """
+    if reporter is None:
+        reporter = PlaceholderReporter(progress_bar, status_placeholder)
+    if tracer is None:
+        tracer = Tracer()
     
     # Check Ollama Health if needed
     if "Ollama" in config["model_name"] or "Ollama" in config["judge_model"]:
         if not ensure_ollama_reachable():
-            st.error("Could not reach or start Ollama service. Please make sure Ollama is installed and running.")
+            reporter.error("Could not reach or start Ollama service. Please make sure Ollama is installed and running.")
             return []
     
     results = []
     
+    if not questions:
+        questions = [{"question": question}]
+    
     # 1. Define Grid
     if file_paths:
         ingestion_params = list(itertools.product(config["chunk_sizes"], config["chunk_overlaps"]))
@@ -135,157 +614,538 @@ def run_batch_experiment(
         
     generation_params = list(itertools.product(config["temperatures"], config["top_ps"]))
     
+    cell_filter = None
+    if config.get("cell_filter") is not None:
+        cell_filter = {tuple(c) for c in config["cell_filter"]}
+    
     # Calculate total steps for progress bar
-    total_steps = len(ingestion_params) * len(retrieval_params) * len(generation_params)
+    if cell_filter is not None:
+        total_steps = max(len(cell_filter) * len(questions), 1)
+    else:
+        total_steps = len(ingestion_params) * len(retrieval_params) * len(generation_params) * len(questions)
     current_step = 0
     
-    # Pre-load all documents
-    raw_docs = []
-    if file_paths:
-        for f_path in file_paths:
-            try:
-                raw_docs.extend(load_document(f_path))
-            except Exception as e:
-                 st.error(f"Failed to load file {f_path}: {e}")
-                 return []
-        
-        if not raw_docs:
-            st.error("No documents loaded.")
-            return []
-
-    # Get concurrency limit
-    max_workers = config.get("max_concurrency", 1)
+    def advance(steps):
+        # Every completed, skipped or failed cell moves the progress bar as it happens
+        nonlocal current_step
+        current_step += steps
+        reporter.progress(current_step / total_steps)
+    
+    # Indexes outlive their retrieval only for callers that asked to keep them
+    keep_indexes = vectorstores is not None
+    if vectorstores is None:
+        vectorstores = {}
+    
+    # Documents are loaded on first use, so runs that only reuse built (or fully resumed) indexes skip parsing
+    raw_docs = documents
+    # Splits raw_docs for every index still to build in one pass, on first use
+    splitter = None
+    document_cache = get_document_cache(config) if file_paths else None
+    # Chunk vectors persist across runs; only chunks never embedded before go to the model
+    embedding_cache = get_embedding_cache(config) if file_paths else None
+    # Built indexes persist across runs, keyed by corpus content, chunking and embedding model
+    index_store = get_index_store(config) if file_paths else None
+    stored_corpus_id = embedding_model = None
+    if index_store is not None:
+        try:
+            stored_corpus_id, embedding_model = corpus_key(file_paths), current_embedding_model()
+        except Exception as e:
+            print(f"Warning: index store disabled for this run ({e}).")
+            index_store = None
+    streaming = bool(config.get("streaming_ingestion")) and documents is None
+    memory_limit_mb = config.get("memory_limit_mb") or None
+    embedding_batch_size = max(int(config.get("embedding_batch_size", EMBEDDING_BATCH_SIZE)), 1)
+    embedding_concurrency = max(int(config.get("embedding_concurrency", EMBEDDING_CONCURRENCY)), 1)
+    index_type = config.get("index_type", "auto")
+    index_params = config.get("index_params")
+    vector_storage = config.get("vector_storage", "float32")
+    rerank_factor = int(config.get("rerank_factor", RERANK_FACTOR))
+    citation_lookup = bool(config.get("citation_lookup", True))
 
+    # Get concurrency limits (judge stage defaults to the generation limit)
+    gen_workers = config.get("max_concurrency", 1)
+    judge_workers = config.get("max_judge_concurrency", gen_workers)
+    execution_mode = resolve_execution_mode(config)
+    
+    model_name = config["model_name"]
+    judge_model = config["judge_model"]
+    
+    # Initialize judge LLM once, shared by all workers
+    judge_llm = get_llm(judge_model, temperature=0.1, keep_alive=stage_keep_alive(judge_model))
+    judge_chain = get_judge_chain(judge_llm)
+    
+    # Batched judging: answers sharing a question and context are scored together in one call
+    judge_batch_size = max(int(config.get("judge_batch_size", 1)), 1)
+    batch_judge_chain = get_batch_judge_chain(judge_llm) if judge_batch_size > 1 else None
+    
+    # Persistent verdict cache (opt-in; the sidebar enables it by default)
+    judge_cache = None
+    if config.get("use_judge_cache", False):
+        judge_cache = DiskCache(
+            "judge_verdicts",
+            max_bytes=int(config.get("judge_cache_max_mb", JUDGE_CACHE_MAX_MB) * 1024 * 1024),
+            cache_dir=config.get("cache_dir")
+        )
+    
+    # Persistent response cache (opt-in via policy; "never" disables it)
+    generation_cache_policy = config.get("generation_cache_policy", "never")
+    generation_cache = None
+    if generation_cache_policy != "never":
+        generation_cache = DiskCache(
+            "generations",
+            max_bytes=int(config.get("generation_cache_max_mb", GENERATION_CACHE_MAX_MB) * 1024 * 1024),
+            cache_dir=config.get("cache_dir"),
+            ttl_seconds=config.get("generation_cache_ttl_hours", GENERATION_CACHE_TTL_HOURS) * 3600
+        )
+    
+    def generate_one(task):
+        with tracer.span("generation", model=model_name, k=task["k"], temperature=task["temperature"]) as span:
+            gen_result = _generate_for_task(task, model_name, generation_cache, generation_cache_policy, span=span)
+            span.set(cached=gen_result.get("cached", False))
+            if not gen_result["successful"]:
+                span.set(error=gen_result.get("error"))
+        return gen_result
+    
+    # Checkpointing: append each completed cell to the run log; on resume, skip cells already done
+    run_log = None
+    completed_cells = {}
+    corpus_id = None
+    cell_settings = None
+    if config.get("run_id"):
+        run_log = RunLog(config["run_id"], runs_dir=config.get("runs_dir"))
+        corpus_id = corpus_fingerprint(file_paths)
+        retrieval = None
+        if file_paths:
+            retrieval = {
+                "index_type": index_type, "index_params": index_params or None,
+                "vector_storage": vector_storage, "citation_lookup": citation_lookup
+            }
+            if is_compressed(index_type, vector_storage):
+                # Only compressed indexes re-rank
+                retrieval["rerank_factor"] = rerank_factor
+        cell_settings = run_settings(config, retrieval)
+        if config.get("resume", False):
+            completed_cells = run_log.load()
+            print(f"Resuming run {run_log.run_id}: {len(completed_cells)} cell(s) already completed")
+    
+    # Local models are loaded once per run and unloaded only when another model needs the memory
+    residency = ModelResidency(run_log=run_log, tracer=tracer)
+    
+    # First error writing a checkpoint (e.g. a full disk). Checkpointing stops there, but
+    # rows are still collected; judge workers record it and the calling thread reports it
+    checkpoint_errors = []
+    checkpoint_error_reported = False
+    
+    def record_judgement(gen_result, judge_result):
+        if judge_result["successful"]:
+            judge_result["row"] = _build_result_row(gen_result, judge_result, model_name, judge_model)
+            if run_log is not None and not checkpoint_errors:
+                try:
+                    run_log.append(gen_result["task"]["cell_key"], judge_result["row"])
+                except Exception as e:
+                    checkpoint_errors.append(e)
+        return judge_result
+    
+    def report_checkpoint_error():
+        nonlocal checkpoint_error_reported
+        if checkpoint_errors and not checkpoint_error_reported:
+            checkpoint_error_reported = True
+            reporter.error(
+                f"Could not write to run log {run_log.run_id} ({checkpoint_errors[0]}); "
+                "the run continues, but cells completed from here on will not be resumable."
+            )
+    
+    def judge_one(gen_result):
+        with tracer.span("judging", model=judge_model, k=gen_result["task"]["k"]) as span:
+            judge_result = _run_judging(
+                judge_chain, gen_result["task"]["question"], gen_result["answer"], gen_result["context"],
+                judge_model, cache=judge_cache, span=span
+            )
+            span.set(cached=judge_result.get("cached", False))
+            if not judge_result["successful"]:
+                span.set(error=judge_result.get("error"))
+        return record_judgement(gen_result, judge_result)
+    
+    def judge_batch(gen_results):
+        # _judge_group_key should give every result in a batch the same question and
+        # context; results that still differ are judged in separate calls, never against another's context
+        by_context = {}
+        for i, g in enumerate(gen_results):
+            by_context.setdefault((g["task"]["question"], g["context"]), []).append(i)
+        if len(by_context) > 1:
+            print(f"Warning: a judge batch of {len(gen_results)} answers spans {len(by_context)} contexts; splitting it.")
+        judge_results = [None] * len(gen_results)
+        for (batch_question, context), indices in by_context.items():
+            group_results = _run_batch_judging(
+                batch_judge_chain, judge_chain, batch_question, context,
+                [gen_results[i]["answer"] for i in indices], judge_model, cache=judge_cache, tracer=tracer
+            )
+            for i, judge_result in zip(indices, group_results):
+                judge_results[i] = judge_result
+        return [record_judgement(g, j) for g, j in zip(gen_results, judge_results)]
+    
+    # Questions are embedded once per run and reused for every index (same embedding model)
+    query_embeddings = {}
+    
+    def report_index(span):
+        if span.attrs.get("chunks_per_s") is not None:
+            reporter.info(
+                f"Embedded {span.attrs.get('chunks', 0)} chunks in {span.attrs['embed_seconds']:.1f}s "
+                f"({span.attrs['chunks_per_s']:.1f} chunks/s)."
+            )
+        if span.attrs.get("vector_mb") is not None and span.attrs.get("float32_mb"):
+            reporter.info(
+                f"Vectors stored as {span.attrs['vector_storage']}: {span.attrs['vector_mb']:.1f} MB instead of "
+                f"{span.attrs['float32_mb']:.1f} MB ({1 - span.attrs['vector_mb'] / span.attrs['float32_mb']:.0%} saved)."
+            )
+    
+    def store_index(key, vectorstore, chunk_size, chunk_overlap):
+        # A failed save only costs a rebuild next run
+        if key is None:
+            return
+        try:
+            with tracer.span("save_index", chunk_size=chunk_size, chunk_overlap=chunk_overlap):
+                index_store.put(
+                    key, vectorstore, chunk_size=chunk_size, chunk_overlap=chunk_overlap,
+                    embedding_model=embedding_model, index_type=type(vectorstore.index).__name__,
+                    files=[os.path.basename(p) for p in file_paths]
+                )
+        except Exception as e:
+            print(f"Warning: could not save index (Size={chunk_size}, Overlap={chunk_overlap}): {e}")
+    
+    def stored_index_key(chunk_size, chunk_overlap):
+        if index_store is None:
+            return None
+        return index_key(
+            stored_corpus_id, chunk_size, chunk_overlap, embedding_model, index_type, index_params, vector_storage
+        )
+    
+    # --- Enumerate cells for each index, in deterministic order ---
+    index_cells = {}
     for chunk_size, chunk_overlap in ingestion_params:
+        cells = index_cells.setdefault((chunk_size, chunk_overlap), [])
+        for q_index, q in enumerate(questions):
+            for k in retrieval_params:
+                for temperature, top_p in generation_params:
+                    if cell_filter is not None and (chunk_size, chunk_overlap, k, temperature, top_p) not in cell_filter:
+                        continue
+                    key = None
+                    if run_log is not None:
+                        key = cell_key(
+                            corpus_id, model_name, judge_model, q["question"],
+                            chunk_size, chunk_overlap, k, temperature, top_p, cell_settings
+                        )
+                    cells.append((q_index, k, temperature, top_p, key))
+    
+    def needs_split(chunk_size, chunk_overlap):
+        # Only indexes that will actually be built from raw_docs: valid, with cells still
+        # to run, and neither built already nor in the index store
+        cells = index_cells[(chunk_size, chunk_overlap)]
+        if chunk_overlap >= chunk_size or all(key in completed_cells for *_, key in cells):
+            return False
+        if (chunk_size, chunk_overlap) in vectorstores:
+            return False
+        stored_key = stored_index_key(chunk_size, chunk_overlap)
+        return stored_key is None or not index_store.has(stored_key)
+    
+    # Every index is prepared (built, retrieved) before any LLM call; cells and their
+    # pending tasks accumulate in grid order across indexes
+    planned_cells = []
+    tasks = []
+
+    for position, (chunk_size, chunk_overlap) in enumerate(ingestion_params):
+        if splitter is not None:
+            # Chunk sets of earlier indexes whose build failed are never asked for
+            for passed in ingestion_params[:position]:
+                splitter.discard(*passed)
         
-        # --- Ingestion Phase (Per Chunk Config) ---
-        vectorstore = None
+        cells = index_cells[(chunk_size, chunk_overlap)]
+        if not cells:
+            continue
+        steps_per_index = len(cells)
+        
+        if file_paths and chunk_overlap >= chunk_size:
+            print(f"Skipping invalid config: Size={chunk_size}, Overlap={chunk_overlap}")
+            advance(steps_per_index)
+            continue
+        
+        # A resumed run that already completed every cell of this index skips ingestion entirely
+        if all(key in completed_cells for *_, key in cells):
+            planned_cells.extend(cells)
+            reporter.info(f"Skipping completed index (Size={chunk_size}, Overlap={chunk_overlap})...")
+            advance(steps_per_index)
+            continue
         
+        # --- Ingestion Phase (Per Chunk Config) ---
         if file_paths:
-            if chunk_overlap >= chunk_size:
-                print(f"Skipping invalid config: Size={chunk_size}, Overlap={chunk_overlap}")
-                current_step += len(retrieval_params) * len(generation_params)
-                if progress_bar:
-                    try:
-                        progress_bar.progress(min(current_step / total_steps, 1.0))
-                    except: pass
-                continue
+            vectorstore = vectorstores.get((chunk_size, chunk_overlap))
+            stored_key = stored_index_key(chunk_size, chunk_overlap)
             
-            try:
-                # Split
-                chunks = split_documents(raw_docs, chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-                
-                # Create VectorStore
-                vectorstore = create_vectorstore(chunks)
-                
-            except Exception as e:
-                st.error(f"Error during ingestion (Size={chunk_size}, Overlap={chunk_overlap}): {e}")
-                current_step += len(retrieval_params) * len(generation_params)
-                continue
+            if vectorstore is None and stored_key is not None:
+                with tracer.span("load_index", chunk_size=chunk_size, chunk_overlap=chunk_overlap) as span:
+                    vectorstore = load_vectorstore(index_store, stored_key, rerank_factor, citation_lookup)
+                    span.set(cached=vectorstore is not None)
+                if vectorstore is not None:
+                    reporter.info(f"Reusing stored index (Size={chunk_size}, Overlap={chunk_overlap})...")
+                    vectorstores[(chunk_size, chunk_overlap)] = vectorstore
             
-        # --- Build task list ---
-        tasks = []
-        for k in retrieval_params:
-            for temperature, top_p in generation_params:
-                tasks.append({
-                    "k": k,
-                    "temperature": temperature,
-                    "top_p": top_p,
-                    "chunk_size": chunk_size,
-                    "chunk_overlap": chunk_overlap,
-                    "vectorstore": vectorstore
-                })
-        
-        # === PHASE 1: ALL GENERATIONS ===
-        if status_placeholder:
-            status_placeholder.info(f"Phase 1/2: Running {len(tasks)} generation(s)...")
-        
-        # Initialize generator LLM once (use first task's params for initial, but we create chain per config)
-        model_name = config["model_name"]
-        generation_results = []
-        
-        for i, task in enumerate(tasks):
-            try:
-                # Create LLM with this task's temperature/top_p
-                llm = get_llm(model_name, task["temperature"], task["top_p"])
-                rag_chain = get_rag_chain(llm, task["vectorstore"], k=task["k"])
+            if vectorstore is None and streaming:
+                try:
+                    # Pages -> chunks -> embedding batches, never materialized as whole-corpus lists
+                    hits_before = embedding_cache.hits if embedding_cache is not None else 0
+                    with tracer.span("create_vectorstore", chunk_size=chunk_size, streaming=True) as span:
+                        chunk_stream = iter_chunks(
+                            iter_documents(file_paths, cache=document_cache), chunk_size=chunk_size, chunk_overlap=chunk_overlap
+                        )
+                        vectorstore, chunk_count = create_vectorstore_streaming(
+                            chunk_stream,
+                            batch_size=embedding_batch_size,
+                            memory_limit_mb=memory_limit_mb,
+                            embedding_cache=embedding_cache,
+                            max_workers=embedding_concurrency,
+                            index_type=index_type,
+                            index_params=index_params,
+                            storage=vector_storage,
+                            rerank_factor=rerank_factor,
+                            cache_dir=config.get("cache_dir"),
+                            citations=citation_lookup,
+                            span=span
+                        )
+                        span.set(chunks=chunk_count, peak_rss_mb=round(peak_rss_mb(), 1))
+                        if embedding_cache is not None:
+                            span.set(cache_hits=embedding_cache.hits - hits_before)
+                except DocumentLoadError as e:
+                    reporter.error(f"Failed to load file {e}")
+                    return results
+                except Exception as e:
+                    reporter.error(f"Error during ingestion (Size={chunk_size}, Overlap={chunk_overlap}): {e}")
+                    advance(steps_per_index)
+                    continue
                 
-                gen_result = _run_generation(rag_chain, question, model_name)
-                gen_result["task"] = task
-                generation_results.append(gen_result)
+                if vectorstore is None:
+                    reporter.error("No documents loaded.")
+                    return results
+                report_index(span)
+                vectorstores[(chunk_size, chunk_overlap)] = vectorstore
+                store_index(stored_key, vectorstore, chunk_size, chunk_overlap)
+            
+            elif vectorstore is None:
+                if raw_docs is None:
+                    try:
+                        with tracer.span("load_documents", files=len(file_paths)) as span:
+                            raw_docs = load_documents(file_paths, cache=document_cache)
+                            span.set(documents=len(raw_docs), peak_rss_mb=round(peak_rss_mb(), 1))
+                            if document_cache is not None:
+                                span.set(cache_hits=document_cache.hits)
+                        check_memory(memory_limit_mb, "Loading documents")
+                    except DocumentLoadError as e:
+                        reporter.error(f"Failed to load file {e}")
+                        return results
+                    except Exception as e:
+                        reporter.error(f"Failed to load documents: {e}")
+                        return results
+                    
+                    if not raw_docs:
+                        reporter.error("No documents loaded.")
+                        return results
                 
-                if status_placeholder:
-                    status_placeholder.info(f"Phase 1/2: Generated {i+1}/{len(tasks)}...")
+                try:
+                    # Split
+                    with tracer.span("split_documents", chunk_size=chunk_size, chunk_overlap=chunk_overlap) as span:
+                        if splitter is None:
+                            splitter = MultiConfigSplitter(
+                                raw_docs,
+                                [c for c in ingestion_params[position:] if needs_split(*c)],
+                                max_held=config.get("max_held_chunk_sets", MAX_HELD_CHUNK_SETS)
+                            )
+                        chunks = splitter.split(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
+                        span.set(chunks=len(chunks))
+                    check_memory(memory_limit_mb, "Splitting documents")
+                    
+                    # Create VectorStore
+                    hits_before = embedding_cache.hits if embedding_cache is not None else 0
+                    with tracer.span("create_vectorstore", chunk_size=chunk_size, chunks=len(chunks)) as span:
+                        vectorstore = create_vectorstore(
+                            chunks, embedding_cache=embedding_cache,
+                            batch_size=embedding_batch_size, max_workers=embedding_concurrency,
+                            index_type=index_type, index_params=index_params, storage=vector_storage,
+                            rerank_factor=rerank_factor, cache_dir=config.get("cache_dir"), citations=citation_lookup,
+                            span=span
+                        )
+                        if embedding_cache is not None:
+                            span.set(cache_hits=embedding_cache.hits - hits_before)
+                    report_index(span)
+                    vectorstores[(chunk_size, chunk_overlap)] = vectorstore
+                    store_index(stored_key, vectorstore, chunk_size, chunk_overlap)
                     
+                except Exception as e:
+                    reporter.error(f"Error during ingestion (Size={chunk_size}, Overlap={chunk_overlap}): {e}")
+                    advance(steps_per_index)
+                    continue
+            
+            # --- Retrieval Phase: one search per question per index, sliced for every Top-K ---
+            try:
+                # Questions answered entirely by citation matches on this index need no embedding
+                pending = [
+                    i for i, q in enumerate(questions)
+                    if i not in query_embeddings and needs_query_embedding(vectorstore, q["question"], max(retrieval_params))
+                ]
+                if pending:
+                    pending_questions = [questions[i]["question"] for i in pending]
+                    with tracer.span("embed_queries", questions=len(pending)) as span:
+                        query_embeddings.update(zip(pending, embed_queries(vectorstore, pending_questions)))
+                        span.set(input_tokens=sum(count_tokens(q) for q in pending_questions))
+                contexts = []
+                for i, q in enumerate(questions):
+                    with tracer.span("retrieval", chunk_size=chunk_size, k=max(retrieval_params)) as span:
+                        contexts.append(retrieve_for_k_values(
+                            vectorstore, q["question"], retrieval_params, query_embedding=query_embeddings.get(i)
+                        ))
+                        exact, related = citation_matches(vectorstore, q["question"])
+                        if exact or related:
+                            span.set(citation_hits=len(exact), citation_related=len(related))
             except Exception as e:
-                generation_results.append({"successful": False, "error": str(e), "task": task})
+                reporter.error(f"Error during retrieval (Size={chunk_size}, Overlap={chunk_overlap}): {e}")
+                advance(steps_per_index)
+                continue
+            finally:
+                # Tasks hold their retrieved chunks, so the index itself is no longer needed
+                if not keep_indexes:
+                    vectorstores.pop((chunk_size, chunk_overlap), None)
+                    vectorstore = None
+        else:
+            contexts = [{k: None for k in retrieval_params} for _ in questions]
+            
+        # --- Build task list (cells not already completed) ---
+        resumed = 0
+        for q_index, k, temperature, top_p, key in cells:
+            if key in completed_cells:
+                resumed += 1
+                continue
+            q = questions[q_index]
+            tasks.append({
+                "question": q["question"],
+                "reference": q.get("reference"),
+                "k": k,
+                "temperature": temperature,
+                "top_p": top_p,
+                "chunk_size": chunk_size,
+                "chunk_overlap": chunk_overlap,
+                "context_docs": contexts[q_index][k],
+                "cell_key": key
+            })
+        planned_cells.extend(cells)
+        if resumed:
+            advance(resumed)
+    
+    if file_paths:
+        reporter.info(f"Ingestion complete. Peak memory: {peak_rss_mb():.0f} MB RSS.")
+    if embedding_cache is not None and embedding_cache.hits + embedding_cache.misses:
+        reporter.info(
+            f"Embedding cache: {embedding_cache.hits} of {embedding_cache.hits + embedding_cache.misses} chunks reused "
+            f"({embedding_cache.hit_rate():.0%} hit rate)."
+        )
+    
+    # --- Execution: every index's tasks run as one workload, so each model is loaded once ---
+    def on_generated(done_count, i, gen_result):
+        reporter.info(f"Generated {done_count}/{len(tasks)}...")
+        if not gen_result["successful"]:
+            # Failed generations are never judged, so they complete their step here
+            advance(1)
+    
+    def on_judged(done_count, i, judge_result):
+        report_checkpoint_error()
+        reporter.info(f"Judged {done_count}/{len(tasks)}...")
+        advance(1)
+    
+    generation_results, judge_results = [], []
+    try:
+        if tasks and execution_mode == "pipelined":
+            # === STREAMING: each finished generation is judged immediately ===
+            residency.activate(model_name)
+            residency.activate(judge_model)
+            reporter.info(f"Running {len(tasks)} generation(s) and judgement(s)...")
         
-        # Unload generator ONCE if Ollama
-        if "Ollama" in model_name:
-            if status_placeholder:
-                status_placeholder.info("Unloading generator model...")
-            unload_ollama_model(model_name)
+            if batch_judge_chain is not None:
+                generation_results, judge_results = _run_pipelined(
+                    tasks, generate_one, judge_batch, gen_workers, judge_workers,
+                    on_generated=on_generated, on_judged=on_judged,
+                    group_fn=_judge_group_key, batch_size=judge_batch_size
+                )
+            else:
+                generation_results, judge_results = _run_pipelined(
+                    tasks, generate_one, judge_one, gen_workers, judge_workers,
+                    on_generated=on_generated, on_judged=on_judged
+                )
+        elif tasks:
+            # === PHASE 1: ALL GENERATIONS (every index) ===
+            residency.activate(model_name, exclusive=True)
+            reporter.info(f"Phase 1/2: Running {len(tasks)} generation(s)...")
         
-        # === PHASE 2: ALL JUDGING ===
-        if status_placeholder:
-            status_placeholder.info(f"Phase 2/2: Running {len(tasks)} judgement(s)...")
+            generation_results = _run_concurrently(
+                generate_one, tasks, gen_workers, on_complete=on_generated
+            )
         
-        judge_model = config["judge_model"]
-        # Initialize judge LLM once
-        judge_llm = get_llm(judge_model, temperature=0.1)
-        judge_chain = get_judge_chain(judge_llm)
+            # === PHASE 2: ALL JUDGING (the generator is unloaded first unless it is also the judge) ===
+            residency.activate(judge_model, exclusive=True)
+            reporter.info(f"Phase 2/2: Running {len(tasks)} judgement(s)...")
         
-        for i, gen_result in enumerate(generation_results):
-            task = gen_result["task"]
+            successful_indices = [i for i, g in enumerate(generation_results) if g["successful"]]
+            judge_results = [None] * len(tasks)
+            if batch_judge_chain is not None:
+                batches = _group_for_judging(tasks, successful_indices, judge_batch_size)
+                judged_count = 0
             
-            if not gen_result["successful"]:
-                st.error(f"Skipping judge for failed generation (K={task['k']}): {gen_result.get('error')}")
-                current_step += 1
-                continue
+                def on_batch_judged(done_count, b, batch_results):
+                    nonlocal judged_count
+                    for i, judge_result in zip(batches[b], batch_results):
+                        judged_count += 1
+                        on_judged(judged_count, i, judge_result)
             
-            try:
-                judge_result = _run_judging(
-                    judge_chain, question, gen_result["answer"], gen_result["context"], judge_model
+                batch_judgements = _run_concurrently(
+                    judge_batch, [[generation_results[i] for i in batch] for batch in batches],
+                    judge_workers, on_complete=on_batch_judged
                 )
-                
-                if judge_result["successful"]:
-                    score = judge_result["score"]
-                    results.append({
-                        "Question": question,
-                        "Answer": gen_result["answer"],
-                        "Top-K": task["k"],
-                        "Model": model_name,
-                        "Judge": judge_model,
-                        "Accuracy": score.get("accuracy"),
-                        "Faithfulness": score.get("faithfulness"),
-                        "Relevance": score.get("relevance"),
-                        "Explanation": score.get("explanation"),
-                        "Chunk Size": task["chunk_size"],
-                        "Overlap": task["chunk_overlap"],
-                        "Temperature": task["temperature"],
-                        "Top P": task["top_p"],
-                        "latency_rag": gen_result["latency_rag"],
-                        "latency_judge": judge_result["latency_judge"]
-                    })
-                else:
-                    st.error(f"Judge error (K={task['k']}): {judge_result.get('error')}")
-                    
-                if status_placeholder:
-                    status_placeholder.info(f"Phase 2/2: Judged {i+1}/{len(generation_results)}...")
-                    
-            except Exception as e:
-                st.error(f"Judge exception (K={task['k']}): {e}")
-            
-            current_step += 1
-            if progress_bar:
-                try:
-                    progress_bar.progress(min(current_step / total_steps, 1.0))
-                except: pass
-        
-        # Unload judge ONCE if Ollama
-        if "Ollama" in judge_model:
-            if status_placeholder:
-                status_placeholder.info("Unloading judge model...")
-            unload_ollama_model(judge_model)
+                for batch, batch_results in zip(batches, batch_judgements):
+                    for i, judge_result in zip(batch, batch_results):
+                        judge_results[i] = judge_result
+            else:
+                successful_judgements = _run_concurrently(
+                    judge_one, [generation_results[i] for i in successful_indices], judge_workers, on_complete=on_judged
+                )
+                for i, judge_result in zip(successful_indices, successful_judgements):
+                    judge_results[i] = judge_result
+    finally:
+        # Hand models back to the idle timer even when a phase raises
+        residency.release()
+    
+    # Collect in cell order so results are deterministic regardless of completion order.
+    # Tasks are exactly the pending cells, in cell order.
+    outcomes = iter(zip(generation_results, judge_results))
+    for *_, key in planned_cells:
+        if key in completed_cells:
+            results.append(completed_cells[key])
+            continue
+        gen_result, judge_result = next(outcomes)
+        task = gen_result["task"]
+        if not gen_result["successful"]:
+            reporter.error(f"Skipping judge for failed generation (K={task['k']}): {gen_result.get('error')}")
+        elif judge_result["successful"]:
+            results.append(judge_result["row"])
+        else:
+            reporter.error(f"Judge error (K={task['k']}): {judge_result.get('error')}")
+    
+    reporter.progress(current_step / total_steps)
+
+    # One status line, since each reporter.info replaces the last; per-stage hits are also in the trace summary
+    cache_stats = []
+    if generation_cache is not None:
+        cache_stats.append(f"Generation cache: {generation_cache.hits} hit(s), {generation_cache.misses} miss(es).")
+        generation_cache.close()
+    if judge_cache is not None:
+        cache_stats.append(f"Judge cache: {judge_cache.hits} hit(s), {judge_cache.misses} miss(es).")
+        judge_cache.close()
+    if cache_stats:
+        reporter.info(" ".join(cache_stats))
 
     return results
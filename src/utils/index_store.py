@@ -0,0 +1,215 @@
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import threading
+import time
+from importlib.metadata import version, PackageNotFoundError
+from typing import Any, Dict, List, Optional
+
+import faiss
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import Embeddings
+
+from src.utils.cache import CACHE_DIR, hash_key
+from src.utils.citations import CitationIndex
+from src.utils.ingestion import document_cache_key
+from src.utils.quantized import ExactVectors, RerankedFAISS
+
+# Bump when the on-disk layout changes
+INDEX_FORMAT_VERSION = 1
+# Defaults for garbage collection
+INDEX_STORE_MAX_MB = 2048
+INDEX_STORE_MAX_AGE_DAYS = 30
+
+INDEX_FILE = "index.faiss"
+DOCSTORE_FILE = "docstore.pkl"
+META_FILE = "meta.json"
+EXACT_VECTORS_FILE = "vectors.f32"
+CITATIONS_FILE = "citations.json"
+
+
+def corpus_key(file_paths: List[str]) -> str:
+    """
+    Identifies the parsed corpus: each file's content hash and loader versions (see
+    document_cache_key) in order, since chunk order follows file order.
+    """
+    try:
+        splitter_version = version("langchain-text-splitters")
+    except PackageNotFoundError:
+        splitter_version = None
+    return hash_key("corpus", [document_cache_key(p) for p in file_paths], splitter_version)
+
+
+def index_key(
+    corpus_id: str, chunk_size: int, chunk_overlap: int, embedding_model: str,
+    index_type: str = "auto", index_params: Optional[Dict[str, Any]] = None, storage: str = "float32"
+) -> str:
+    return hash_key(
+        "index", INDEX_FORMAT_VERSION, corpus_id, chunk_size, chunk_overlap, embedding_model,
+        index_type, sorted((index_params or {}).items()), storage
+    )
+
+
+def _dir_size(path: str) -> int:
+    return sum(os.path.getsize(os.path.join(path, name)) for name in os.listdir(path))
+
+
+class IndexStore:
+    """
+    Built FAISS indexes on disk, one directory per (corpus, chunk_size, chunk_overlap,
+    embedding model). Each holds the raw FAISS index (memory-mapped on load where the
+    index type allows), the pickled docstore and a meta.json with sizes and times.
+    Compressed indexes searched through RerankedFAISS also keep their float32
+    vectors, which are memory-mapped on load as well, and a store's citation index
+    is saved as citations.json.
+    Entries written by this store are trusted, so their pickles are loaded as is.
+
+    gc() removes entries unused for more than max_age_days, then the least recently
+    used ones until the store fits in max_bytes. put() runs it after each save.
+    """
+
+    def __init__(
+        self,
+        cache_dir: Optional[str] = None,
+        max_bytes: int = INDEX_STORE_MAX_MB * 1024 * 1024,
+        max_age_days: Optional[float] = INDEX_STORE_MAX_AGE_DAYS
+    ):
+        self.root = os.path.join(cache_dir or CACHE_DIR, "indexes")
+        os.makedirs(self.root, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.max_age_days = max_age_days
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def _read_meta(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self._path(key), META_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError):
+            return None
+
+    def _write_meta(self, path: str, meta: Dict[str, Any]):
+        with open(os.path.join(path, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(meta, f)
+
+    def has(self, key: str) -> bool:
+        """Whether an index is stored under key, without loading it or counting a hit."""
+        return self._read_meta(key) is not None
+
+    def get(self, key: str, embeddings: Embeddings) -> Optional[FAISS]:
+        """The stored index for key, or None. Queries use `embeddings`."""
+        path = self._path(key)
+        with self._lock:
+            meta = self._read_meta(key)
+            if meta is None:
+                self.misses += 1
+                return None
+            try:
+                index_path = os.path.join(path, INDEX_FILE)
+                try:
+                    index = faiss.read_index(index_path, faiss.IO_FLAG_MMAP | faiss.IO_FLAG_READ_ONLY)
+                except RuntimeError:
+                    # Index types without mmap support are read into memory
+                    index = faiss.read_index(index_path)
+                with open(os.path.join(path, DOCSTORE_FILE), "rb") as f:
+                    docstore, index_to_docstore_id = pickle.load(f)
+                exact = None
+                if meta.get("rerank_factor"):
+                    exact = ExactVectors(index.d, path=os.path.join(path, EXACT_VECTORS_FILE))
+                    if len(exact) != index.ntotal:
+                        raise ValueError(f"{len(exact)} exact vectors for {index.ntotal} indexed")
+                citation_index = None
+                citations_path = os.path.join(path, CITATIONS_FILE)
+                if os.path.exists(citations_path):
+                    with open(citations_path, "r", encoding="utf-8") as f:
+                        citation_index = CitationIndex.from_dict(json.load(f))
+            except Exception as e:
+                print(f"Warning: discarding unreadable stored index {key[:12]} ({e}).")
+                shutil.rmtree(path, ignore_errors=True)
+                self.misses += 1
+                return None
+            meta["last_used"] = time.time()
+            self._write_meta(path, meta)
+            self.hits += 1
+        if exact is not None:
+            vectorstore = RerankedFAISS(embeddings, index, docstore, index_to_docstore_id, exact, meta["rerank_factor"])
+        else:
+            vectorstore = FAISS(embeddings, index, docstore, index_to_docstore_id)
+        vectorstore.citation_index = citation_index
+        return vectorstore
+
+    def put(self, key: str, vectorstore: FAISS, **info):
+        """Saves an index under key (replacing any previous one), then garbage-collects."""
+        if not isinstance(vectorstore.index, faiss.Index):
+            raise TypeError(f"Expected a FAISS index, got {type(vectorstore.index).__name__}")
+        with self._lock:
+            # Written to a temp dir and renamed, so readers never see a partial entry
+            staging = tempfile.mkdtemp(dir=self.root, prefix=".tmp-")
+            try:
+                faiss.write_index(vectorstore.index, os.path.join(staging, INDEX_FILE))
+                with open(os.path.join(staging, DOCSTORE_FILE), "wb") as f:
+                    pickle.dump((vectorstore.docstore, vectorstore.index_to_docstore_id), f)
+                if isinstance(vectorstore, RerankedFAISS):
+                    vectorstore.exact.save(os.path.join(staging, EXACT_VECTORS_FILE))
+                    info = dict(info, rerank_factor=vectorstore.rerank_factor)
+                citation_index = getattr(vectorstore, "citation_index", None)
+                if isinstance(citation_index, CitationIndex):
+                    with open(os.path.join(staging, CITATIONS_FILE), "w", encoding="utf-8") as f:
+                        json.dump(citation_index.to_dict(), f)
+                now = time.time()
+                self._write_meta(staging, dict(info, vectors=vectorstore.index.ntotal, created_at=now, last_used=now))
+                target = self._path(key)
+                shutil.rmtree(target, ignore_errors=True)
+                os.replace(staging, target)
+            except Exception:
+                shutil.rmtree(staging, ignore_errors=True)
+                raise
+        self.gc()
+
+    def entries(self) -> List[Dict[str, Any]]:
+        """Stored indexes with their key, size on disk and metadata."""
+        rows = []
+        for key in os.listdir(self.root):
+            if key.startswith("."):
+                continue
+            meta = self._read_meta(key)
+            if meta is not None:
+                rows.append(dict(meta, key=key, size_bytes=_dir_size(self._path(key))))
+        return rows
+
+    def gc(self) -> List[str]:
+        """Removes stale and least recently used entries per max_age_days / max_bytes. Returns removed keys."""
+        with self._lock:
+            now = time.time()
+            entries = sorted(self.entries(), key=lambda e: e.get("last_used", 0))
+            removed = []
+            total = sum(e["size_bytes"] for e in entries)
+            for entry in entries:
+                expired = self.max_age_days is not None and now - entry.get("last_used", 0) > self.max_age_days * 86400
+                if expired or total > self.max_bytes:
+                    shutil.rmtree(self._path(entry["key"]), ignore_errors=True)
+                    total -= entry["size_bytes"]
+                    removed.append(entry["key"])
+            return removed
+
+    def stats(self) -> dict:
+        """Returns hit/miss counters for this instance."""
+        return {"hits": self.hits, "misses": self.misses}
+
+
+def get_index_store(config: Optional[Dict[str, Any]] = None) -> Optional[IndexStore]:
+    """The persisted index store for a run config, or None if config["use_index_store"] is off."""
+    config = config or {}
+    if not config.get("use_index_store", True):
+        return None
+    return IndexStore(
+        cache_dir=config.get("cache_dir"),
+        max_bytes=int(config.get("index_store_max_mb", INDEX_STORE_MAX_MB) * 1024 * 1024),
+        max_age_days=config.get("index_store_max_age_days", INDEX_STORE_MAX_AGE_DAYS)
+    )
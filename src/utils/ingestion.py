@@ -1,27 +1,447 @@
+import copy
+import io
 import os
-from typing import List
+import re
+import concurrent.futures
+from concurrent.futures.process import BrokenProcessPool
+from importlib.metadata import version, PackageNotFoundError
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
 from langchain_community.document_loaders import PyPDFLoader, TextLoader, UnstructuredMarkdownLoader
+from langchain_community.document_loaders.parsers import PyPDFParser
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from langchain_core.document_loaders import Blob
 
-def load_document(file_path: str) -> List[Document]:
-    """Loads a document from a file path based on its extension."""
-    if file_path.endswith(".pdf"):
-        loader = PyPDFLoader(file_path)
-    elif file_path.endswith(".txt"):
-        loader = TextLoader(file_path)
-    elif file_path.endswith(".md"):
-        loader = UnstructuredMarkdownLoader(file_path)
-    else:
+from src.utils.cache import DiskCache, hash_file, hash_key
+
+# Default on-disk budget for parsed documents
+DOCUMENT_CACHE_MAX_MB = 500
+
+# Loader and the packages whose versions change its output, per file extension
+LOADERS = {
+    ".pdf": (PyPDFLoader, ["langchain-community", "pypdf"]),
+    ".txt": (TextLoader, ["langchain-community"]),
+    ".md": (UnstructuredMarkdownLoader, ["langchain-community", "unstructured"]),
+}
+
+
+def _package_version(package: str) -> Optional[str]:
+    try:
+        return version(package)
+    except PackageNotFoundError:
+        return None
+
+
+def get_document_cache(config: Optional[Dict[str, Any]] = None) -> Optional[DiskCache]:
+    """The parsed-document cache for a run config, or None if config["use_document_cache"] is off."""
+    config = config or {}
+    if not config.get("use_document_cache", True):
+        return None
+    return DiskCache(
+        "parsed_documents",
+        max_bytes=int(config.get("document_cache_max_mb", DOCUMENT_CACHE_MAX_MB) * 1024 * 1024),
+        cache_dir=config.get("cache_dir")
+    )
+
+
+def _extension(file_path: str) -> str:
+    # Matched case-insensitively, so REPORT.PDF loads like report.pdf
+    return os.path.splitext(file_path)[1].lower()
+
+
+def document_cache_key(file_path: str) -> str:
+    """Content hash of the file plus the loader and library versions that parse it."""
+    loader_cls, packages = LOADERS[_extension(file_path)]
+    return hash_key("parsed_document", hash_file(file_path), loader_cls.__name__, {p: _package_version(p) for p in packages})
+
+
+def _pack_documents(docs: List[Document]) -> Dict[str, Any]:
+    """
+    Compact cache form: metadata shared by every page (document info, total_pages) is
+    stored once and each page keeps only its text and what differs (page, page_label).
+    """
+    shared = dict(docs[0].metadata) if docs else {}
+    for doc in docs[1:]:
+        shared = {k: v for k, v in shared.items() if k in doc.metadata and doc.metadata[k] == v}
+    return {
+        "metadata": shared,
+        "pages": [[doc.page_content, {k: v for k, v in doc.metadata.items() if k not in shared}] for doc in docs]
+    }
+
+
+def _unpack_documents(packed: Dict[str, Any], file_path: str) -> List[Document]:
+    # The same content may have been cached from another path (e.g. a fresh upload temp dir)
+    shared = dict(packed["metadata"])
+    if "source" in shared:
+        shared["source"] = file_path
+    return [Document(page_content=content, metadata={**shared, **page}) for content, page in packed["pages"]]
+
+
+def _cache_documents(cache: DiskCache, key: str, docs: List[Document]):
+    try:
+        cache.set(key, _pack_documents(docs))
+    except (TypeError, ValueError) as e:
+        # Metadata a loader returned that isn't JSON-serializable; just parse again next time
+        print(f"Warning: could not cache parsed document ({e}).")
+
+
+def load_document(file_path: str, cache: Optional[DiskCache] = None) -> List[Document]:
+    """
+    Loads a document from a file path based on its extension.
+    With a cache (see get_document_cache) a file whose content was parsed before is
+    read back from it instead of being parsed again.
+    """
+    extension = _extension(file_path)
+    if extension not in LOADERS:
         raise ValueError(f"Unsupported file type: {file_path}")
-    
-    return loader.load()
 
-def split_documents(documents: List[Document], chunk_size: int = 1000, chunk_overlap: int = 200) -> List[Document]:
-    """Splits documents into chunks."""
-    text_splitter = RecursiveCharacterTextSplitter(
+    key = None
+    if cache is not None:
+        key = document_cache_key(file_path)
+        packed = cache.get(key)
+        if packed is not None:
+            return _unpack_documents(packed, file_path)
+
+    loader_cls, _ = LOADERS[extension]
+    docs = loader_cls(file_path).load()
+    if cache is not None:
+        _cache_documents(cache, key, docs)
+    return docs
+
+
+# PDFs longer than this are parsed as several page ranges in parallel
+PDF_PAGES_PER_TASK = 25
+# Below this many pages in total, worker start-up costs more than it saves
+MIN_PAGES_FOR_PARALLEL = 40
+
+
+class DocumentLoadError(Exception):
+    """A file could not be loaded. file_path names the file; the message carries the cause."""
+
+    def __init__(self, file_path: str, error: Exception):
+        super().__init__(f"{file_path}: {error}")
+        self.file_path = file_path
+        self.error = error
+
+    def __reduce__(self):
+        # Rebuilt from its constructor arguments when raised inside a worker process
+        return (DocumentLoadError, (self.file_path, str(self.error)))
+
+
+def _pdf_page_count(file_path: str) -> int:
+    """Number of pages in a PDF, read from its page tree without extracting text. 0 if unreadable."""
+    try:
+        import pypdf
+        return len(pypdf.PdfReader(file_path).pages)
+    except Exception:
+        return 0
+
+
+def _load_pdf_pages(file_path: str, start: int, end: int) -> List[Document]:
+    """
+    Loads pages [start, end) of a PDF exactly as PyPDFLoader would (same text and
+    per-page metadata: source, page, page_label, total_pages and document info).
+    The pages are copied, with the document info, into an in-memory PDF that
+    PyPDFLoader's own parser reads; only the page numbering is then mapped back.
+    """
+    import pypdf
+
+    reader = pypdf.PdfReader(file_path)
+    end = min(end, len(reader.pages))
+    writer = pypdf.PdfWriter()
+    for page in reader.pages[start:end]:
+        writer.add_page(page)
+    # Replaces the writer's own producer, so the info is exactly the original's
+    writer.metadata = reader.metadata
+    buffer = io.BytesIO()
+    writer.write(buffer)
+
+    docs = list(PyPDFParser().lazy_parse(Blob.from_data(buffer.getvalue(), path=file_path)))
+    for page_number, doc in enumerate(docs, start=start):
+        doc.metadata.update(
+            total_pages=len(reader.pages), page=page_number, page_label=reader.page_labels[page_number]
+        )
+    return docs
+
+
+def _run_load_task(task: Tuple[str, Optional[int], Optional[int]]) -> List[Document]:
+    """Process-pool entry point: a whole file, or a (path, start, end) PDF page range."""
+    file_path, start, end = task
+    try:
+        if start is None:
+            return load_document(file_path)
+        return _load_pdf_pages(file_path, start, end)
+    except Exception as e:
+        raise DocumentLoadError(file_path, e) from e
+
+
+def _plan_load_tasks(file_paths: List[str]) -> Tuple[List[Tuple[str, Optional[int], Optional[int]]], int]:
+    """Splits long PDFs into page ranges. Returns (tasks in document order, total PDF pages)."""
+    tasks = []
+    total_pages = 0
+    for file_path in file_paths:
+        pages = _pdf_page_count(file_path) if _extension(file_path) == ".pdf" else 0
+        total_pages += pages
+        if pages > PDF_PAGES_PER_TASK:
+            tasks.extend((file_path, start, start + PDF_PAGES_PER_TASK) for start in range(0, pages, PDF_PAGES_PER_TASK))
+        else:
+            tasks.append((file_path, None, None))
+    return tasks, total_pages
+
+
+def load_documents(file_paths: List[str], max_workers: Optional[int] = None, cache: Optional[DiskCache] = None) -> List[Document]:
+    """
+    Loads several files, parsing files and page ranges of long PDFs in a process pool
+    (PDF text extraction is CPU-bound). Returns the same documents, in the same order
+    and with the same metadata, as calling load_document on each file in turn.
+    Files found in `cache` are not parsed; newly parsed files are added to it.
+    Small inputs, a single core or a pool that cannot start fall back to loading in-process.
+    Raises DocumentLoadError naming the first file that failed.
+    """
+    loaded: Dict[str, List[Document]] = {}
+    keys: Dict[str, str] = {}
+    if cache is not None:
+        for file_path in file_paths:
+            try:
+                keys[file_path] = document_cache_key(file_path)
+            except Exception as e:
+                raise DocumentLoadError(file_path, e) from e
+            packed = cache.get(keys[file_path])
+            if packed is not None:
+                loaded[file_path] = _unpack_documents(packed, file_path)
+    to_parse = list(dict.fromkeys(f for f in file_paths if f not in loaded))
+
+    max_workers = max_workers or os.cpu_count() or 1
+    tasks, total_pages = _plan_load_tasks(to_parse) if max_workers > 1 else ([], 0)
+
+    parsed = None
+    if len(tasks) > 1 and total_pages >= MIN_PAGES_FOR_PARALLEL:
+        try:
+            with concurrent.futures.ProcessPoolExecutor(max_workers=min(max_workers, len(tasks))) as executor:
+                # map() yields in task order, which is document then page order
+                parsed = list(zip(tasks, executor.map(_run_load_task, tasks)))
+        except (BrokenProcessPool, OSError) as e:
+            print(f"Warning: parallel document loading unavailable ({e}). Loading serially.")
+    if parsed is None:
+        parsed = [((f, None, None), _run_load_task((f, None, None))) for f in to_parse]
+
+    for (file_path, _, _), docs in parsed:
+        loaded.setdefault(file_path, []).extend(docs)
+    if cache is not None:
+        for file_path in to_parse:
+            _cache_documents(cache, keys[file_path], loaded[file_path])
+
+    return [doc for file_path in file_paths for doc in loaded[file_path]]
+
+
+def _iter_file_documents(file_path: str, cache: Optional[DiskCache]) -> Iterator[Document]:
+    extension = _extension(file_path)
+    if extension not in LOADERS:
+        raise ValueError(f"Unsupported file type: {file_path}")
+    key = None
+    if cache is not None:
+        key = document_cache_key(file_path)
+        packed = cache.get(key)
+        if packed is not None:
+            yield from _unpack_documents(packed, file_path)
+            return
+
+    parsed = []
+    for doc in LOADERS[extension][0](file_path).lazy_load():
+        if cache is not None:
+            parsed.append(doc)
+        yield doc
+    if cache is not None:
+        _cache_documents(cache, key, parsed)
+
+
+def iter_documents(file_paths: List[str], cache: Optional[DiskCache] = None) -> Iterator[Document]:
+    """
+    Yields the documents of each file in turn (a PDF page at a time) from the loaders'
+    lazy_load, in the same order and with the same metadata as load_documents.
+    Cached files are read back instead of parsed; with a cache, one file's pages are
+    kept until the file is fully read so they can be added to it.
+    Raises DocumentLoadError naming the file that failed.
+    """
+    for file_path in file_paths:
+        try:
+            yield from _iter_file_documents(file_path, cache)
+        except Exception as e:
+            raise DocumentLoadError(file_path, e) from e
+
+
+SEPARATORS = ["\n\n", "\n", " ", ""]
+
+
+def _get_splitter(chunk_size: int, chunk_overlap: int) -> RecursiveCharacterTextSplitter:
+    return RecursiveCharacterTextSplitter(
         chunk_size=chunk_size,
         chunk_overlap=chunk_overlap,
-        separators=["\n\n", "\n", " ", ""]
+        separators=SEPARATORS
     )
-    return text_splitter.split_documents(documents)
+
+
+def split_documents(documents: List[Document], chunk_size: int = 1000, chunk_overlap: int = 200) -> List[Document]:
+    """Splits documents into chunks."""
+    return _get_splitter(chunk_size, chunk_overlap).split_documents(documents)
+
+
+def iter_chunks(documents: Iterable[Document], chunk_size: int = 1000, chunk_overlap: int = 200) -> Iterator[Document]:
+    """Generator form of split_documents: splits each document as it arrives, yielding the same chunks in order."""
+    text_splitter = _get_splitter(chunk_size, chunk_overlap)
+    for doc in documents:
+        yield from text_splitter.split_documents([doc])
+
+
+ATOMIC_METADATA_TYPES = (str, int, float, bool, type(None))
+
+
+def _split_keeping_separator(text: str, separator: str) -> List[str]:
+    """Cuts text before each separator occurrence (or into characters for ""), dropping empty pieces."""
+    if not separator:
+        return list(text)
+    parts = re.split(f"({re.escape(separator)})", text)
+    pieces = [parts[0]] + [parts[i] + parts[i + 1] for i in range(1, len(parts) - 1, 2)]
+    return [piece for piece in pieces if piece != ""]
+
+
+def _merge_pieces(pieces: List[str], chunk_size: int, chunk_overlap: int) -> List[str]:
+    """
+    Packs consecutive pieces into chunks of at most chunk_size characters, starting
+    each chunk with up to chunk_overlap characters of whole pieces from the previous
+    one, and strips them; the recursive splitter's merge step.
+    """
+    chunks = []
+    current: List[str] = []
+    total = 0
+    for piece in pieces:
+        if total + len(piece) > chunk_size and current:
+            chunk = "".join(current).strip()
+            if chunk:
+                chunks.append(chunk)
+            while total > chunk_overlap or (total + len(piece) > chunk_size and total > 0):
+                total -= len(current[0])
+                current = current[1:]
+        current.append(piece)
+        total += len(piece)
+    chunk = "".join(current).strip()
+    if chunk:
+        chunks.append(chunk)
+    return chunks
+
+
+ChunkConfig = Tuple[int, int]
+
+# Chunk sets MultiConfigSplitter.split() produces per pass over the documents (the asked-for one included)
+MAX_HELD_CHUNK_SETS = 2
+
+
+class MultiConfigSplitter:
+    """
+    Splits documents for several (chunk_size, chunk_overlap) configs in one pass.
+
+    The recursive splitter picks a separator and cuts a piece of text the same way
+    whatever the config; only which pieces recurse (those at least chunk_size long)
+    and how pieces are merged depend on it. Each document's text is therefore cut
+    once, every config merges the same pieces, and the pieces are dropped before
+    the next document, so memory beyond the chunks themselves is one document's
+    pieces. Chunks are exactly what split_documents gives for each config.
+
+    iter_split() works on any iterable of documents, such as a lazy page stream.
+    split() needs a list: a call for a config not yet split also splits the next
+    configs in order, up to max_held chunk sets in all (None: every config), and
+    keeps their chunks until they are asked for (or discarded). Memory held is
+    therefore at most max_held configs' chunks, at one pass per max_held configs.
+    """
+
+    def __init__(
+        self, documents: Iterable[Document], configs: Iterable[ChunkConfig],
+        max_held: Optional[int] = MAX_HELD_CHUNK_SETS
+    ):
+        self.documents = documents
+        self.configs = list(dict.fromkeys(tuple(c) for c in configs))
+        self.max_held = max_held
+        self._pending: Dict[ChunkConfig, List[Document]] = {}
+        # Configs not yet split (or discarded), in order
+        self._unsplit = list(self.configs)
+
+    def _split_text(self, text: str, level: int, configs: List[ChunkConfig]) -> Dict[ChunkConfig, List[str]]:
+        # Same separator choice as RecursiveCharacterTextSplitter
+        separator = SEPARATORS[-1]
+        next_level = None
+        for i, candidate in enumerate(SEPARATORS[level:], start=level):
+            if candidate == "":
+                break
+            if candidate in text:
+                separator = candidate
+                next_level = i + 1 if i + 1 < len(SEPARATORS) else None
+                break
+        pieces = _split_keeping_separator(text, separator)
+
+        # Long pieces are split further once, for every config they are too long for
+        nested = {}
+        if next_level is not None:
+            for j, piece in enumerate(pieces):
+                too_long = [c for c in configs if len(piece) >= c[0]]
+                if too_long:
+                    nested[j] = self._split_text(piece, next_level, too_long)
+
+        result = {}
+        for config in configs:
+            chunk_size, chunk_overlap = config
+            chunks = []
+            short = []
+            for j, piece in enumerate(pieces):
+                if len(piece) < chunk_size:
+                    short.append(piece)
+                    continue
+                if short:
+                    chunks.extend(_merge_pieces(short, chunk_size, chunk_overlap))
+                    short = []
+                chunks.extend(nested[j][config] if j in nested else [piece])
+            if short:
+                chunks.extend(_merge_pieces(short, chunk_size, chunk_overlap))
+            result[config] = chunks
+        return result
+
+    def split_document(self, doc: Document, configs: Optional[List[ChunkConfig]] = None) -> Dict[ChunkConfig, List[Document]]:
+        """One document's chunks for each config (default: all of them)."""
+        configs = configs or self.configs
+        # Each chunk gets its own metadata dict; a plain copy is as independent as
+        # the splitter's deepcopy when every value is immutable (the loaders' case)
+        flat = all(isinstance(v, ATOMIC_METADATA_TYPES) for v in doc.metadata.values())
+        return {
+            config: [
+                Document(page_content=chunk, metadata=dict(doc.metadata) if flat else copy.deepcopy(doc.metadata))
+                for chunk in chunks
+            ]
+            for config, chunks in self._split_text(doc.page_content, 0, configs).items()
+        }
+
+    def iter_split(self) -> Iterator[Dict[ChunkConfig, List[Document]]]:
+        """Yields each document's chunks per config, in document order."""
+        for doc in self.documents:
+            yield self.split_document(doc)
+
+    def split(self, chunk_size: int = 1000, chunk_overlap: int = 200) -> List[Document]:
+        """Chunks for one config, identical to split_documents(documents, chunk_size, chunk_overlap)."""
+        config = (chunk_size, chunk_overlap)
+        if config in self._unsplit:
+            batch = [config] + [c for c in self._unsplit if c != config]
+            if self.max_held:
+                batch = batch[:max(self.max_held, 1)]
+            self._unsplit = [c for c in self._unsplit if c not in batch]
+            self._pending.update((c, []) for c in batch)
+            for doc in self.documents:
+                for c, chunks in self.split_document(doc, batch).items():
+                    self._pending[c].extend(chunks)
+        if config in self._pending:
+            return self._pending.pop(config)
+        return [chunk for doc in self.documents for chunk in self.split_document(doc, [config])[config]]
+
+    def discard(self, chunk_size: int, chunk_overlap: int):
+        """Drops a config's chunks, or the config itself if not split yet, when it will not be asked for."""
+        config = (chunk_size, chunk_overlap)
+        self._pending.pop(config, None)
+        if config in self._unsplit:
+            self._unsplit.remove(config)
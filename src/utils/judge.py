@@ -1,7 +1,11 @@
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import JsonOutputParser
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, ValidationError
 from langchain_core.language_models import BaseChatModel
+from typing import Any, Dict, List
+import hashlib
+
+from src.utils.cache import hash_key
 
 class EvaluationScore(BaseModel):
     accuracy: int = Field(description="Score from 0-10 indicating how accurately the answer reflects the retrieved context.")
@@ -9,15 +13,7 @@ class EvaluationScore(BaseModel):
     relevance: int = Field(description="Score from 0-10 indicating how relevant the answer is to the user's question.")
     explanation: str = Field(description="A brief explanation of the scores.")
 
-def get_judge_chain(llm: BaseChatModel):
-    """
-    Creates a chain that evaluates a RAG response.
-    Input keys: question, answer, context
-    """
-    
-    parser = JsonOutputParser(pydantic_object=EvaluationScore)
-    
-    prompt_str = """You are an expert AI evaluator.
+JUDGE_PROMPT_TEMPLATE = """You are an expert AI evaluator.
     You will be given a user Question, a set of Retrieved Context, and a Generated Answer.
     
     Your task is to evaluate the Generated Answer on three criteria:
@@ -36,9 +32,96 @@ def get_judge_chain(llm: BaseChatModel):
     Generated Answer:
     {answer}
     """
+
+class BatchEvaluationScore(BaseModel):
+    evaluations: List[EvaluationScore] = Field(description="One evaluation per Generated Answer, in the order the answers are given.")
+
+BATCH_JUDGE_PROMPT_TEMPLATE = """You are an expert AI evaluator.
+    You will be given a user Question, a set of Retrieved Context, and {answer_count} Generated Answers to that question.
+    
+    Evaluate EACH Generated Answer independently on three criteria:
+    1. Accuracy: Does the answer accurately reflect the facts in the context? (0-10)
+    2. Faithfulness: Is the answer derived *only* from the context? Does it contain hallucinations? (0-10)
+    3. Relevance: Does the answer directly address the user's question? (0-10)
+    
+    Return exactly {answer_count} evaluations, in the same order as the answers, in the following JSON format:
+    {format_instructions}
+    
+    Question: {question}
+    
+    Retrieved Context:
+    {context}
+    
+    {answers}
+    """
+
+# Changes whenever the judge prompt changes, so cached verdicts from an older prompt are not reused
+JUDGE_PROMPT_VERSION = hashlib.sha256(JUDGE_PROMPT_TEMPLATE.encode("utf-8")).hexdigest()[:12]
+BATCH_JUDGE_PROMPT_VERSION = hashlib.sha256(BATCH_JUDGE_PROMPT_TEMPLATE.encode("utf-8")).hexdigest()[:12]
+
+def judge_cache_key(
+    question: str, answer: str, context: str, judge_model: str, prompt_version: str = JUDGE_PROMPT_VERSION
+) -> str:
+    """Cache key for a verdict: hash of the judged content, judge model and judge prompt version."""
+    return hash_key("judge", question, answer, context, judge_model, prompt_version)
+
+def format_answers(answers: List[str]) -> str:
+    """Numbers the answers for the batch judge prompt."""
+    return "\n\n".join(f"Generated Answer {i}:\n{answer}" for i, answer in enumerate(answers, start=1))
+
+def parse_score(output: Any) -> Dict[str, Any]:
+    """
+    Checks a single judge response is a score object. Raises ValueError otherwise
+    (e.g. a bare list or string), so the cell fails instead of the row build.
+    """
+    if not isinstance(output, dict):
+        raise ValueError(f"Malformed verdict: expected a JSON object, got {type(output).__name__}")
+    return output
+
+def parse_batch_scores(output: Any, expected_count: int) -> List[Dict[str, Any]]:
+    """
+    Validates a batch judge response and returns one score dict per answer.
+    Raises ValueError if the response is malformed or has the wrong number of evaluations.
+    """
+    # Some models return the bare list instead of wrapping it
+    if isinstance(output, list):
+        output = {"evaluations": output}
+    try:
+        batch = BatchEvaluationScore.model_validate(output)
+    except ValidationError as e:
+        raise ValueError(f"Malformed batch verdict: {e}")
+    if len(batch.evaluations) != expected_count:
+        raise ValueError(f"Expected {expected_count} evaluations, got {len(batch.evaluations)}")
+    return [evaluation.model_dump() for evaluation in batch.evaluations]
+
+def get_judge_chain(llm: BaseChatModel):
+    """
+    Creates a chain that evaluates a RAG response.
+    Input keys: question, answer, context
+    """
+    
+    parser = JsonOutputParser(pydantic_object=EvaluationScore)
+    
+    prompt = ChatPromptTemplate.from_template(
+        template=JUDGE_PROMPT_TEMPLATE,
+        partial_variables={"format_instructions": parser.get_format_instructions()}
+    )
+    
+    chain = prompt | llm | parser
+    
+    return chain
+
+def get_batch_judge_chain(llm: BaseChatModel):
+    """
+    Creates a chain that evaluates several answers to the same question and context in one call.
+    Input keys: question, context, answers (see format_answers), answer_count
+    Output: raw parsed JSON; validate it with parse_batch_scores.
+    """
+    
+    parser = JsonOutputParser(pydantic_object=BatchEvaluationScore)
     
     prompt = ChatPromptTemplate.from_template(
-        template=prompt_str,
+        template=BATCH_JUDGE_PROMPT_TEMPLATE,
         partial_variables={"format_instructions": parser.get_format_instructions()}
     )
     
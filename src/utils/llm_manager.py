@@ -3,7 +3,7 @@ import requests
 import subprocess
 import time
 import shutil
-import streamlit as st # For logging/warning
+from typing import Callable, Dict, Optional
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain_openai import ChatOpenAI
 from langchain_groq import ChatGroq
@@ -27,7 +27,7 @@ def start_ollama_server() -> bool:
     try:
         # Check if ollama is in PATH
         if not shutil.which("ollama"):
-            st.error("Ollama executable not found in PATH.")
+            print("Error: Ollama executable not found in PATH.")
             return False
 
         # Start process
@@ -40,11 +40,11 @@ def start_ollama_server() -> bool:
                 print("Ollama started successfully.")
                 return True
                 
-        st.error("Timed out waiting for Ollama to start.")
+        print("Error: Timed out waiting for Ollama to start.")
         return False
         
     except Exception as e:
-        st.error(f"Failed to start Ollama: {e}")
+        print(f"Error: Failed to start Ollama: {e}")
         return False
         
 def ensure_ollama_reachable() -> bool:
@@ -53,39 +53,68 @@ def ensure_ollama_reachable() -> bool:
         return True
     return start_ollama_server()
 
-def unload_ollama_model(model_name: str) -> bool:
+def get_ollama_model_id(model_name: str) -> str:
+    """Maps a UI model name to its Ollama model ID."""
+    if "Llama 3.2" in model_name:
+        return "llama3.2"
+    return "mistral"  # Default (also "Mistral")
+
+def set_ollama_keep_alive(model_name: str, keep_alive, timeout: float = 10) -> bool:
     """
-    Unloads an Ollama model from memory by setting keep_alive to 0.
-    This frees VRAM/RAM for the next model.
+    Sends an empty prompt with the given keep_alive. Ollama loads the model if needed
+    and keeps it resident for keep_alive ("30m", seconds, -1 = forever); 0 unloads it.
     """
-    # Map friendly names to Ollama model IDs
-    model_id = "mistral"  # Default
-    if "Llama 3.2" in model_name:
-        model_id = "llama3.2"
-    elif "Mistral" in model_name:
-        model_id = "mistral"
-    
+    model_id = get_ollama_model_id(model_name)
     try:
         response = requests.post(
             "http://localhost:11434/api/generate",
             json={
                 "model": model_id,
                 "prompt": "",
-                "keep_alive": 0
+                "keep_alive": keep_alive
             },
-            timeout=10
+            timeout=timeout
         )
         if response.status_code == 200:
-            print(f"Unloaded model: {model_id}")
             return True
-        else:
-            print(f"Failed to unload model: {response.status_code}")
-            return False
+        print(f"Failed to set keep_alive={keep_alive} for {model_id}: {response.status_code}")
+        return False
     except Exception as e:
-        print(f"Error unloading model: {e}")
+        print(f"Error setting keep_alive={keep_alive} for {model_id}: {e}")
         return False
 
-def get_llm(model_name: str, temperature: float = 0.7, top_p: float = 0.9) -> BaseChatModel:
+def load_ollama_model(model_name: str, keep_alive: str) -> bool:
+    """Loads an Ollama model into memory ahead of use, kept resident for keep_alive."""
+    # Loading a large model on CPU can take well over the default timeout
+    if set_ollama_keep_alive(model_name, keep_alive, timeout=300):
+        print(f"Loaded model: {get_ollama_model_id(model_name)} (keep_alive={keep_alive})")
+        return True
+    return False
+
+def unload_ollama_model(model_name: str) -> bool:
+    """
+    Unloads an Ollama model from memory by setting keep_alive to 0.
+    This frees VRAM/RAM for the next model.
+    """
+    if set_ollama_keep_alive(model_name, 0):
+        print(f"Unloaded model: {get_ollama_model_id(model_name)}")
+        return True
+    return False
+
+# Chat models registered under a model name (e.g. offline stand-ins), checked before the built-in providers
+_registered_models: Dict[str, Callable[..., BaseChatModel]] = {}
+
+def register_model(model_name: str, factory: Optional[Callable[..., BaseChatModel]]):
+    """
+    Makes get_llm(model_name, ...) return factory(temperature=..., top_p=..., keep_alive=...).
+    Pass None to remove the registration.
+    """
+    if factory is None:
+        _registered_models.pop(model_name, None)
+    else:
+        _registered_models[model_name] = factory
+
+def get_llm(model_name: str, temperature: float = 0.7, top_p: float = 0.9, keep_alive: Optional[str] = None) -> BaseChatModel:
     """
     Returns a configured LLM instance.
     
@@ -93,16 +122,22 @@ def get_llm(model_name: str, temperature: float = 0.7, top_p: float = 0.9) -> Ba
         model_name: The name of the model selected in the UI.
         temperature: Sampling temperature.
         top_p: Top-p sampling.
+        keep_alive: Ollama only. How long the model stays loaded after each call;
+            every request resets it, so omitting it falls back to Ollama's 5 minute default.
         
     Returns:
         A LangChain BaseChatModel.
     """
     
+    # Registered models (see register_model)
+    if model_name in _registered_models:
+        return _registered_models[model_name](temperature=temperature, top_p=top_p, keep_alive=keep_alive)
+    
     # Check for Groq Models
     if "Groq" in model_name:
         api_key = os.getenv("GROQ_API_KEY")
         if not api_key:
-            st.error("Missing GROQ_API_KEY. Check .env file.")
+            print("Warning: Missing GROQ_API_KEY. Check .env file.")
         
         # Map friendly names to Groq Model IDs (Using Llama 3.1)
         target_model = "llama-3.1-8b-instant" # Default
@@ -137,8 +172,8 @@ def get_llm(model_name: str, temperature: float = 0.7, top_p: float = 0.9) -> Ba
             target_model = "gpt-4o"
             
         if not api_key:
-            st.error(f"Missing API Token for {model_name}. Check .env file.")
-            # Fallback or error? defaulting to error will show in UI
+            print(f"Warning: Missing API Token for {model_name}. Check .env file.")
+            # The provider call will then fail and surface through the experiment's reporter
         
         return ChatOpenAI(
             model=target_model,
@@ -150,11 +185,7 @@ def get_llm(model_name: str, temperature: float = 0.7, top_p: float = 0.9) -> Ba
 
     # Check for Ollama Models
     if "Ollama" in model_name:
-        target_model = "mistral" # Default
-        if "Llama 3.2" in model_name:
-            target_model = "llama3.2"
-        elif "Mistral" in model_name:
-            target_model = "mistral"
+        target_model = get_ollama_model_id(model_name)
             
         return ChatOllama(
             model=target_model,
@@ -162,7 +193,8 @@ def get_llm(model_name: str, temperature: float = 0.7, top_p: float = 0.9) -> Ba
             base_url="http://localhost:11434",
             # Ollama doesn't strictly adhere to top_p in the same kwarg structure sometimes 
             # but langchain handles it or ignores it. 
-            top_p=top_p 
+            top_p=top_p,
+            keep_alive=keep_alive
         )
 
     # Legacy Google/Gemini Logic
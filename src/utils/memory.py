@@ -0,0 +1,40 @@
+import os
+import sys
+from typing import Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class MemoryLimitExceeded(MemoryError):
+    """Resident memory went over the configured ceiling (config["memory_limit_mb"])."""
+
+
+def peak_rss_mb() -> float:
+    """Peak resident set size of this process so far, in MB (0.0 where unsupported)."""
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is in bytes on macOS and KB on Linux
+    return peak / (1024.0 * 1024.0) if sys.platform == "darwin" else peak / 1024.0
+
+
+def current_rss_mb() -> float:
+    """Current resident set size in MB. Falls back to the peak where /proc is unavailable."""
+    try:
+        with open("/proc/self/statm", "r") as f:
+            resident_pages = int(f.read().split()[1])
+        return resident_pages * os.sysconf("SC_PAGE_SIZE") / (1024.0 * 1024.0)
+    except (OSError, ValueError, IndexError, AttributeError):
+        return peak_rss_mb()
+
+
+def check_memory(limit_mb: Optional[float], stage: str):
+    """Raises MemoryLimitExceeded if resident memory is above limit_mb (None or 0 = no limit)."""
+    if not limit_mb:
+        return
+    rss = current_rss_mb()
+    if rss > limit_mb:
+        raise MemoryLimitExceeded(f"{stage}: resident memory {rss:.0f} MB exceeds the {limit_mb:.0f} MB ceiling")
@@ -0,0 +1,123 @@
+import os
+import tempfile
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+# Candidates fetched from a compressed index per result before exact re-ranking
+RERANK_FACTOR = 4
+# Rows copied per write when saving exact vectors
+_SAVE_ROWS = 65536
+
+
+class ExactVectors:
+    """
+    Full-precision float32 vectors kept in a file and read through a memory map, so
+    re-ranking a shortlist reads only those rows and the OS can page the rest out.
+
+    Without `path`, vectors are appended to a new file in `directory` that is
+    unlinked as soon as it is opened (it disappears with the process); with `path`,
+    an existing file (e.g. one saved in the index store) is opened read-only.
+    """
+
+    def __init__(self, dimension: int, directory: Optional[str] = None, path: Optional[str] = None):
+        self.dimension = dimension
+        self._mmap = None
+        if path is not None:
+            self._file = None
+            self._source = path
+            self.count = os.path.getsize(path) // (4 * dimension)
+            return
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, suffix=".f32")
+        self._file = os.fdopen(fd, "w+b")
+        self._source = self._file
+        self.count = 0
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            # Platforms that can't unlink open files keep it until the cache dir is cleared
+            pass
+
+    def append(self, vectors: np.ndarray):
+        if self._file is None:
+            raise ValueError("Saved exact vectors are read-only")
+        self._file.seek(0, os.SEEK_END)
+        self._file.write(np.ascontiguousarray(vectors, dtype=np.float32).tobytes())
+        self._file.flush()
+        self.count += len(vectors)
+        self._mmap = None
+
+    def __len__(self) -> int:
+        return self.count
+
+    def __getitem__(self, rows) -> np.ndarray:
+        if self._mmap is None:
+            self._mmap = np.memmap(self._source, dtype=np.float32, mode="r", shape=(self.count, self.dimension))
+        return self._mmap[rows]
+
+    def save(self, path: str):
+        with open(path, "wb") as f:
+            for start in range(0, self.count, _SAVE_ROWS):
+                f.write(np.ascontiguousarray(self[start:start + _SAVE_ROWS]).tobytes())
+
+
+def rerank(exact, query: np.ndarray, ids: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Re-scores candidate ids (-1 = no result) by exact squared L2 distance to query
+    using exact[ids] (an array or ExactVectors) and returns the best k as (distances, ids).
+    """
+    ids = np.sort(ids[ids >= 0])  # ascending rows read the map sequentially
+    if not len(ids):
+        return np.empty(0, dtype=np.float32), ids
+    distances = ((exact[ids] - query) ** 2).sum(axis=1)
+    best = np.argsort(distances, kind="stable")[:k]
+    return distances[best], ids[best]
+
+
+class RerankedFAISS(FAISS):
+    """
+    A FAISS store over a compressed index (fp16/int8 scalar-quantized or PQ codes).
+    Searches fetch rerank_factor times the requested number of candidates from the
+    index, then order them by exact L2 distance against the float32 vectors in
+    `exact`, so results and scores match an exact index whenever the true neighbours
+    are in the shortlist. Only L2 distance is supported.
+    """
+
+    def __init__(
+        self, embedding_function, index, docstore, index_to_docstore_id: Dict[int, str],
+        exact: ExactVectors, rerank_factor: int = RERANK_FACTOR, **kwargs
+    ):
+        super().__init__(embedding_function, index, docstore, index_to_docstore_id, **kwargs)
+        self.exact = exact
+        self.rerank_factor = rerank_factor
+
+    def similarity_search_with_score_by_vector(
+        self,
+        embedding: List[float],
+        k: int = 4,
+        filter: Optional[Union[Callable, Dict[str, Any]]] = None,
+        fetch_k: int = 20,
+        **kwargs: Any,
+    ) -> List[Tuple[Document, float]]:
+        vector = np.array([embedding], dtype=np.float32)
+        candidates = (k if filter is None else fetch_k) * max(self.rerank_factor, 1)
+        _, indices = self.index.search(vector, candidates)
+        scores, ids = rerank(self.exact, vector[0], indices[0], candidates)
+
+        filter_func = self._create_filter_func(filter) if filter is not None else None
+        docs = []
+        for score, i in zip(scores, ids):
+            _id = self.index_to_docstore_id[int(i)]
+            doc = self.docstore.search(_id)
+            if not isinstance(doc, Document):
+                raise ValueError(f"Could not find document for id {_id}, got {doc}")
+            if filter_func is None or filter_func(doc.metadata):
+                docs.append((doc, float(score)))
+
+        score_threshold = kwargs.get("score_threshold")
+        if score_threshold is not None:
+            docs = [(doc, score) for doc, score in docs if score <= score_threshold]
+        return docs[:k]
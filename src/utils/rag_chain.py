@@ -1,14 +1,17 @@
 from langchain_core.prompts import ChatPromptTemplate
 from langchain.chains import create_retrieval_chain
 from langchain.chains.combine_documents import create_stuff_documents_chain
-from langchain_core.runnables import Runnable, RunnableLambda
+from langchain_core.runnables import Runnable, RunnableLambda, RunnablePassthrough
 from langchain_core.vectorstores import VectorStore
 from langchain_core.language_models import BaseChatModel
 from langchain_core.output_parsers import StrOutputParser
-from typing import Optional
+from langchain_core.documents import Document
+from typing import List, Optional
 from datetime import date
 import os
 
+from src.utils.cache import hash_key
+
 def load_system_prompt() -> str:
     """Loads the system prompt from config file and replaces {{today}} with current date."""
     config_path = os.path.join(os.path.dirname(__file__), "../../config/system_prompt.txt")
@@ -47,18 +50,52 @@ def get_rag_chain(llm: BaseChatModel, vectorstore: Optional[VectorStore], k: int
     
     retriever = vectorstore.as_retriever(search_kwargs={"k": k})
     
+    question_answer_chain = create_stuff_documents_chain(llm, _get_rag_prompt(system_prompt_text))
+    rag_chain = create_retrieval_chain(retriever, question_answer_chain)
+    
+    return rag_chain
+
+def get_context_rag_chain(llm: BaseChatModel) -> Runnable:
+    """
+    Creates a RAG chain that takes pre-retrieved context instead of a retriever.
+    Input keys: input, context (list of Documents). Output matches get_rag_chain:
+    {"input": ..., "context": [...], "answer": ...}
+    """
+    question_answer_chain = create_stuff_documents_chain(llm, _get_rag_prompt(load_system_prompt()))
+    return RunnablePassthrough.assign(answer=question_answer_chain)
+
+def _get_rag_prompt(system_prompt_text: str) -> ChatPromptTemplate:
+    """Builds the RAG prompt: system prompt with a retrieved-context section appended."""
     # Append context placeholder to system prompt for RAG
     rag_system_prompt = system_prompt_text + "\n\n---------------------------------------------------------------------\nRETRIEVED CONTEXT\n---------------------------------------------------------------------\n{context}"
     
-    prompt = ChatPromptTemplate.from_messages(
+    return ChatPromptTemplate.from_messages(
         [
             ("system", rag_system_prompt),
             ("human", "{input}"),
         ]
     )
-    
-    question_answer_chain = create_stuff_documents_chain(llm, prompt)
-    rag_chain = create_retrieval_chain(retriever, question_answer_chain)
-    
-    return rag_chain
 
+
+def render_rag_prompt(question: str, context_docs: Optional[List[Document]]) -> str:
+    """
+    Renders the exact prompt text a generation call would send, for use as a cache key.
+    Documents are joined the same way create_stuff_documents_chain does by default.
+    """
+    system_prompt_text = load_system_prompt()
+    if context_docs is None:
+        prompt = ChatPromptTemplate.from_messages([
+            ("system", system_prompt_text),
+            ("human", "{input}"),
+        ])
+        messages = prompt.format_messages(input=question)
+    else:
+        context = "\n\n".join(doc.page_content for doc in context_docs)
+        messages = _get_rag_prompt(system_prompt_text).format_messages(input=question, context=context)
+    return "\n\n".join(f"{m.type}: {m.content}" for m in messages)
+
+def generation_cache_key(
+    model_name: str, temperature: float, top_p: float, question: str, context_docs: Optional[List[Document]]
+) -> str:
+    """Cache key for a generated answer: the fully rendered prompt plus model parameters."""
+    return hash_key("generation", model_name, temperature, top_p, render_rag_prompt(question, context_docs))
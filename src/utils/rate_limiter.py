@@ -0,0 +1,174 @@
+import asyncio
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from typing import Any, Dict, Optional
+
+
+class RateLimiter:
+    """
+    Token-bucket limiter for one provider, with separate requests-per-minute and
+    tokens-per-minute budgets. A budget of None/0 means unlimited.
+
+    Callers reserve capacity under a short lock and then sleep outside it, so the
+    same instance is safe to share between threads and asyncio tasks.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+        default_backoff: float = 5.0,
+        clock=time.monotonic
+    ):
+        self.requests_per_minute = requests_per_minute or None
+        self.tokens_per_minute = tokens_per_minute or None
+        self.default_backoff = default_backoff
+        self._clock = clock
+        self._lock = threading.Lock()
+
+        now = clock()
+        self._last_refill = now
+        self._request_allowance = float(self.requests_per_minute or 0)
+        self._token_allowance = float(self.tokens_per_minute or 0)
+        self._blocked_until = now
+
+    def _refill(self, now: float):
+        elapsed = now - self._last_refill
+        self._last_refill = now
+        if self.requests_per_minute:
+            self._request_allowance = min(
+                self.requests_per_minute, self._request_allowance + elapsed * self.requests_per_minute / 60.0
+            )
+        if self.tokens_per_minute:
+            self._token_allowance = min(
+                self.tokens_per_minute, self._token_allowance + elapsed * self.tokens_per_minute / 60.0
+            )
+
+    def reserve(self, tokens: int = 0) -> float:
+        """
+        Reserves one request and `tokens` tokens, returning how many seconds the caller
+        must wait before sending. The allowance may go negative; later callers then
+        queue up behind this reservation instead of all firing at once.
+        """
+        with self._lock:
+            now = self._clock()
+            self._refill(now)
+            wait = max(0.0, self._blocked_until - now)
+
+            if self.requests_per_minute:
+                self._request_allowance -= 1
+                if self._request_allowance < 0:
+                    wait = max(wait, -self._request_allowance * 60.0 / self.requests_per_minute)
+
+            if self.tokens_per_minute and tokens:
+                # A single request larger than the whole budget can never fit; cap it so we don't deadlock
+                tokens = min(tokens, self.tokens_per_minute)
+                self._token_allowance -= tokens
+                if self._token_allowance < 0:
+                    wait = max(wait, -self._token_allowance * 60.0 / self.tokens_per_minute)
+
+            return wait
+
+    def _blocked_wait(self) -> float:
+        """Seconds left on the current backoff, if any."""
+        with self._lock:
+            return max(0.0, self._blocked_until - self._clock())
+
+    def acquire(self, tokens: int = 0) -> float:
+        """
+        Blocks the calling thread until the request may be sent. Returns seconds waited.
+        A backoff() issued while sleeping holds this request back until it ends too.
+        """
+        waited = 0.0
+        wait = self.reserve(tokens)
+        while wait > 0:
+            time.sleep(wait)
+            waited += wait
+            wait = self._blocked_wait()
+        return waited
+
+    async def acquire_async(self, tokens: int = 0) -> float:
+        """Awaits until the request may be sent without blocking the event loop. Returns seconds waited."""
+        waited = 0.0
+        wait = self.reserve(tokens)
+        while wait > 0:
+            await asyncio.sleep(wait)
+            waited += wait
+            wait = self._blocked_wait()
+        return waited
+
+    def backoff(self, seconds: float):
+        """Pauses every caller sharing this limiter for `seconds` from now."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, self._clock() + seconds)
+
+    def observe_error(self, error: Exception) -> bool:
+        """
+        Applies a global backoff if `error` is a provider rate-limit error, honoring its
+        Retry-After header when present. Returns True if a backoff was applied.
+        """
+        if not is_rate_limit_error(error):
+            return False
+        retry_after = get_retry_after(error)
+        self.backoff(retry_after if retry_after is not None else self.default_backoff)
+        return True
+
+
+def is_rate_limit_error(error: Exception) -> bool:
+    """Detects 429s from the OpenAI, Groq and Google clients without importing each SDK."""
+    if type(error).__name__ in ("RateLimitError", "ResourceExhausted", "TooManyRequests"):
+        return True
+    return getattr(error, "status_code", None) == 429
+
+
+def get_retry_after(error: Exception) -> Optional[float]:
+    """Extracts a Retry-After delay in seconds from an SDK error's HTTP response, if any."""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    value = headers.get("retry-after-ms")
+    if value is not None:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        # HTTP-date form
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+_limiters: Dict[str, RateLimiter] = {}
+_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(provider: str, config: Dict[str, Any]) -> RateLimiter:
+    """Returns the process-wide limiter for a provider, creating it from config on first use."""
+    with _limiters_lock:
+        limiter = _limiters.get(provider)
+        if limiter is None:
+            limiter = RateLimiter(
+                requests_per_minute=config.get("requests_per_minute"),
+                tokens_per_minute=config.get("tokens_per_minute"),
+                default_backoff=config.get("wait_min", 5) or 5
+            )
+            _limiters[provider] = limiter
+        return limiter
+
+
+def reset_rate_limiters():
+    """Drops all shared limiters (e.g. after the model config changes)."""
+    with _limiters_lock:
+        _limiters.clear()
@@ -0,0 +1,73 @@
+import sys
+import threading
+import time
+from typing import Any
+
+
+class Reporter:
+    """
+    Receives progress, status and error messages from the experiment engine.
+    The engine only talks to this interface, so it can run under Streamlit, a
+    terminal, a cron job or a test harness. Methods are called from the thread
+    that called run_batch_experiment, never from worker threads.
+    """
+
+    def info(self, message: str):
+        """A status update that replaces the previous one."""
+        pass
+
+    def error(self, message: str):
+        """A non-fatal error (e.g. one failed cell). The run continues."""
+        print(f"Error: {message}", file=sys.stderr)
+
+    def progress(self, fraction: float):
+        """Overall completion, between 0.0 and 1.0."""
+        pass
+
+
+class PlaceholderReporter(Reporter):
+    """
+    Duck-typed adapter for a progress bar (with .progress()) and a status
+    placeholder (with .info()). Used for the legacy progress_bar/status_placeholder
+    arguments without importing any UI library.
+    """
+
+    def __init__(self, progress_bar: Any = None, status_placeholder: Any = None):
+        self.progress_bar = progress_bar
+        self.status_placeholder = status_placeholder
+
+    def info(self, message: str):
+        if self.status_placeholder:
+            self.status_placeholder.info(message)
+
+    def progress(self, fraction: float):
+        if self.progress_bar:
+            try:
+                self.progress_bar.progress(min(fraction, 1.0))
+            except: pass
+
+
+class ConsoleReporter(Reporter):
+    """Plain-text reporter for headless runs. Progress is printed at most every `interval` seconds."""
+
+    def __init__(self, stream=None, interval: float = 2.0):
+        self.stream = stream or sys.stdout
+        self.interval = interval
+        self._last_progress = 0.0
+        self._lock = threading.Lock()
+
+    def _write(self, line: str, stream=None):
+        with self._lock:
+            print(line, file=stream or self.stream, flush=True)
+
+    def info(self, message: str):
+        self._write(message)
+
+    def error(self, message: str):
+        self._write(f"ERROR: {message}", stream=sys.stderr)
+
+    def progress(self, fraction: float):
+        now = time.time()
+        if fraction >= 1.0 or now - self._last_progress >= self.interval:
+            self._last_progress = now
+            self._write(f"Progress: {min(fraction, 1.0) * 100:.0f}%")
@@ -0,0 +1,77 @@
+from typing import List, Optional
+
+from src.utils.llm_manager import get_ollama_model_id, load_ollama_model, unload_ollama_model, set_ollama_keep_alive
+from src.utils.run_log import RunLog
+from src.utils.tracing import Tracer
+
+# While a stage runs its model stays loaded this long after each call. Every request
+# resets the timer, so calls must pass it too or they fall back to Ollama's 5 minutes.
+OLLAMA_STAGE_KEEP_ALIVE = "30m"
+# When a run ends its models stay loaded this long, so a follow-up run can reuse them
+OLLAMA_IDLE_KEEP_ALIVE = "5m"
+
+
+def is_local_model(model_name: str) -> bool:
+    return "Ollama" in model_name
+
+
+def same_local_model(model_a: str, model_b: str) -> bool:
+    """True if both UI names resolve to the same Ollama model."""
+    return is_local_model(model_a) and is_local_model(model_b) and get_ollama_model_id(model_a) == get_ollama_model_id(model_b)
+
+
+def stage_keep_alive(model_name: str) -> Optional[str]:
+    """keep_alive to pass to get_llm for a model used during a stage (None for hosted models)."""
+    return OLLAMA_STAGE_KEEP_ALIVE if is_local_model(model_name) else None
+
+
+class ModelResidency:
+    """
+    Decides when local (Ollama) models are loaded and unloaded during a run.
+
+    A model is loaded explicitly once, when the first stage that needs it starts.
+    activate(model, exclusive=True) first unloads any other resident model, which is
+    how phased runs free the generator's memory for the judge; a model that is
+    both generator and judge is never unloaded between stages. release() hands the
+    resident models back to Ollama's idle keep_alive instead of unloading them.
+    Loads, unloads and releases are recorded as trace spans and run-log events.
+    Hosted models are ignored.
+    """
+
+    def __init__(self, run_log: Optional[RunLog] = None, tracer: Optional[Tracer] = None):
+        self.run_log = run_log
+        self.tracer = tracer or Tracer()
+        self.resident: List[str] = []
+
+    def _is_resident(self, model_name: str) -> bool:
+        return any(same_local_model(model_name, m) for m in self.resident)
+
+    def _record(self, event: str, model_name: str, **fields):
+        model_id = get_ollama_model_id(model_name)
+        print(f"Model {event}: {model_id} {fields}")
+        if self.run_log is not None:
+            self.run_log.append_event(event, model=model_id, **fields)
+
+    def activate(self, model_name: str, exclusive: bool = False):
+        """Makes model_name resident for the coming stage, unloading other models first if exclusive."""
+        if not is_local_model(model_name):
+            return
+        if exclusive:
+            for other in [m for m in self.resident if not same_local_model(m, model_name)]:
+                with self.tracer.span("model_unload", model=other) as span:
+                    ok = unload_ollama_model(other)
+                self._record("model_unload", other, ok=ok, seconds=round(span.duration, 3))
+                self.resident.remove(other)
+        if self._is_resident(model_name):
+            return
+        with self.tracer.span("model_load", model=model_name, keep_alive=OLLAMA_STAGE_KEEP_ALIVE) as span:
+            ok = load_ollama_model(model_name, OLLAMA_STAGE_KEEP_ALIVE)
+        self._record("model_load", model_name, ok=ok, seconds=round(span.duration, 3), keep_alive=OLLAMA_STAGE_KEEP_ALIVE)
+        self.resident.append(model_name)
+
+    def release(self):
+        """Lets resident models expire on Ollama's idle timer rather than unloading them now."""
+        for model_name in self.resident:
+            ok = set_ollama_keep_alive(model_name, OLLAMA_IDLE_KEEP_ALIVE)
+            self._record("model_release", model_name, ok=ok, keep_alive=OLLAMA_IDLE_KEEP_ALIVE)
+        self.resident = []
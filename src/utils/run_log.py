@@ -0,0 +1,134 @@
+import json
+import os
+import threading
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from src.utils.cache import hash_file, hash_key
+
+# Directory for append-only experiment run logs (override with RAG_EVAL_RUNS_DIR)
+RUNS_DIR = os.getenv(
+    "RAG_EVAL_RUNS_DIR",
+    os.path.join(os.path.dirname(__file__), "../../runs")
+)
+
+
+def new_run_id() -> str:
+    """Returns a sortable, unique run ID like 20261016-153000-1a2b3c."""
+    return f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:6]}"
+
+
+def corpus_fingerprint(file_paths: List[str]) -> str:
+    """
+    Identifies a document set by content, independent of where the files live
+    (the app writes uploads to a fresh temp dir every run).
+    """
+    if not file_paths:
+        return "no-documents"
+    return hash_key(sorted(hash_file(p) for p in file_paths))
+
+
+def cell_key(
+    corpus_id: str, model_name: str, judge_model: str, question: str,
+    chunk_size: Optional[int], chunk_overlap: Optional[int], k: int, temperature: float, top_p: float,
+    settings: Optional[Dict[str, Any]] = None
+) -> str:
+    """
+    Deterministic key for one grid cell, stable across processes and restarts.
+    `settings` holds the run-wide options that change a cell's result (retrieval
+    backend, judging mode, ...; see run_settings), so resuming with different ones
+    recomputes the cells instead of reusing rows produced under the old ones.
+    """
+    parts = [
+        "cell", corpus_id, model_name, judge_model, question,
+        chunk_size, chunk_overlap, k, temperature, top_p
+    ]
+    if settings:
+        parts.append(settings)
+    return hash_key(*parts)
+
+
+def run_settings(config: Dict[str, Any], retrieval: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    The options in an experiment config, besides the grid itself, that change cell
+    results, with the engine's defaults filled in. `retrieval` holds the retrieval
+    options the caller resolved (index backend, vector storage, ...); pass None when
+    the run has no documents to retrieve from.
+    """
+    settings = {"judge_batch_size": max(int(config.get("judge_batch_size", 1)), 1)}
+    if retrieval is not None:
+        settings.update(retrieval)
+    return settings
+
+
+def list_runs(runs_dir: Optional[str] = None) -> List[str]:
+    """Returns existing run IDs, newest first."""
+    runs_dir = runs_dir or RUNS_DIR
+    if not os.path.isdir(runs_dir):
+        return []
+    run_ids = [f[:-len(".jsonl")] for f in os.listdir(runs_dir) if f.endswith(".jsonl")]
+    return sorted(run_ids, reverse=True)
+
+
+class RunLog:
+    """
+    Append-only JSONL log of completed grid cells for one run.
+    Each line is {"cell_key": ..., "completed_at": ..., "row": {...}} and is flushed
+    to disk as soon as the cell completes, so a crashed run loses at most the cells
+    that were in flight. Run events such as model loads are interleaved as
+    {"event": ..., "at": ..., ...} lines.
+    """
+
+    def __init__(self, run_id: str, runs_dir: Optional[str] = None):
+        runs_dir = runs_dir or RUNS_DIR
+        os.makedirs(runs_dir, exist_ok=True)
+        self.run_id = run_id
+        self.path = os.path.join(runs_dir, f"{run_id}.jsonl")
+        self._lock = threading.Lock()
+
+    def load(self) -> Dict[str, Dict[str, Any]]:
+        """Returns completed rows keyed by cell key. A truncated last line (crash mid-write) is ignored."""
+        completed = {}
+        if not os.path.exists(self.path):
+            return completed
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if "cell_key" in record:
+                    completed[record["cell_key"]] = record["row"]
+        return completed
+
+    def append(self, key: str, row: Dict[str, Any]):
+        """Durably records one completed cell. Safe to call from worker threads."""
+        self._write({"cell_key": key, "completed_at": time.time(), "row": row})
+
+    def append_event(self, event: str, **fields: Any):
+        """Records a run event (e.g. a model load/unload) as {"event": ..., "at": ..., ...}; ignored by load()."""
+        self._write({"event": event, "at": time.time(), **fields})
+
+    def events(self) -> List[Dict[str, Any]]:
+        """Returns the run's recorded events in order."""
+        if not os.path.exists(self.path):
+            return []
+        events = []
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if "event" in record:
+                    events.append(record)
+        return events
+
+    def _write(self, record: Dict[str, Any]):
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line + "\n")
+                f.flush()
+                os.fsync(f.fileno())
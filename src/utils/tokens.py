@@ -0,0 +1,26 @@
+from functools import lru_cache
+
+# Rough characters-per-token ratio used when tiktoken's encoding can't be loaded
+# (e.g. offline first run, since tiktoken downloads its BPE files on demand).
+CHARS_PER_TOKEN = 4
+
+
+@lru_cache(maxsize=1)
+def _get_encoding():
+    """Loads the tiktoken encoding once, or returns None if unavailable."""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        print(f"Warning: tiktoken unavailable ({e}). Falling back to character-based token estimates.")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Counts tokens in text with tiktoken, falling back to a character heuristic."""
+    if not text:
+        return 0
+    encoding = _get_encoding()
+    if encoding is None:
+        return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+    return len(encoding.encode(text, disallowed_special=()))
@@ -0,0 +1,117 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, List
+
+# Span attributes that are summed per stage in the summary table
+SUMMED_ATTRIBUTES = ["input_tokens", "output_tokens", "retries", "rate_limit_wait"]
+
+
+class Span:
+    """One timed stage. Attributes can be added while the span is open (e.g. token counts once known)."""
+
+    def __init__(self, name: str, start: float, attrs: Dict[str, Any]):
+        self.name = name
+        self.start = start
+        self.end = None
+        self.thread = threading.current_thread().name
+        self.attrs = dict(attrs)
+
+    def set(self, **attrs):
+        self.attrs.update(attrs)
+
+    @property
+    def duration(self) -> float:
+        return (self.end if self.end is not None else time.perf_counter()) - self.start
+
+    def to_dict(self, origin: float) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "start": round(self.start - origin, 6),
+            "end": round((self.end if self.end is not None else self.start) - origin, 6),
+            "duration": round(self.duration, 6),
+            "thread": self.thread,
+            "attrs": self.attrs
+        }
+
+
+class Tracer:
+    """
+    Collects timed spans for every pipeline stage of a run. Thread-safe, so worker
+    threads record their own spans. Times are in seconds from tracer creation.
+    """
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.started_at = time.time()
+        self._spans: List[Span] = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attrs):
+        """Times the enclosed block. Exceptions are recorded on the span and re-raised."""
+        current = Span(name, time.perf_counter(), attrs)
+        try:
+            yield current
+        except Exception as e:
+            current.set(error=type(e).__name__)
+            raise
+        finally:
+            current.end = time.perf_counter()
+            with self._lock:
+                self._spans.append(current)
+
+    @property
+    def spans(self) -> List[Span]:
+        with self._lock:
+            return list(self._spans)
+
+    def wall_time(self) -> float:
+        spans = self.spans
+        if not spans:
+            return 0.0
+        return max(s.end for s in spans) - min(s.start for s in spans)
+
+    def summary(self) -> List[Dict[str, Any]]:
+        """
+        One row per stage, in order of first appearance. "Share" is the stage's summed
+        time over the run's wall time, so concurrent stages can add up to more than 100%.
+        """
+        wall = self.wall_time()
+        stages: Dict[str, Dict[str, Any]] = {}
+        for s in sorted(self.spans, key=lambda s: s.start):
+            row = stages.setdefault(s.name, {
+                "Stage": s.name, "Calls": 0, "Total (s)": 0.0, "Max (s)": 0.0,
+                "Cache Hits": 0, "Errors": 0, **{attr: 0 for attr in SUMMED_ATTRIBUTES}
+            })
+            row["Calls"] += 1
+            row["Total (s)"] += s.duration
+            row["Max (s)"] = max(row["Max (s)"], s.duration)
+            row["Cache Hits"] += 1 if s.attrs.get("cached") else 0
+            row["Errors"] += 1 if s.attrs.get("error") else 0
+            for attr in SUMMED_ATTRIBUTES:
+                row[attr] += s.attrs.get(attr) or 0
+
+        rows = []
+        for row in stages.values():
+            row["Mean (s)"] = row["Total (s)"] / row["Calls"]
+            row["Share"] = row["Total (s)"] / wall if wall else 0.0
+            for key in ["Total (s)", "Max (s)", "Mean (s)", "rate_limit_wait"]:
+                row[key] = round(row[key], 4)
+            row["Share"] = round(row["Share"], 4)
+            rows.append(row)
+        return rows
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "started_at": self.started_at,
+            "wall_time": round(self.wall_time(), 6),
+            "spans": [s.to_dict(self.origin) for s in sorted(self.spans, key=lambda s: s.start)],
+            "summary": self.summary()
+        }
+
+    def write(self, path: str):
+        """Writes the trace as JSON."""
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, default=str)
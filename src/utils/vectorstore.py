@@ -1,44 +1,474 @@
 import os
+import collections
+import concurrent.futures
+import math
+import time
+import uuid
+
+import faiss
+import numpy as np
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
 from langchain_community.embeddings import OllamaEmbeddings
 from langchain_core.documents import Document
-from typing import List
+from langchain_core.embeddings import Embeddings
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from src.utils.cache import CACHE_DIR
+from src.utils.citations import CitationIndex
+from src.utils.embedding_cache import CachedEmbeddings, EmbeddingCache, embedding_model_id
+from src.utils.index_store import IndexStore
+from src.utils.memory import check_memory
+from src.utils.quantized import ExactVectors, RerankedFAISS, RERANK_FACTOR
 
 # Batch size for embedding (to avoid memory issues)
 EMBEDDING_BATCH_SIZE = 100
+# Embedding batches in flight at once while building an index
+EMBEDDING_CONCURRENCY = 4
+
+# FAISS index backends; "auto" picks one by corpus size
+INDEX_TYPES = ["auto", "flat", "ivf", "hnsw", "ivfpq"]
+# Corpus sizes (vectors) at which "auto" moves to the next backend
+FLAT_MAX_VECTORS = 20000
+HNSW_MAX_VECTORS = 200000
+IVF_MAX_VECTORS = 1000000
+# Build/search defaults; override through index_params
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 80
+HNSW_EF_SEARCH = 64
+IVF_NPROBE = 16
+PQ_DIMS_PER_CODE = 8
+
+# How index vectors are stored; anything but float32 is re-ranked against exact vectors on disk
+VECTOR_STORAGES = ["float32", "fp16", "int8", "pq"]
+SCALAR_QUANTIZERS = {"fp16": faiss.ScalarQuantizer.QT_fp16, "int8": faiss.ScalarQuantizer.QT_8bit}
+
+# Extra vector candidates fetched when a question's citations point at a chapter, to favour its chunks
+CITATION_FETCH_FACTOR = 3
 
-def create_vectorstore(documents: List[Document]) -> FAISS:
-    """Creates a FAISS vector store from a list of documents using local Ollama embeddings."""
-    
+# Parallel requests when embedding a batch of questions
+QUERY_EMBEDDING_WORKERS = 4
+
+# Replaces the default embedding model when set (see set_embeddings)
+_embeddings_override: Optional[Embeddings] = None
+
+def set_embeddings(embeddings: Optional[Embeddings]):
+    """Uses `embeddings` for every index and query from now on (e.g. an offline stand-in); None restores the default."""
+    global _embeddings_override
+    _embeddings_override = embeddings
+
+def get_embeddings() -> Embeddings:
+    """Returns the embedding model used for every index."""
+    if _embeddings_override is not None:
+        return _embeddings_override
     # Use Ollama embeddings (local, no rate limits)
     # nomic-embed-text is a good general-purpose embedding model
-    embeddings = OllamaEmbeddings(
+    return OllamaEmbeddings(
         model="nomic-embed-text",
         base_url="http://localhost:11434"
     )
-    
-    # Batch documents to avoid memory issues with large document sets
-    if len(documents) <= EMBEDDING_BATCH_SIZE:
-        # Small enough to embed in one call
-        return FAISS.from_documents(documents, embeddings)
-    
-    # Process in batches
-    print(f"Embedding {len(documents)} documents in batches of {EMBEDDING_BATCH_SIZE}...")
-    vectorstore = None
-    
-    for i in range(0, len(documents), EMBEDDING_BATCH_SIZE):
-        batch = documents[i:i + EMBEDDING_BATCH_SIZE]
-        batch_num = (i // EMBEDDING_BATCH_SIZE) + 1
-        total_batches = (len(documents) + EMBEDDING_BATCH_SIZE - 1) // EMBEDDING_BATCH_SIZE
-        print(f"  Batch {batch_num}/{total_batches} ({len(batch)} docs)...")
-        
-        if vectorstore is None:
-            vectorstore = FAISS.from_documents(batch, embeddings)
+
+def get_embedding_cache(config: Optional[Dict[str, Any]] = None) -> Optional[EmbeddingCache]:
+    """The chunk embedding cache for the current embedding model, or None if config["use_embedding_cache"] is off."""
+    config = config or {}
+    if not config.get("use_embedding_cache", True):
+        return None
+    return EmbeddingCache(embedding_model_id(get_embeddings()), cache_dir=config.get("cache_dir"))
+
+def current_embedding_model() -> str:
+    """Identifier of the embedding model new indexes are built with."""
+    return embedding_model_id(get_embeddings())
+
+def load_vectorstore(
+    index_store: IndexStore, key: str, rerank_factor: Optional[int] = None, citations: bool = True
+) -> Optional[FAISS]:
+    """
+    A previously saved index from index_store, queried with the current embedding model.
+    rerank_factor, if given, replaces the saved one for compressed indexes. With
+    citations, an index saved without a citation index gets one built from its chunks.
+    """
+    vectorstore = index_store.get(key, get_embeddings())
+    if vectorstore is None:
+        return None
+    if rerank_factor and isinstance(vectorstore, RerankedFAISS):
+        vectorstore.rerank_factor = rerank_factor
+    if not citations:
+        vectorstore.citation_index = None
+    elif vectorstore.citation_index is None:
+        vectorstore.citation_index = CitationIndex.from_docstore(vectorstore.docstore, vectorstore.index_to_docstore_id)
+    return vectorstore
+
+def _index_embeddings(embedding_cache: Optional[EmbeddingCache]) -> Embeddings:
+    embeddings = get_embeddings()
+    return CachedEmbeddings(embeddings, embedding_cache) if embedding_cache is not None else embeddings
+
+def _embed_batches(
+    embeddings: Embeddings, batches: Iterable[List[Document]], max_workers: int,
+    before_submit: Optional[Callable[[List[Document]], None]] = None
+) -> Iterator[Tuple[List[Document], List[List[float]]]]:
+    """
+    Embeds batches of documents with up to max_workers requests in flight, yielding
+    (batch, vectors) in input order. Batches are pulled from `batches` only as slots
+    free up, so a lazy stream is never read more than max_workers batches ahead.
+    before_submit, if given, is called with each batch before it is sent.
+    """
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(max_workers, 1)) as executor:
+        pending = collections.deque()
+        for batch in batches:
+            if len(pending) >= max(max_workers, 1):
+                done_batch, future = pending.popleft()
+                yield done_batch, future.result()
+            if before_submit is not None:
+                before_submit(batch)
+            pending.append((batch, executor.submit(embeddings.embed_documents, [d.page_content for d in batch])))
+        while pending:
+            done_batch, future = pending.popleft()
+            yield done_batch, future.result()
+
+
+def _batched(documents: Iterable[Document], batch_size: int) -> Iterator[List[Document]]:
+    batch = []
+    for doc in documents:
+        batch.append(doc)
+        if len(batch) >= batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def resolve_index_type(index_type: str, num_vectors: int) -> str:
+    """The backend for index_type; "auto" is flat for small corpora, then HNSW, IVF and IVF-PQ as they grow."""
+    if index_type not in INDEX_TYPES:
+        raise ValueError(f"Unknown index type '{index_type}' (expected one of {', '.join(INDEX_TYPES)})")
+    if index_type != "auto":
+        return index_type
+    if num_vectors < FLAT_MAX_VECTORS:
+        return "flat"
+    if num_vectors < HNSW_MAX_VECTORS:
+        return "hnsw"
+    if num_vectors < IVF_MAX_VECTORS:
+        return "ivf"
+    return "ivfpq"
+
+
+def _check_index_settings(index_type: str, storage: str):
+    resolve_index_type(index_type, 0)
+    if storage not in VECTOR_STORAGES:
+        raise ValueError(f"Unknown vector storage '{storage}' (expected one of {', '.join(VECTOR_STORAGES)})")
+
+
+def build_index(
+    vectors: np.ndarray, index_type: str = "auto", index_params: Optional[Dict[str, Any]] = None, storage: str = "float32"
+) -> faiss.Index:
+    """
+    An L2 FAISS index of the given type, trained on `vectors` where needed but empty.
+
+    storage selects how vectors are kept: "float32" as is, "fp16" or "int8" scalar
+    quantized (2x / 4x smaller), "pq" as product-quantized codes (PQ_DIMS_PER_CODE
+    dimensions per byte). "ivfpq" always stores PQ codes.
+
+    index_params tunes the backend: "m", "ef_construction", "ef_search" (HNSW);
+    "nlist", "nprobe" (IVF, IVF-PQ); "pq_m", "pq_bits" (PQ codes). Unset values
+    scale with the number of training vectors. Search settings are stored in the
+    index, so they survive saving and loading.
+    """
+    _check_index_settings(index_type, storage)
+    params = index_params or {}
+    n, dimension = vectors.shape
+    index_type = resolve_index_type(index_type, n)
+    if index_type == "ivfpq":
+        storage = "pq"
+    if storage == "pq":
+        pq_m = int(params.get("pq_m", _pq_subquantizers(dimension)))
+        # Each sub-quantizer has 2**pq_bits centroids to train
+        pq_bits = int(params.get("pq_bits", max(1, min(8, int(math.log2(max(n // 39, 2)))))))
+    sq_type = SCALAR_QUANTIZERS.get(storage)
+
+    if index_type == "flat":
+        if storage == "float32":
+            index = faiss.IndexFlatL2(dimension)
+        elif storage == "pq":
+            index = faiss.IndexPQ(dimension, pq_m, pq_bits)
         else:
-            # Create temp vectorstore and merge
-            temp_vs = FAISS.from_documents(batch, embeddings)
-            vectorstore.merge_from(temp_vs)
-    
-    print(f"Embedding complete. Total documents: {len(documents)}")
+            index = faiss.IndexScalarQuantizer(dimension, sq_type)
+    elif index_type == "hnsw":
+        m = int(params.get("m", HNSW_M))
+        if storage == "float32":
+            index = faiss.IndexHNSWFlat(dimension, m)
+        elif storage == "pq":
+            index = faiss.IndexHNSWPQ(dimension, pq_m, m, pq_bits)
+        else:
+            index = faiss.IndexHNSWSQ(dimension, sq_type, m)
+        index.hnsw.efConstruction = int(params.get("ef_construction", HNSW_EF_CONSTRUCTION))
+        index.hnsw.efSearch = int(params.get("ef_search", HNSW_EF_SEARCH))
+    else:
+        # k-means wants ~39 training points per centroid
+        nlist = int(params.get("nlist", max(1, min(int(4 * math.sqrt(n)), n // 39))))
+        quantizer = faiss.IndexFlatL2(dimension)
+        if storage == "float32":
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+        elif storage == "pq":
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, pq_m, pq_bits)
+        else:
+            index = faiss.IndexIVFScalarQuantizer(quantizer, dimension, nlist, sq_type)
+        index.nprobe = min(int(params.get("nprobe", IVF_NPROBE)), nlist)
+    if not index.is_trained:
+        index.train(vectors)
+    return index
+
+
+def _pq_subquantizers(dimension: int) -> int:
+    # The largest divisor of dimension giving at least PQ_DIMS_PER_CODE dims per code
+    for m in range(max(dimension // PQ_DIMS_PER_CODE, 1), 0, -1):
+        if dimension % m == 0:
+            return m
+    return 1
+
+
+def is_compressed(index_type: str, storage: str) -> bool:
+    """Whether an index of this type and storage keeps lossy codes instead of the float32 vectors."""
+    return storage != "float32" or index_type == "ivfpq"
+
+
+def index_memory_bytes(index: faiss.Index) -> int:
+    """Size of the index's serialized form, a close proxy for its resident size."""
+    return int(faiss.serialize_index(index).nbytes)
+
+
+def vector_bytes(index: faiss.Index) -> Tuple[int, int]:
+    """(bytes the index spends on stored vectors, bytes they would take as float32), excluding graph/list overhead."""
+    inner = faiss.downcast_index(index)
+    if isinstance(inner, faiss.IndexHNSW):
+        inner = faiss.downcast_index(inner.storage)
+    return int(inner.code_size) * index.ntotal, 4 * index.d * index.ntotal
+
+
+def _empty_vectorstore(
+    embeddings: Embeddings, vectors: np.ndarray, index_type: str = "flat", index_params: Optional[Dict[str, Any]] = None,
+    storage: str = "float32", rerank_factor: int = RERANK_FACTOR, cache_dir: Optional[str] = None
+) -> FAISS:
+    # Same docstore FAISS.from_documents would create; trained indexes learn from `vectors`
+    index = build_index(vectors, index_type, index_params, storage)
+    if rerank_factor and is_compressed(resolve_index_type(index_type, len(vectors)), storage):
+        exact = ExactVectors(index.d, directory=os.path.join(cache_dir or CACHE_DIR, "exact_vectors"))
+        return RerankedFAISS(embeddings, index, InMemoryDocstore(), {}, exact, rerank_factor)
+    return FAISS(embeddings, index, InMemoryDocstore(), {})
+
+
+def _add_vectors(vectorstore: FAISS, documents: List[Document], vectors: np.ndarray):
+    """Adds pre-computed vectors and their documents the way FAISS.add_documents does (ids from doc.id or uuid4)."""
+    ids = [doc.id or str(uuid.uuid4()) for doc in documents]
+    start = vectorstore.index.ntotal
+    vectorstore.index.add(vectors)
+    if isinstance(vectorstore, RerankedFAISS):
+        vectorstore.exact.append(vectors)
+    vectorstore.docstore.add({
+        id_: Document(id=id_, page_content=doc.page_content, metadata=doc.metadata)
+        for id_, doc in zip(ids, documents)
+    })
+    vectorstore.index_to_docstore_id.update({start + i: id_ for i, id_ in enumerate(ids)})
+    citation_index = getattr(vectorstore, "citation_index", None)
+    if citation_index is not None:
+        citation_index.add(ids, documents)
+
+
+def _report_storage(vectorstore: FAISS, storage: str, span=None):
+    if not isinstance(vectorstore, RerankedFAISS) and storage == "float32":
+        return
+    storage = storage if storage != "float32" else "pq"  # ivfpq
+    stored, full = vector_bytes(vectorstore.index)
+    print(f"Vectors stored as {storage}: {stored / 1048576:.1f} MB instead of {full / 1048576:.1f} MB float32")
+    if span is not None:
+        span.set(vector_storage=storage, vector_mb=round(stored / 1048576, 2), float32_mb=round(full / 1048576, 2))
+
+
+def _report_throughput(count: int, seconds: float, span=None):
+    rate = count / seconds if seconds > 0 else 0.0
+    print(f"Embedded {count} chunks in {seconds:.1f}s ({rate:.1f} chunks/s)")
+    if span is not None:
+        span.set(embed_seconds=round(seconds, 3), chunks_per_s=round(rate, 1))
+
+
+def create_vectorstore(
+    documents: List[Document], embedding_cache: Optional[EmbeddingCache] = None,
+    batch_size: int = EMBEDDING_BATCH_SIZE, max_workers: int = EMBEDDING_CONCURRENCY,
+    index_type: str = "auto", index_params: Optional[Dict[str, Any]] = None,
+    storage: str = "float32", rerank_factor: int = RERANK_FACTOR, cache_dir: Optional[str] = None,
+    citations: bool = True, span=None
+) -> FAISS:
+    """
+    Creates a FAISS vector store from a list of documents using local Ollama embeddings.
+    With an embedding_cache, only chunks it doesn't already hold are embedded.
+
+    Documents are embedded batch_size at a time with up to max_workers requests in
+    flight; the vectors are collected into one float32 array and the index is built
+    once from it. Throughput is printed and, with a span, recorded on it.
+
+    index_type selects the FAISS backend (see build_index); "auto" keeps the exact
+    flat index below FLAT_MAX_VECTORS chunks. With a compressed storage ("fp16",
+    "int8", "pq", or an "ivfpq" index) and a non-zero rerank_factor, the float32
+    vectors go to a memory-mapped file under cache_dir instead, and searches re-rank
+    rerank_factor * k candidates against them (see RerankedFAISS).
+
+    With citations, RCW/WAC/SMC citations in the chunks and their file names are
+    indexed as they are added (vectorstore.citation_index) for retrieve_for_k_values.
+    """
+    _check_index_settings(index_type, storage)  # fail before embedding
+    embeddings = _index_embeddings(embedding_cache)
+    started = time.perf_counter()
+    vectors = None
+    row = 0
+    for batch, batch_vectors in _embed_batches(embeddings, _batched(documents, batch_size), max_workers):
+        batch_array = np.asarray(batch_vectors, dtype=np.float32)
+        if vectors is None:
+            vectors = np.empty((len(documents), batch_array.shape[1]), dtype=np.float32)
+        vectors[row:row + len(batch)] = batch_array
+        row += len(batch)
+    _report_throughput(len(documents), time.perf_counter() - started, span)
+    if vectors is None:
+        raise ValueError("Cannot build an index from an empty list of documents")
+
+    vectorstore = _empty_vectorstore(embeddings, vectors, index_type, index_params, storage, rerank_factor, cache_dir)
+    vectorstore.citation_index = CitationIndex() if citations else None
+    _add_vectors(vectorstore, documents, vectors)
+    if span is not None:
+        span.set(index_type=resolve_index_type(index_type, len(documents)))
+    _report_storage(vectorstore, storage, span)
     return vectorstore
 
+
+def create_vectorstore_streaming(
+    chunks: Iterable[Document], batch_size: int = EMBEDDING_BATCH_SIZE, memory_limit_mb: Optional[float] = None,
+    embedding_cache: Optional[EmbeddingCache] = None, max_workers: int = EMBEDDING_CONCURRENCY,
+    index_type: str = "auto", index_params: Optional[Dict[str, Any]] = None,
+    storage: str = "float32", rerank_factor: int = RERANK_FACTOR, cache_dir: Optional[str] = None,
+    citations: bool = True, span=None
+) -> Tuple[Optional[FAISS], int]:
+    """
+    Builds a FAISS index from a stream of chunks, embedding them batch_size at a time
+    with up to max_workers batches in flight and adding each to the index as it
+    completes, so at most max_workers batches of chunks and vectors are pending at once
+    (the index itself still holds every vector and chunk). Before each batch is sent,
+    resident memory is checked against memory_limit_mb, raising MemoryLimitExceeded above it.
+    Returns (vectorstore, number of chunks); the vectorstore is None if there were no chunks.
+
+    Unless the index needs no training ("flat" or "hnsw" with float32 or fp16
+    storage), the first FLAT_MAX_VECTORS chunks are held back until the index is
+    created: IVF backends and int8/PQ codes are trained on them, and "auto" chooses
+    by their count since the stream's length is unknown (so it never goes past HNSW).
+    storage, rerank_factor and citations work as in create_vectorstore.
+    """
+    _check_index_settings(index_type, storage)  # fail before embedding
+    untrained = index_type in ("flat", "hnsw") and storage in ("float32", "fp16")
+    embeddings = _index_embeddings(embedding_cache)
+    vectorstore = None
+    total = 0
+    started = time.perf_counter()
+    held_docs, held_vectors = [], []
+
+    def before_submit(batch):
+        nonlocal total
+        total += len(batch)
+        check_memory(memory_limit_mb, f"Embedding chunks {total - len(batch) + 1}-{total}")
+
+    def create(vectors):
+        nonlocal vectorstore, index_type
+        if index_type == "auto":
+            index_type = "flat" if len(vectors) < FLAT_MAX_VECTORS else "hnsw"
+        vectorstore = _empty_vectorstore(embeddings, vectors, index_type, index_params, storage, rerank_factor, cache_dir)
+        vectorstore.citation_index = CitationIndex() if citations else None
+        _add_vectors(vectorstore, held_docs, vectors)
+        held_docs.clear()
+        held_vectors.clear()
+
+    for batch, batch_vectors in _embed_batches(embeddings, _batched(chunks, batch_size), max_workers, before_submit):
+        batch_array = np.asarray(batch_vectors, dtype=np.float32)
+        if vectorstore is not None:
+            _add_vectors(vectorstore, batch, batch_array)
+            continue
+        held_docs.extend(batch)
+        held_vectors.append(batch_array)
+        if untrained or len(held_docs) >= FLAT_MAX_VECTORS:
+            create(np.vstack(held_vectors))
+    if vectorstore is None and held_docs:
+        create(np.vstack(held_vectors))
+    if total:
+        _report_throughput(total, time.perf_counter() - started, span)
+        if span is not None:
+            span.set(index_type=index_type)
+        _report_storage(vectorstore, storage, span)
+    return vectorstore, total
+
+
+def embed_queries(vectorstore: FAISS, questions: List[str]) -> List[List[float]]:
+    """
+    Embeds a batch of questions with the vector store's embedding model (as queries, not passages).
+    The Ollama embeddings endpoint takes one text per request, so requests are issued in parallel.
+    """
+    embeddings = vectorstore.embeddings
+    if len(questions) <= 1:
+        return [embeddings.embed_query(q) for q in questions]
+    with concurrent.futures.ThreadPoolExecutor(max_workers=QUERY_EMBEDDING_WORKERS) as executor:
+        return list(executor.map(embeddings.embed_query, questions))
+
+def citation_matches(vectorstore: FAISS, question: str) -> Tuple[List[str], List[str]]:
+    """(exact, related) chunk ids for the citations in question (see CitationIndex.lookup); empty without a citation index."""
+    citation_index = getattr(vectorstore, "citation_index", None)
+    if not isinstance(citation_index, CitationIndex):
+        return [], []
+    return citation_index.lookup(question)
+
+
+def needs_query_embedding(vectorstore: FAISS, question: str, max_k: int) -> bool:
+    """False when chunks citing the question's citations verbatim fill all max_k results, so no search runs."""
+    return len(citation_matches(vectorstore, question)[0]) < max_k
+
+
+def _retrieve(
+    vectorstore: FAISS, question: str, k: int, exact: List[str], related: List[str],
+    query_embedding: Optional[List[float]]
+) -> List[Document]:
+    docs = [vectorstore.docstore.search(id_) for id_ in exact[:k]]
+    if len(docs) < k:
+        fetch_k = k * CITATION_FETCH_FACTOR if related else k
+        if query_embedding is not None:
+            hits = vectorstore.similarity_search_by_vector(query_embedding, k=fetch_k)
+        else:
+            hits = vectorstore.similarity_search(question, k=fetch_k)
+        if exact or related:
+            taken = set(exact[:k])
+            boosted = set(related)
+            hits = [d for d in hits if d.id not in taken]
+            hits = [d for d in hits if d.id in boosted] + [d for d in hits if d.id not in boosted]
+        docs.extend(hits[:k - len(docs)])
+    return docs
+
+
+def retrieve_for_k_values(
+    vectorstore: FAISS, question: str, k_values: List[int], query_embedding: Optional[List[float]] = None
+) -> Dict[int, List[Document]]:
+    """
+    Retrieves the top-k chunks for every k in k_values, embedding the question at most once.
+    Pass a precomputed query_embedding to skip embedding entirely.
+
+    On an exact (flat float32) index the top-k results are a prefix of the top-(max k)
+    results, so one search at max(k_values) serves every k. Approximate and re-ranked
+    indexes (HNSW, IVF, compressed storage) can return a different top-k when asked for
+    more neighbours, so they get one search per k and match a retriever per k exactly.
+    So do questions with related citation matches: a larger k fetches more candidates,
+    which can bring related chunks forward that a smaller k would never see.
+
+    If the question cites RCW/WAC/SMC sections the store has a citation index for,
+    chunks citing them verbatim come first, and when they fill k no search runs at
+    all. Otherwise the search fills the rest, fetching CITATION_FETCH_FACTOR times
+    more candidates so chunks from the cited chapter (related matches) can be moved
+    ahead of other hits.
+    """
+    exact, related = citation_matches(vectorstore, question)
+    if not related and isinstance(getattr(vectorstore, "index", None), faiss.IndexFlat):
+        docs = _retrieve(vectorstore, question, max(k_values), exact, related, query_embedding)
+        return {k: docs[:k] for k in k_values}
+    if query_embedding is None and any(len(exact) < k for k in k_values):
+        query_embedding = vectorstore.embeddings.embed_query(question)
+    return {k: _retrieve(vectorstore, question, k, exact, related, query_embedding) for k in k_values}
@@ -2,25 +2,41 @@ import unittest
 from unittest.mock import MagicMock, patch
 import os
 import sys
+import time
+import threading
+import tempfile
+import gc
+import weakref
+
+import faiss
 
 # Add src to path
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
+from src.utils.tracing import Tracer
+from src.utils.run_log import RunLog
 from src.utils.experiment import run_batch_experiment
 
 class TestExperiment(unittest.TestCase):
 
-    @patch('src.utils.experiment.load_document')
-    @patch('src.utils.experiment.split_documents')
+    def setUp(self):
+        # The embedding cache, index store and document cache are on by default; keep them out of the repo's .cache
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.cache_dir = tmp.name
+
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
     @patch('src.utils.experiment.create_vectorstore')
     @patch('src.utils.experiment.get_llm')
-    @patch('src.utils.experiment.get_rag_chain')
+    @patch('src.utils.experiment.get_context_rag_chain')
     @patch('src.utils.experiment.get_judge_chain')
     def test_run_batch_experiment(self, mock_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load):
         # Setup Mocks
         mock_load.return_value = ["doc"]
-        mock_split.return_value = ["chunk1", "chunk2"]
+        mock_split.return_value.split.return_value = ["chunk1", "chunk2"]
         mock_vs = MagicMock()
+        mock_vs.similarity_search_by_vector.return_value = [MagicMock(page_content="ctx")]
         mock_create_vs.return_value = mock_vs
         
         mock_rag_chain_instance = MagicMock()
@@ -43,8 +59,9 @@ class TestExperiment(unittest.TestCase):
         config = {
             "model_name": "TestModel",
             "judge_model": "TestJudge",
-            "temperature": 0.7,
-            "top_p": 0.9,
+            "cache_dir": self.cache_dir,
+            "temperatures": [0.7],
+            "top_ps": [0.9],
             "chunk_sizes": [1000],
             "chunk_overlaps": [100],
             "k_retrievals": [3]
@@ -63,16 +80,16 @@ class TestExperiment(unittest.TestCase):
         mock_create_vs.assert_called_once() # Should be called once per chunk config
         mock_rag_chain_instance.invoke.assert_called_once()
 
-    @patch('src.utils.experiment.load_document')
-    @patch('src.utils.experiment.split_documents')
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
     @patch('src.utils.experiment.create_vectorstore')
     @patch('src.utils.experiment.get_llm')
-    @patch('src.utils.experiment.get_rag_chain')
+    @patch('src.utils.experiment.get_context_rag_chain')
     @patch('src.utils.experiment.get_judge_chain')
     def test_run_batch_experiment_multiple(self, mock_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load):
         # Setup Mocks
         mock_load.return_value = ["doc"]
-        mock_split.return_value = ["chunk"]
+        mock_split.return_value.split.return_value = ["chunk"]
         
         # Mock retrieval response
         mock_rag_chain_instance = MagicMock()
@@ -87,19 +104,908 @@ class TestExperiment(unittest.TestCase):
         config = {
             "model_name": "TestModel",
             "judge_model": "TestJudge",
-            "temperature": 0.7,
-            "top_p": 0.9,
+            "cache_dir": self.cache_dir,
+            "temperatures": [0.7],
+            "top_ps": [0.9],
             "chunk_sizes": [500, 1000],
             "chunk_overlaps": [50],
             "k_retrievals": [1, 3]
         }
         
+        # An exact index, so every K is a prefix of one search
+        mock_create_vs.return_value.index = faiss.IndexFlatL2(8)
+        
         # Run
         results = run_batch_experiment("test.pdf", config, "Q")
         
         # Assertions
         self.assertEqual(len(results), 4)
         self.assertEqual(mock_create_vs.call_count, 2) # Once for 500, once for 1000
+        
+        # The question is embedded once per run, then one search per index at the largest K
+        mock_vs = mock_create_vs.return_value
+        mock_vs.embeddings.embed_query.assert_called_once_with("Q")
+        self.assertEqual(mock_vs.similarity_search_by_vector.call_count, 2)
+        mock_vs.similarity_search_by_vector.assert_called_with(mock_vs.embeddings.embed_query.return_value, k=3)
+        mock_vs.as_retriever.assert_not_called()
+
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
+    @patch('src.utils.experiment.create_vectorstore')
+    @patch('src.utils.experiment.get_llm')
+    @patch('src.utils.experiment.get_context_rag_chain')
+    @patch('src.utils.experiment.get_judge_chain')
+    def test_run_batch_experiment_concurrent_keeps_order(self, mock_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load):
+        mock_load.return_value = ["doc"]
+        mock_split.return_value.split.return_value = ["chunk"]
+        mock_create_vs.return_value.similarity_search_by_vector.return_value = [MagicMock(page_content=f"c{i}") for i in range(5)]
+        
+        # Answer encodes K and temperature; small K sleeps longest so completion order is reversed
+        def make_rag_chain(llm):
+            chain = MagicMock()
+            def invoke(payload):
+                k = len(payload["context"])
+                time.sleep(0.05 / k)
+                return {"answer": f"k={k}", "context": payload["context"]}
+            chain.invoke.side_effect = invoke
+            return chain
+        mock_rag.side_effect = make_rag_chain
+        
+        mock_judge_chain_instance = MagicMock()
+        mock_judge_chain_instance.invoke.return_value = {"accuracy": 5}
+        mock_judge.return_value = mock_judge_chain_instance
+        
+        config = {
+            "model_name": "TestModel",
+            "judge_model": "TestJudge",
+            "cache_dir": self.cache_dir,
+            "max_concurrency": 4,
+            "temperatures": [0.1, 0.7],
+            "top_ps": [0.9],
+            "chunk_sizes": [1000],
+            "chunk_overlaps": [100],
+            "k_retrievals": [1, 3, 5]
+        }
+        
+        status = MagicMock()
+        results = run_batch_experiment(["test.pdf"], config, "Q", status_placeholder=status)
+        
+        self.assertEqual(len(results), 6)
+        self.assertEqual([r["Top-K"] for r in results], [1, 1, 3, 3, 5, 5])
+        self.assertEqual([r["Temperature"] for r in results], [0.1, 0.7] * 3)
+        self.assertEqual([r["Answer"] for r in results], ["k=1", "k=1", "k=3", "k=3", "k=5", "k=5"])
+        self.assertEqual(mock_judge_chain_instance.invoke.call_count, 6)
+        status.info.assert_any_call("Judged 6/6...")
+
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
+    @patch('src.utils.experiment.create_vectorstore')
+    @patch('src.utils.experiment.get_llm')
+    @patch('src.utils.experiment.get_context_rag_chain')
+    @patch('src.utils.experiment.get_judge_chain')
+    def test_pipelined_mode_judges_before_generation_finishes(self, mock_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load):
+        mock_load.return_value = ["doc"]
+        mock_split.return_value.split.return_value = ["chunk"]
+        mock_create_vs.return_value.similarity_search_by_vector.return_value = [MagicMock(page_content=f"c{i}") for i in range(5)]
+        
+        # The K=5 generation only finishes once a judgement has started
+        judge_started = threading.Event()
+        
+        def make_rag_chain(llm):
+            chain = MagicMock()
+            def invoke(payload):
+                k = len(payload["context"])
+                if k == 5:
+                    self.assertTrue(judge_started.wait(timeout=5))
+                return {"answer": f"k={k}", "context": []}
+            chain.invoke.side_effect = invoke
+            return chain
+        mock_rag.side_effect = make_rag_chain
+        
+        def judge(_):
+            judge_started.set()
+            return {"accuracy": 7}
+        mock_judge_chain_instance = MagicMock()
+        mock_judge_chain_instance.invoke.side_effect = judge
+        mock_judge.return_value = mock_judge_chain_instance
+        
+        config = {
+            "model_name": "TestModel",
+            "judge_model": "TestJudge",
+            "cache_dir": self.cache_dir,
+            "execution_mode": "pipelined",
+            "max_concurrency": 2,
+            "max_judge_concurrency": 1,
+            "temperatures": [0.7],
+            "top_ps": [0.9],
+            "chunk_sizes": [1000],
+            "chunk_overlaps": [100],
+            "k_retrievals": [1, 5]
+        }
+        
+        results = run_batch_experiment(["test.pdf"], config, "Q")
+        
+        self.assertEqual([r["Top-K"] for r in results], [1, 5])
+        self.assertEqual(mock_judge_chain_instance.invoke.call_count, 2)
+
+    @patch('src.utils.residency.set_ollama_keep_alive', return_value=True)
+    @patch('src.utils.residency.unload_ollama_model', return_value=True)
+    @patch('src.utils.residency.load_ollama_model', return_value=True)
+    @patch('src.utils.experiment.ensure_ollama_reachable', return_value=True)
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
+    @patch('src.utils.experiment.create_vectorstore')
+    @patch('src.utils.experiment.get_llm')
+    @patch('src.utils.experiment.get_context_rag_chain')
+    @patch('src.utils.experiment.get_judge_chain')
+    def test_ollama_defaults_to_phased_mode(self, mock_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load, mock_reachable, mock_load_model, mock_unload, mock_keep_alive):
+        mock_load.return_value = ["doc"]
+        mock_split.return_value.split.return_value = ["chunk"]
+        mock_rag.return_value.invoke.return_value = {"answer": "A", "context": []}
+        mock_judge.return_value.invoke.return_value = {}
+        
+        config = {
+            "model_name": "Mistral (Ollama)",
+            "judge_model": "Llama 3.2 (Ollama)",
+            "cache_dir": self.cache_dir,
+            "temperatures": [0.7],
+            "top_ps": [0.9],
+            "chunk_sizes": [500, 1000],
+            "chunk_overlaps": [100],
+            "k_retrievals": [3]
+        }
+        
+        status = MagicMock()
+        with tempfile.TemporaryDirectory() as runs_dir:
+            config.update(run_id="r1", runs_dir=runs_dir)
+            doc_path = os.path.join(runs_dir, "doc.txt")
+            with open(doc_path, "w") as f:
+                f.write("content")
+            results = run_batch_experiment([doc_path], config, "Q", status_placeholder=status)
+            events = RunLog("r1", runs_dir=runs_dir).events()
+        
+        self.assertEqual(len(results), 2)
+        status.info.assert_any_call("Phase 2/2: Running 2 judgement(s)...")
+        # Both indexes share one load of each model; only the generator is unloaded, for the judge
+        self.assertEqual([c.args[0] for c in mock_load_model.call_args_list], ["Mistral (Ollama)", "Llama 3.2 (Ollama)"])
+        mock_unload.assert_called_once_with("Mistral (Ollama)")
+        mock_keep_alive.assert_called_once_with("Llama 3.2 (Ollama)", "5m")
+        self.assertEqual(
+            [(e["event"], e["model"]) for e in events],
+            [("model_load", "mistral"), ("model_unload", "mistral"), ("model_load", "llama3.2"), ("model_release", "llama3.2")]
+        )
+        self.assertEqual(mock_llm.call_args.kwargs["keep_alive"], "30m")
+
+    @patch('src.utils.residency.set_ollama_keep_alive', return_value=True)
+    @patch('src.utils.residency.unload_ollama_model', return_value=True)
+    @patch('src.utils.residency.load_ollama_model', return_value=True)
+    @patch('src.utils.experiment.ensure_ollama_reachable', return_value=True)
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
+    @patch('src.utils.experiment.create_vectorstore')
+    @patch('src.utils.experiment.get_llm')
+    @patch('src.utils.experiment.get_context_rag_chain')
+    @patch('src.utils.experiment.get_judge_chain')
+    def test_models_are_released_when_a_phase_fails(self, mock_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load, mock_reachable, mock_load_model, mock_unload, mock_keep_alive):
+        mock_load.return_value = ["doc"]
+        mock_split.return_value.split.return_value = ["chunk"]
+        mock_rag.return_value.invoke.return_value = {"answer": "A", "context": []}
+        
+        def info(message):
+            if message.startswith("Phase 2/2"):
+                raise RuntimeError("stopped")
+        status = MagicMock()
+        status.info.side_effect = info
+        
+        config = {
+            "model_name": "Mistral (Ollama)",
+            "judge_model": "Llama 3.2 (Ollama)",
+            "cache_dir": self.cache_dir,
+            "temperatures": [0.7],
+            "top_ps": [0.9],
+            "chunk_sizes": [500],
+            "chunk_overlaps": [100],
+            "k_retrievals": [3]
+        }
+        with self.assertRaises(RuntimeError):
+            run_batch_experiment(["test.pdf"], config, "Q", status_placeholder=status)
+        
+        mock_keep_alive.assert_called_once_with("Llama 3.2 (Ollama)", "5m")
+
+    @patch('src.utils.residency.set_ollama_keep_alive', return_value=True)
+    @patch('src.utils.residency.unload_ollama_model', return_value=True)
+    @patch('src.utils.residency.load_ollama_model', return_value=True)
+    @patch('src.utils.experiment.ensure_ollama_reachable', return_value=True)
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
+    @patch('src.utils.experiment.create_vectorstore')
+    @patch('src.utils.experiment.get_llm')
+    @patch('src.utils.experiment.get_context_rag_chain')
+    @patch('src.utils.experiment.get_judge_chain')
+    def test_same_ollama_model_is_never_unloaded(self, mock_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load, mock_reachable, mock_load_model, mock_unload, mock_keep_alive):
+        mock_load.return_value = ["doc"]
+        mock_split.return_value.split.return_value = ["chunk"]
+        mock_rag.return_value.invoke.return_value = {"answer": "A", "context": []}
+        mock_judge.return_value.invoke.return_value = {}
+        
+        for mode in [None, "phased"]:
+            with self.subTest(mode=mode):
+                mock_load_model.reset_mock()
+                config = {
+                    "model_name": "Mistral (Ollama)",
+                    "judge_model": "Mistral (Ollama)",
+                    "cache_dir": self.cache_dir,
+                    "execution_mode": mode,
+                    "temperatures": [0.7],
+                    "top_ps": [0.9],
+                    "chunk_sizes": [500, 1000],
+                    "chunk_overlaps": [100],
+                    "k_retrievals": [3]
+                }
+                results = run_batch_experiment(["test.pdf"], config, "Q")
+                
+                self.assertEqual(len(results), 2)
+                mock_load_model.assert_called_once()
+                mock_unload.assert_not_called()
+
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
+    @patch('src.utils.experiment.create_vectorstore')
+    @patch('src.utils.experiment.get_llm')
+    @patch('src.utils.experiment.get_context_rag_chain')
+    @patch('src.utils.experiment.get_judge_chain')
+    def test_judge_cache_skips_already_judged_answers(self, mock_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load):
+        mock_load.return_value = ["doc"]
+        mock_split.return_value.split.return_value = ["chunk"]
+        mock_create_vs.return_value.similarity_search_by_vector.return_value = [MagicMock(page_content="ctx")]
+        mock_rag.return_value.invoke.side_effect = lambda payload: {"answer": "A", "context": payload["context"]}
+        mock_judge.return_value.invoke.return_value = {"accuracy": 8, "faithfulness": 7, "relevance": 6, "explanation": "ok"}
+        
+        with tempfile.TemporaryDirectory() as cache_dir:
+            config = {
+                "model_name": "TestModel",
+                "judge_model": "TestJudge",
+                "use_judge_cache": True,
+                "cache_dir": cache_dir,
+                "temperatures": [0.7],
+                "top_ps": [0.9],
+                "chunk_sizes": [1000],
+                "chunk_overlaps": [100],
+                "k_retrievals": [3]
+            }
+            
+            first = run_batch_experiment(["test.pdf"], config, "Q")
+            reporter = MagicMock()
+            second = run_batch_experiment(["test.pdf"], config, "Q", reporter=reporter)
+            reporter.info.assert_called_with("Judge cache: 1 hit(s), 0 miss(es).")
+            
+            # Bypass switch: cache off means the judge is called again
+            config["use_judge_cache"] = False
+            third = run_batch_experiment(["test.pdf"], config, "Q")
+        
+        self.assertEqual(mock_judge.return_value.invoke.call_count, 2)
+        self.assertFalse(first[0]["judge_cached"])
+        self.assertTrue(second[0]["judge_cached"])
+        self.assertEqual(second[0]["Accuracy"], 8)
+        self.assertFalse(third[0]["judge_cached"])
+
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
+    @patch('src.utils.experiment.create_vectorstore')
+    @patch('src.utils.experiment.get_llm')
+    @patch('src.utils.experiment.get_context_rag_chain')
+    @patch('src.utils.experiment.get_judge_chain')
+    def test_generation_cache_low_temperature_policy(self, mock_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load):
+        mock_load.return_value = ["doc"]
+        mock_split.return_value.split.return_value = ["chunk"]
+        mock_create_vs.return_value.similarity_search_by_vector.return_value = [MagicMock(page_content="ctx")]
+        mock_rag.return_value.invoke.side_effect = lambda payload: {"answer": "A", "context": payload["context"]}
+        mock_judge.return_value.invoke.return_value = {"accuracy": 8}
+        
+        with tempfile.TemporaryDirectory() as cache_dir:
+            config = {
+                "model_name": "TestModel",
+                "judge_model": "TestJudge",
+                "generation_cache_policy": "low_temperature",
+                "cache_dir": cache_dir,
+                "temperatures": [0.1, 0.7],
+                "top_ps": [0.9],
+                "chunk_sizes": [1000],
+                "chunk_overlaps": [100],
+                "k_retrievals": [3]
+            }
+            
+            run_batch_experiment(["test.pdf"], config, "Q")
+            second = run_batch_experiment(["test.pdf"], config, "Q")
+        
+        # Only the temperature 0.1 answer is reused on the second run
+        self.assertEqual(mock_rag.return_value.invoke.call_count, 3)
+        self.assertEqual([r["generation_cached"] for r in second], [True, False])
+        self.assertEqual(second[0]["Answer"], "A")
+
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
+    @patch('src.utils.experiment.create_vectorstore')
+    @patch('src.utils.experiment.get_llm')
+    @patch('src.utils.experiment.get_context_rag_chain')
+    @patch('src.utils.experiment.get_judge_chain')
+    def test_dataset_mode_builds_each_index_once(self, mock_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load):
+        mock_load.return_value = ["doc"]
+        mock_split.return_value.split.return_value = ["chunk"]
+        mock_vs = mock_create_vs.return_value
+        mock_vs.index = faiss.IndexFlatL2(1)
+        mock_vs.embeddings.embed_query.side_effect = lambda q: [float(len(q))]
+        mock_vs.similarity_search_by_vector.side_effect = lambda emb, k: [MagicMock(page_content=f"ctx{emb[0]:.0f}")] * k
+        mock_rag.return_value.invoke.side_effect = lambda payload: {"answer": f"A:{payload['input']}", "context": payload["context"]}
+        mock_judge.return_value.invoke.return_value = {"accuracy": 9}
+        
+        questions = [
+            {"question": "Q1", "reference": "R1"},
+            {"question": "Question 2"},
+            {"question": "Q three", "reference": "R3"},
+        ]
+        config = {
+            "model_name": "TestModel",
+            "judge_model": "TestJudge",
+            "cache_dir": self.cache_dir,
+            "max_concurrency": 3,
+            "temperatures": [0.7],
+            "top_ps": [0.9],
+            "chunk_sizes": [500, 1000],
+            "chunk_overlaps": [50],
+            "k_retrievals": [1, 3]
+        }
+        
+        results = run_batch_experiment(["a.pdf", "b.pdf"], config, "", questions=questions)
+        
+        # 3 questions x 2 indexes x 2 K values
+        self.assertEqual(len(results), 12)
+        self.assertEqual(mock_create_vs.call_count, 2)
+        # Both files loaded in one call, shared by every index
+        self.assertEqual(mock_load.call_count, 1)
+        self.assertEqual(mock_load.call_args.args[0], ["a.pdf", "b.pdf"])
+        # Each question embedded once per run, not once per index
+        self.assertEqual(mock_vs.embeddings.embed_query.call_count, 3)
+        self.assertEqual(mock_vs.similarity_search_by_vector.call_count, 6)
+        
+        self.assertEqual([r["Question"] for r in results[:6]], ["Q1", "Q1", "Question 2", "Question 2", "Q three", "Q three"])
+        self.assertEqual([r["Reference"] for r in results[:2]], ["R1", "R1"])
+        self.assertIsNone(results[2]["Reference"])
+        self.assertEqual(results[2]["Answer"], "A:Question 2")
+
+    @patch('src.utils.experiment.get_llm')
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
+    @patch('src.utils.experiment.create_vectorstore')
+    @patch('src.utils.experiment.get_context_rag_chain')
+    @patch('src.utils.experiment.get_judge_chain')
+    def test_resume_skips_completed_cells(self, mock_judge, mock_rag, mock_create_vs, mock_split, mock_load, mock_llm):
+        mock_load.return_value = ["doc"]
+        mock_split.return_value.split.return_value = ["chunk"]
+        mock_create_vs.return_value.similarity_search_by_vector.return_value = [MagicMock(page_content=f"c{i}") for i in range(3)]
+        mock_rag.return_value.invoke.side_effect = lambda payload: {"answer": f"k={len(payload['context'])}", "context": payload["context"]}
+        
+        # K=3 judgements fail on the first run only
+        judge_state = {"fail_k3": True}
+        def judge(eval_input):
+            if eval_input["answer"] == "k=3" and judge_state["fail_k3"]:
+                raise ValueError("judge crashed")
+            return {"accuracy": 6}
+        mock_judge.return_value.invoke.side_effect = judge
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            doc_path = os.path.join(tmp, "doc.pdf")
+            with open(doc_path, "wb") as f:
+                f.write(b"%PDF fake")
+            config = {
+                "model_name": "TestModel",
+                "judge_model": "TestJudge",
+                "cache_dir": self.cache_dir,
+                "run_id": "test-run",
+                "runs_dir": tmp,
+                "temperatures": [0.7],
+                "top_ps": [0.9],
+                "chunk_sizes": [500, 1000],
+                "chunk_overlaps": [50],
+                "k_retrievals": [1, 3]
+            }
+            
+            first = run_batch_experiment([doc_path], config, "Q")
+            self.assertEqual(len(first), 2)
+            
+            config["resume"] = True
+            judge_state["fail_k3"] = False
+            second = run_batch_experiment([doc_path], config, "Q")
+            
+            # Only the two failed K=3 cells were re-run
+            self.assertEqual(len(second), 4)
+            self.assertEqual([r["Top-K"] for r in second], [1, 3, 1, 3])
+            self.assertEqual(mock_rag.return_value.invoke.call_count, 6)
+            
+            # A third resume finds everything done and builds no index at all
+            mock_create_vs.reset_mock()
+            third = run_batch_experiment([doc_path], config, "Q")
+            self.assertEqual(third, second)
+            mock_create_vs.assert_not_called()
+            
+            # The re-rank factor only matters for compressed indexes
+            config["rerank_factor"] = 8
+            self.assertEqual(run_batch_experiment([doc_path], config, "Q"), second)
+            mock_create_vs.assert_not_called()
+            
+            # Resuming under different retrieval settings recomputes every cell
+            config["index_type"] = "hnsw"
+            run_batch_experiment([doc_path], config, "Q")
+            self.assertEqual(mock_create_vs.call_count, 2)
+            self.assertEqual(mock_rag.return_value.invoke.call_count, 10)
+
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
+    @patch('src.utils.experiment.create_vectorstore')
+    @patch('src.utils.experiment.get_llm')
+    @patch('src.utils.experiment.get_context_rag_chain')
+    @patch('src.utils.experiment.get_judge_chain')
+    def test_non_object_verdict_fails_only_its_cell(self, mock_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load):
+        mock_load.return_value = ["doc"]
+        mock_split.return_value.split.return_value = ["chunk"]
+        mock_create_vs.return_value.similarity_search_by_vector.return_value = [MagicMock(page_content="c")] * 3
+        mock_rag.return_value.invoke.side_effect = lambda payload: {"answer": f"k={len(payload['context'])}", "context": payload["context"]}
+        # Valid JSON, but not a score object, for the K=1 answers
+        mock_judge.return_value.invoke.side_effect = lambda eval_input: [] if eval_input["answer"] == "k=1" else {"accuracy": 7}
+        
+        for mode in ["pipelined", "phased"]:
+            with self.subTest(mode=mode):
+                config = {
+                    "model_name": "TestModel",
+                    "judge_model": "TestJudge",
+                    "cache_dir": self.cache_dir,
+                    "execution_mode": mode,
+                    "max_concurrency": 3,
+                    "temperatures": [0.1, 0.7],
+                    "top_ps": [0.9],
+                    "chunk_sizes": [1000],
+                    "chunk_overlaps": [100],
+                    "k_retrievals": [1, 3]
+                }
+                reporter = MagicMock()
+                results = run_batch_experiment(["test.pdf"], config, "Q", reporter=reporter)
+                
+                self.assertEqual([(r["Top-K"], r["Accuracy"]) for r in results], [(3, 7), (3, 7)])
+                errors = [c.args[0] for c in reporter.error.call_args_list]
+                self.assertEqual(len(errors), 2)
+                self.assertTrue(all("Judge error (K=1)" in e and "expected a JSON object, got list" in e for e in errors))
+
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
+    @patch('src.utils.experiment.create_vectorstore')
+    @patch('src.utils.experiment.get_llm')
+    @patch('src.utils.experiment.get_context_rag_chain')
+    @patch('src.utils.experiment.get_judge_chain')
+    def test_failed_checkpoint_write_keeps_the_run_going(self, mock_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load):
+        mock_load.return_value = ["doc"]
+        mock_split.return_value.split.return_value = ["chunk"]
+        mock_create_vs.return_value.similarity_search_by_vector.return_value = [MagicMock(page_content="c")] * 3
+        mock_rag.return_value.invoke.side_effect = lambda payload: {"answer": "A", "context": payload["context"]}
+        mock_judge.return_value.invoke.return_value = {"accuracy": 7}
+        
+        for mode in ["pipelined", "phased"]:
+            with self.subTest(mode=mode), tempfile.TemporaryDirectory() as tmp:
+                doc_path = os.path.join(tmp, "doc.pdf")
+                with open(doc_path, "wb") as f:
+                    f.write(b"%PDF fake")
+                config = {
+                    "model_name": "TestModel",
+                    "judge_model": "TestJudge",
+                    "cache_dir": self.cache_dir,
+                    "execution_mode": mode,
+                    "max_concurrency": 3,
+                    "run_id": "full-disk",
+                    "runs_dir": tmp,
+                    "temperatures": [0.1, 0.5, 0.9],
+                    "top_ps": [0.9],
+                    "chunk_sizes": [1000],
+                    "chunk_overlaps": [100],
+                    "k_retrievals": [1, 3]
+                }
+                reporter = MagicMock()
+                with patch.object(RunLog, "append", side_effect=OSError("No space left on device")) as append:
+                    results = run_batch_experiment([doc_path], config, "Q", reporter=reporter)
+                
+                self.assertEqual(len(results), 6)
+                # Reported once, and no further writes are attempted
+                self.assertEqual(reporter.error.call_count, 1)
+                self.assertIn("No space left on device", reporter.error.call_args.args[0])
+                self.assertLess(append.call_count, 6)
+
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
+    @patch('src.utils.experiment.create_vectorstore')
+    @patch('src.utils.experiment.get_llm')
+    @patch('src.utils.experiment.get_context_rag_chain')
+    @patch('src.utils.experiment.get_judge_chain')
+    def test_cell_filter_and_shared_indexes(self, mock_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load):
+        mock_load.return_value = ["doc"]
+        mock_split.return_value.split.return_value = ["chunk"]
+        mock_create_vs.return_value.similarity_search_by_vector.return_value = [MagicMock(page_content="c")] * 3
+        mock_rag.return_value.invoke.side_effect = lambda payload: {"answer": "A", "context": payload["context"]}
+        mock_judge.return_value.invoke.return_value = {"accuracy": 5}
+        
+        config = {
+            "model_name": "TestModel",
+            "judge_model": "TestJudge",
+            "cache_dir": self.cache_dir,
+            "temperatures": [0.1, 0.7],
+            "top_ps": [0.9],
+            "chunk_sizes": [500, 1000],
+            "chunk_overlaps": [50],
+            "k_retrievals": [1, 3],
+            "cell_filter": [(1000, 50, 3, 0.1, 0.9)]
+        }
+        vectorstores = {}
+        
+        results = run_batch_experiment(["test.pdf"], config, "Q", vectorstores=vectorstores)
+        self.assertEqual(len(results), 1)
+        self.assertEqual((results[0]["Chunk Size"], results[0]["Top-K"], results[0]["Temperature"]), (1000, 3, 0.1))
+        # The 500 index has no selected cells, so it is never built
+        self.assertEqual(list(vectorstores.keys()), [(1000, 50)])
+        
+        # A second batch reuses the built index and does not reload documents
+        mock_load.reset_mock()
+        run_batch_experiment(["test.pdf"], config, "Q", vectorstores=vectorstores)
+        self.assertEqual(mock_create_vs.call_count, 1)
+        mock_load.assert_not_called()
+
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
+    @patch('src.utils.experiment.create_vectorstore')
+    @patch('src.utils.experiment.get_llm')
+    @patch('src.utils.experiment.get_context_rag_chain')
+    @patch('src.utils.experiment.get_judge_chain')
+    def test_failed_indexes_and_generations_report_progress(self, mock_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load):
+        mock_load.return_value = ["doc"]
+        mock_split.return_value.split.side_effect = lambda chunk_size, chunk_overlap: [f"chunk{chunk_size}"]
+        def create_vectorstore(chunks, **kwargs):
+            if chunks == ["chunk500"]:
+                raise RuntimeError("embedding failed")
+            vectorstore = MagicMock()
+            vectorstore.similarity_search_by_vector.return_value = [MagicMock(page_content="c")]
+            return vectorstore
+        mock_create_vs.side_effect = create_vectorstore
+        def generate(payload):
+            raise ValueError("generation failed")
+        mock_rag.return_value.invoke.side_effect = generate
+        
+        config = {
+            "model_name": "TestModel",
+            "judge_model": "TestJudge",
+            "cache_dir": self.cache_dir,
+            "temperatures": [0.7],
+            "top_ps": [0.9],
+            "chunk_sizes": [500, 1000],
+            "chunk_overlaps": [50],
+            "k_retrievals": [1]
+        }
+        reporter = MagicMock()
+        self.assertEqual(run_batch_experiment(["test.pdf"], config, "Q", reporter=reporter), [])
+        
+        # The failed index and the failed generation each move the bar when they happen
+        progress = [c.args[0] for c in reporter.progress.call_args_list]
+        self.assertEqual(progress, [0.5, 1.0, 1.0])
+
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
+    @patch('src.utils.experiment.create_vectorstore')
+    @patch('src.utils.experiment.get_llm')
+    @patch('src.utils.experiment.get_context_rag_chain')
+    @patch('src.utils.experiment.get_judge_chain')
+    def test_indexes_are_released_after_retrieval(self, mock_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load):
+        mock_load.return_value = ["doc"]
+        mock_split.return_value.split.return_value = ["chunk"]
+        mock_rag.return_value.invoke.side_effect = lambda payload: {"answer": "A", "context": payload["context"]}
+        mock_judge.return_value.invoke.return_value = {"accuracy": 5}
+        
+        # Weak references to every index built, and how many were still alive as each was built
+        built = []
+        live_before = []
+        embeddings = MagicMock()
+        embeddings.embed_query.return_value = [0.0]
+        
+        class FakeIndex:
+            # A plain object: child mocks (such as query embeddings) would keep a MagicMock index alive
+            index = None
+            def __init__(self):
+                self.embeddings = embeddings
+            def similarity_search_by_vector(self, embedding, k):
+                return [MagicMock(page_content="c")] * k
+        
+        def create_vectorstore(*args, **kwargs):
+            gc.collect()
+            live_before.append(sum(ref() is not None for ref in built))
+            vectorstore = FakeIndex()
+            built.append(weakref.ref(vectorstore))
+            return vectorstore
+        mock_create_vs.side_effect = create_vectorstore
+        
+        config = {
+            "model_name": "TestModel",
+            "judge_model": "TestJudge",
+            "cache_dir": self.cache_dir,
+            "use_index_store": False,
+            "temperatures": [0.7],
+            "top_ps": [0.9],
+            "chunk_sizes": [300, 500, 1000],
+            "chunk_overlaps": [50],
+            "k_retrievals": [1]
+        }
+        self.assertEqual(len(run_batch_experiment(["test.pdf"], config, "Q")), 3)
+        # Each index was gone before the next one was built
+        self.assertEqual(live_before, [0, 0, 0])
+        
+        # Callers that pass a dict keep every index
+        vectorstores = {}
+        live_before.clear()
+        built.clear()
+        run_batch_experiment(["test.pdf"], config, "Q", vectorstores=vectorstores)
+        self.assertEqual(live_before, [0, 1, 2])
+        self.assertEqual(list(vectorstores), [(300, 50), (500, 50), (1000, 50)])
+
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
+    @patch('src.utils.experiment.create_vectorstore')
+    @patch('src.utils.experiment.get_llm')
+    @patch('src.utils.experiment.get_context_rag_chain')
+    @patch('src.utils.experiment.get_batch_judge_chain')
+    @patch('src.utils.experiment.get_judge_chain')
+    def test_batched_judging_groups_variants(self, mock_judge, mock_batch_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load):
+        mock_load.return_value = ["doc"]
+        mock_split.return_value.split.return_value = ["chunk"]
+        mock_create_vs.return_value.similarity_search_by_vector.return_value = [MagicMock(page_content="c")] * 3
+        mock_rag.return_value.invoke.side_effect = lambda payload: {"answer": "A", "context": payload["context"]}
+        mock_judge.return_value.invoke.return_value = {"accuracy": 1}
+        
+        def batch_judge(payload):
+            n = payload["answer_count"]
+            return {"evaluations": [
+                {"accuracy": 9, "faithfulness": 8, "relevance": 7, "explanation": f"#{i}"} for i in range(n)
+            ]}
+        mock_batch_judge.return_value.invoke.side_effect = batch_judge
+        
+        for mode in ["pipelined", "phased"]:
+            with self.subTest(mode=mode):
+                mock_batch_judge.return_value.invoke.reset_mock()
+                mock_judge.return_value.invoke.reset_mock()
+                config = {
+                    "model_name": "TestModel",
+                    "judge_model": "TestJudge",
+                    "cache_dir": self.cache_dir,
+                    "execution_mode": mode,
+                    "max_concurrency": 3,
+                    "judge_batch_size": 2,
+                    "temperatures": [0.1, 0.5, 0.9],
+                    "top_ps": [0.9],
+                    "chunk_sizes": [1000],
+                    "chunk_overlaps": [100],
+                    "k_retrievals": [1, 3]
+                }
+                results = run_batch_experiment(["test.pdf"], config, "Q")
+                
+                # Each Top-K has 3 variants sharing a context: one batch of 2 plus a single judge call
+                self.assertEqual(len(results), 6)
+                self.assertEqual(mock_batch_judge.return_value.invoke.call_count, 2)
+                self.assertEqual(mock_judge.return_value.invoke.call_count, 2)
+                self.assertEqual([r["Top-K"] for r in results], [1, 1, 1, 3, 3, 3])
+                # Which variants share a batch depends on completion order when pipelined
+                self.assertEqual(sorted(r["Accuracy"] for r in results[:3]), [1, 9, 9])
+                self.assertEqual(sorted(r["Accuracy"] for r in results[3:]), [1, 9, 9])
+
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
+    @patch('src.utils.experiment.create_vectorstore')
+    @patch('src.utils.experiment.get_llm')
+    @patch('src.utils.experiment.get_context_rag_chain')
+    @patch('src.utils.experiment.get_batch_judge_chain')
+    @patch('src.utils.experiment.get_judge_chain')
+    def test_batched_judging_keeps_indexes_apart(self, mock_judge, mock_batch_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load):
+        mock_load.return_value = ["doc"]
+        mock_split.return_value.split.side_effect = lambda chunk_size, chunk_overlap: [f"chunk-{chunk_size}"]
+
+        def build_index(chunks, **kwargs):
+            vectorstore = MagicMock()
+            vectorstore.similarity_search_by_vector.return_value = [MagicMock(page_content=f"context {chunks[0]}")]
+            return vectorstore
+        mock_create_vs.side_effect = build_index
+        mock_rag.return_value.invoke.side_effect = lambda payload: {"answer": "A", "context": payload["context"]}
+
+        judged_contexts = []
+        def judge(payload):
+            judged_contexts.append((payload["context"], 1))
+            return {"accuracy": 1}
+        mock_judge.return_value.invoke.side_effect = judge
+
+        def batch_judge(payload):
+            judged_contexts.append((payload["context"], payload["answer_count"]))
+            return {"evaluations": [
+                {"accuracy": 9, "faithfulness": 8, "relevance": 7, "explanation": ""} for _ in range(payload["answer_count"])
+            ]}
+        mock_batch_judge.return_value.invoke.side_effect = batch_judge
+
+        for mode in ["pipelined", "phased"]:
+            with self.subTest(mode=mode):
+                judged_contexts.clear()
+                config = {
+                    "model_name": "TestModel",
+                    "judge_model": "TestJudge",
+                    "cache_dir": self.cache_dir,
+                    "execution_mode": mode,
+                    "judge_batch_size": 2,
+                    "temperatures": [0.1, 0.5, 0.9],
+                    "top_ps": [0.9],
+                    "chunk_sizes": [500, 1000],
+                    "chunk_overlaps": [100],
+                    "k_retrievals": [1]
+                }
+                results = run_batch_experiment(["test.pdf"], config, "Q")
+
+                # Per index a batch of 2 plus a single call, never mixing the two indexes' answers
+                self.assertEqual(len(results), 6)
+                self.assertEqual(sorted(judged_contexts), [
+                    ("context chunk-1000", 1), ("context chunk-1000", 2), ("context chunk-500", 1), ("context chunk-500", 2)
+                ])
+
+    @patch('src.utils.experiment._judge_group_key', side_effect=lambda task: task["question"])
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
+    @patch('src.utils.experiment.create_vectorstore')
+    @patch('src.utils.experiment.get_llm')
+    @patch('src.utils.experiment.get_context_rag_chain')
+    @patch('src.utils.experiment.get_batch_judge_chain')
+    @patch('src.utils.experiment.get_judge_chain')
+    def test_batch_spanning_contexts_is_split(self, mock_judge, mock_batch_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load, mock_key):
+        mock_load.return_value = ["doc"]
+        mock_split.return_value.split.return_value = ["chunk"]
+        mock_create_vs.return_value.similarity_search_by_vector.side_effect = lambda embedding, k: [
+            MagicMock(page_content=f"doc {i}") for i in range(k)
+        ]
+        mock_rag.return_value.invoke.side_effect = lambda payload: {"answer": "A", "context": payload["context"]}
+        judged_contexts = []
+        def judge(payload):
+            judged_contexts.append(payload["context"])
+            return {"accuracy": 1}
+        mock_judge.return_value.invoke.side_effect = judge
+
+        config = {
+            "model_name": "TestModel",
+            "judge_model": "TestJudge",
+            "cache_dir": self.cache_dir,
+            "execution_mode": "phased",
+            "judge_batch_size": 2,
+            "temperatures": [0.1],
+            "top_ps": [0.9],
+            "chunk_sizes": [1000],
+            "chunk_overlaps": [100],
+            "k_retrievals": [1, 2]
+        }
+        # A key that ignores Top-K puts both answers in one batch, but they are judged apart
+        results = run_batch_experiment(["test.pdf"], config, "Q")
+        self.assertEqual(len(results), 2)
+        mock_batch_judge.return_value.invoke.assert_not_called()
+        self.assertEqual(judged_contexts, ["doc 0", "doc 0\n\ndoc 1"])
+
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
+    @patch('src.utils.experiment.create_vectorstore')
+    @patch('src.utils.experiment.get_llm')
+    @patch('src.utils.experiment.get_context_rag_chain')
+    @patch('src.utils.experiment.get_batch_judge_chain')
+    @patch('src.utils.experiment.get_judge_chain')
+    def test_batched_judging_falls_back_on_bad_response(self, mock_judge, mock_batch_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load):
+        mock_load.return_value = ["doc"]
+        mock_split.return_value.split.return_value = ["chunk"]
+        mock_create_vs.return_value.similarity_search_by_vector.return_value = [MagicMock(page_content="c")] * 3
+        mock_rag.return_value.invoke.side_effect = lambda payload: {"answer": "A", "context": payload["context"]}
+        mock_judge.return_value.invoke.return_value = {"accuracy": 4}
+        # Wrong number of evaluations for a batch of 2
+        mock_batch_judge.return_value.invoke.return_value = {"evaluations": [
+            {"accuracy": 9, "faithfulness": 8, "relevance": 7, "explanation": "only one"}
+        ]}
+        
+        config = {
+            "model_name": "TestModel",
+            "judge_model": "TestJudge",
+            "cache_dir": self.cache_dir,
+            "judge_batch_size": 4,
+            "temperatures": [0.1, 0.9],
+            "top_ps": [0.9],
+            "chunk_sizes": [1000],
+            "chunk_overlaps": [100],
+            "k_retrievals": [3]
+        }
+        results = run_batch_experiment(["test.pdf"], config, "Q")
+        
+        self.assertEqual(mock_batch_judge.return_value.invoke.call_count, 1)
+        self.assertEqual(mock_judge.return_value.invoke.call_count, 2)
+        self.assertEqual([r["Accuracy"] for r in results], [4, 4])
+
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
+    @patch('src.utils.experiment.create_vectorstore')
+    @patch('src.utils.experiment.get_llm')
+    @patch('src.utils.experiment.get_context_rag_chain')
+    @patch('src.utils.experiment.get_judge_chain')
+    def test_trace_covers_every_stage(self, mock_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load):
+        mock_load.return_value = ["doc"]
+        mock_split.return_value.split.return_value = ["chunk"]
+        mock_create_vs.return_value.similarity_search_by_vector.return_value = [MagicMock(page_content="ctx")] * 3
+        mock_rag.return_value.invoke.side_effect = lambda payload: {"answer": "An answer", "context": payload["context"]}
+        mock_judge.return_value.invoke.return_value = {"accuracy": 8}
+        
+        config = {
+            "model_name": "TestModel",
+            "judge_model": "TestJudge",
+            "cache_dir": self.cache_dir,
+            "temperatures": [0.7],
+            "top_ps": [0.9],
+            "chunk_sizes": [1000],
+            "chunk_overlaps": [100],
+            "k_retrievals": [1, 3]
+        }
+        tracer = Tracer()
+        run_batch_experiment(["test.pdf"], config, "Q", tracer=tracer)
+        
+        stages = {row["Stage"]: row for row in tracer.summary()}
+        self.assertEqual(
+            set(stages),
+            {"load_documents", "split_documents", "create_vectorstore", "embed_queries", "retrieval", "generation", "judging"}
+        )
+        self.assertEqual(stages["generation"]["Calls"], 2)
+        self.assertEqual(stages["retrieval"]["Calls"], 1)
+        self.assertGreater(stages["generation"]["input_tokens"], 0)
+        self.assertGreater(stages["generation"]["output_tokens"], 0)
+        self.assertEqual(stages["judging"]["retries"], 0)
+
+    @patch('src.utils.experiment.load_vectorstore')
+    @patch('src.utils.experiment.get_index_store')
+    @patch('src.utils.experiment.load_documents')
+    @patch('src.utils.experiment.MultiConfigSplitter')
+    @patch('src.utils.experiment.create_vectorstore')
+    @patch('src.utils.experiment.get_llm')
+    @patch('src.utils.experiment.get_context_rag_chain')
+    @patch('src.utils.experiment.get_judge_chain')
+    def test_splitter_only_covers_indexes_to_build(self, mock_judge, mock_rag, mock_llm, mock_create_vs, mock_split, mock_load, mock_store, mock_load_vs):
+        mock_load.return_value = ["doc"]
+        mock_split.return_value.split.return_value = ["chunk"]
+        mock_create_vs.return_value.similarity_search_by_vector.return_value = [MagicMock(page_content="ctx")]
+        stored_vs = MagicMock()
+        stored_vs.similarity_search_by_vector.return_value = [MagicMock(page_content="ctx")]
+        mock_load_vs.side_effect = lambda store, key, *args: stored_vs if key == "500-50" else None
+        mock_rag.return_value.invoke.side_effect = lambda payload: {"answer": "A", "context": payload["context"]}
+        mock_judge.return_value.invoke.return_value = {"accuracy": 8}
+        # Only the 500-character index is in the store
+        mock_store.return_value.has.side_effect = lambda key: key == "500-50"
+        
+        config = {
+            "model_name": "TestModel",
+            "judge_model": "TestJudge",
+            "cache_dir": self.cache_dir,
+            "use_embedding_cache": False,
+            "use_document_cache": False,
+            "temperatures": [0.7],
+            "top_ps": [0.9],
+            "chunk_sizes": [40, 300, 500, 1000],
+            "chunk_overlaps": [50],
+            "k_retrievals": [1]
+        }
+        with patch('src.utils.experiment.corpus_key', return_value="corpus"), \
+             patch('src.utils.experiment.current_embedding_model', return_value="embedder"), \
+             patch('src.utils.experiment.index_key', side_effect=lambda corpus, size, overlap, *rest: f"{size}-{overlap}"):
+            results = run_batch_experiment(["test.pdf"], config, "Q")
+        
+        self.assertEqual(len(results), 3)
+        # The invalid 40/50 config and the stored 500 index are never split
+        mock_split.assert_called_once()
+        self.assertEqual(mock_split.call_args.args[1], [(300, 50), (1000, 50)])
+        self.assertEqual(mock_split.call_args.kwargs["max_held"], 2)
+        self.assertEqual(mock_create_vs.call_count, 2)
 
 if __name__ == '__main__':
     unittest.main()
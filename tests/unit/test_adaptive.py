@@ -0,0 +1,105 @@
+import unittest
+from unittest.mock import patch
+
+from src.utils.adaptive import grid_arms, run_adaptive_search
+
+
+def fake_batch(file_paths, config, question, questions=None, reporter=None, vectorstores=None, tracer=None):
+    """
+    Scores grow with Top-K and fall with temperature, so (k=5, t=0.1) is the best arm.
+    Each cell traces a generation and a judgement; config["fake_cached_judging"] serves verdicts from the cache
+    and config["fake_generation_retries"] retries every generation that many times.
+    """
+    rows = []
+    for q in questions:
+        for size, overlap, k, t, p in config["cell_filter"]:
+            with tracer.span("generation", cached=False) as span:
+                span.set(retries=config.get("fake_generation_retries", 0))
+            with tracer.span("judging", cached=bool(config.get("fake_cached_judging"))):
+                pass
+            score = k - t * 10
+            rows.append({
+                "Question": q["question"], "Chunk Size": size, "Overlap": overlap, "Top-K": k,
+                "Temperature": t, "Top P": p, "Accuracy": score, "Faithfulness": score, "Relevance": score
+            })
+    return rows
+
+
+class TestAdaptiveSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.config = {
+            "model_name": "M", "judge_model": "J",
+            "chunk_sizes": [500, 1000], "chunk_overlaps": [50, 1000],
+            "k_retrievals": [1, 3, 5], "temperatures": [0.1, 0.7], "top_ps": [0.9],
+            "call_budget": 60, "halving_rate": 2
+        }
+        self.questions = [{"question": f"Q{i}"} for i in range(20)]
+
+    def test_grid_arms_skips_invalid_overlap(self):
+        arms = grid_arms(self.config, has_documents=True)
+        # 500/50 and 1000/50 are valid; 500/1000 and 1000/1000 are not
+        self.assertEqual(len(arms), 2 * 3 * 2)
+        self.assertEqual(grid_arms(self.config, has_documents=False), [(None, None, 0, 0.1, 0.9), (None, None, 0, 0.7, 0.9)])
+
+    @patch('src.utils.adaptive.run_batch_experiment', side_effect=fake_batch)
+    def test_prunes_to_best_configuration_within_budget(self, mock_batch):
+        results, summary = run_adaptive_search(["doc.pdf"], self.config, self.questions)
+
+        self.assertLessEqual(summary["calls_used"], 60)
+        self.assertEqual(summary["exhaustive_calls"], 12 * 20 * 2)
+        self.assertEqual(summary["calls_saved"], summary["exhaustive_calls"] - summary["calls_used"])
+        self.assertEqual(summary["best_configuration"]["Top-K"], 5)
+        self.assertEqual(summary["best_configuration"]["Temperature"], 0.1)
+
+        # Each round evaluates fewer configurations, and every call shares one index dict
+        evaluated = [len(call.args[1]["cell_filter"]) for call in mock_batch.call_args_list]
+        self.assertEqual(evaluated, sorted(evaluated, reverse=True))
+        self.assertEqual(evaluated[0], 12)
+        index_dicts = {id(call.kwargs["vectorstores"]) for call in mock_batch.call_args_list}
+        self.assertEqual(len(index_dicts), 1)
+
+        # Rows are tagged with their round and new questions are used each round
+        self.assertEqual(results[0]["Round"], 1)
+        first_round_questions = {r["Question"] for r in results if r["Round"] == 1}
+        second_round_questions = {r["Question"] for r in results if r["Round"] == 2}
+        self.assertFalse(first_round_questions & second_round_questions)
+
+    @patch('src.utils.adaptive.run_batch_experiment', side_effect=fake_batch)
+    def test_budget_counts_calls_actually_made(self, mock_batch):
+        _, uncached = run_adaptive_search(["doc.pdf"], self.config, self.questions)
+        self.assertEqual([r["calls"] for r in uncached["rounds"]], [
+            r["configurations"] * r["questions"] * 2 for r in uncached["rounds"]
+        ])
+
+        # Cached verdicts cost nothing, so the same budget evaluates more questions
+        self.config["fake_cached_judging"] = True
+        _, cached = run_adaptive_search(["doc.pdf"], self.config, self.questions)
+        self.assertEqual(cached["calls_used"], sum(r["configurations"] * r["questions"] for r in cached["rounds"]))
+        self.assertLessEqual(cached["calls_used"], 60)
+        self.assertGreater(
+            sum(r["questions"] for r in cached["rounds"]), sum(r["questions"] for r in uncached["rounds"])
+        )
+
+    @patch('src.utils.adaptive.run_batch_experiment', side_effect=fake_batch)
+    def test_retries_are_charged_to_the_budget(self, mock_batch):
+        self.config["fake_generation_retries"] = 1
+        _, summary = run_adaptive_search(["doc.pdf"], self.config, self.questions)
+        # Each cell sends its generation twice and its judgement once
+        self.assertEqual([r["calls"] for r in summary["rounds"]], [
+            r["configurations"] * r["questions"] * 3 for r in summary["rounds"]
+        ])
+        # Later rounds are sized for the three calls per cell seen in the first
+        self.assertLessEqual(summary["calls_used"], self.config["call_budget"])
+
+    @patch('src.utils.adaptive.run_batch_experiment', side_effect=fake_batch)
+    def test_budget_too_small_runs_nothing(self, mock_batch):
+        self.config["call_budget"] = 10
+        results, summary = run_adaptive_search(["doc.pdf"], self.config, self.questions)
+        self.assertEqual(results, [])
+        self.assertEqual(summary["calls_used"], 0)
+        mock_batch.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
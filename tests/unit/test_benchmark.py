@@ -0,0 +1,91 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings
+from benchmarks.run_benchmark import main, percentile, run_benchmark
+from src.utils.judge import get_batch_judge_chain, get_judge_chain, parse_batch_scores
+from src.utils.vectorstore import get_embeddings
+
+SAMPLE_DOC = os.path.join(os.path.dirname(__file__), "..", "e2e_sample.txt")
+
+
+class TestFakes(unittest.TestCase):
+    def test_fake_judge_returns_parseable_verdicts(self):
+        llm = FakeChatModel(seed=1)
+        single = get_judge_chain(llm).invoke({"question": "Q", "answer": "A", "context": "C"})
+        self.assertEqual(set(single), {"accuracy", "faithfulness", "relevance", "explanation"})
+
+        batch = get_batch_judge_chain(llm).invoke(
+            {"question": "Q", "context": "C", "answers": "Generated Answer 1:\nA\n\nGenerated Answer 2:\nB", "answer_count": 2}
+        )
+        self.assertEqual(len(parse_batch_scores(batch, 2)), 2)
+
+    def test_fakes_are_deterministic(self):
+        self.assertEqual(
+            FakeChatModel(seed=3).invoke("Hello there policy").content,
+            FakeChatModel(seed=3).invoke("Hello there policy").content
+        )
+        embeddings = FakeEmbeddings(dimension=16)
+        self.assertEqual(embeddings.embed_query("drainage"), FakeEmbeddings(dimension=16).embed_query("drainage"))
+        self.assertNotEqual(embeddings.embed_query("drainage"), embeddings.embed_query("sewer"))
+
+    def test_error_rate_fails_calls(self):
+        with self.assertRaises(Exception):
+            FakeChatModel(error_rate=1.0).invoke("anything")
+
+
+class TestRunBenchmark(unittest.TestCase):
+    def test_end_to_end_offline(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        config = {
+            "model_name": "Fake (Offline)",
+            "judge_model": "Fake (Offline)",
+            "chunk_sizes": [200],
+            "chunk_overlaps": [20],
+            "k_retrievals": [1, 2],
+            "temperatures": [0.1, 0.7],
+            "top_ps": [0.9],
+            "max_concurrency": 4,
+            # Fresh caches, so every stage runs
+            "cache_dir": tmp.name
+        }
+        report = run_benchmark(
+            [SAMPLE_DOC], config, [{"question": "What is this about?"}, {"question": "Who wrote it?"}],
+            FakeChatModel(), FakeEmbeddings(dimension=16)
+        )
+
+        self.assertEqual(report["cells_expected"], 8)
+        self.assertEqual(report["cells_completed"], 8)
+        self.assertEqual(report["errors"], 0)
+        self.assertGreater(report["cells_per_s"], 0)
+        stages = {row["stage"] for row in report["stages"]}
+        self.assertTrue({"load_documents", "create_vectorstore", "retrieval", "generation", "judging"} <= stages)
+        json.dumps(report)
+        # The fakes are only swapped in for the run
+        self.assertNotIsInstance(get_embeddings(), FakeEmbeddings)
+
+    @patch('benchmarks.run_benchmark.format_report', return_value="")
+    @patch('benchmarks.run_benchmark.run_benchmark', return_value={"cells_completed": 1})
+    def test_persistent_caches_are_opt_in(self, mock_run, mock_format):
+        docs_dir = os.path.dirname(SAMPLE_DOC)
+        main(["--docs", docs_dir, "--max-files", "1"])
+        config = mock_run.call_args.args[1]
+        self.assertEqual(
+            (config["use_document_cache"], config["use_embedding_cache"], config["use_index_store"]), (False, False, False)
+        )
+        main(["--docs", docs_dir, "--max-files", "1", "--document-cache"])
+        self.assertTrue(mock_run.call_args.args[1]["use_document_cache"])
+
+    def test_percentile_nearest_rank(self):
+        values = [float(v) for v in range(1, 101)]
+        self.assertEqual(percentile(values, 50), 50.0)
+        self.assertEqual(percentile(values, 99), 99.0)
+        self.assertEqual(percentile([], 90), 0.0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,89 @@
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src.utils.cache import DiskCache, hash_key
+from src.utils.judge import judge_cache_key
+
+
+class TestDiskCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_and_counters(self):
+        cache = DiskCache("test", cache_dir=self.tmp.name)
+        self.assertIsNone(cache.get("a"))
+        cache.set("a", {"accuracy": 9})
+        self.assertEqual(cache.get("a"), {"accuracy": 9})
+        self.assertEqual(cache.stats(), {"hits": 1, "misses": 1})
+        cache.close()
+
+        # Persists across instances
+        reopened = DiskCache("test", cache_dir=self.tmp.name)
+        self.assertEqual(reopened.get("a"), {"accuracy": 9})
+        reopened.close()
+
+    def test_size_based_eviction_drops_least_recently_used(self):
+        cache = DiskCache("test", max_bytes=300, cache_dir=self.tmp.name)
+        for i in range(3):
+            cache.set(f"k{i}", "x" * 90)
+        cache.get("k0")  # k1 is now the least recently used
+        cache.set("k3", "x" * 90)
+
+        self.assertIsNone(cache.get("k1"))
+        self.assertIsNotNone(cache.get("k0"))
+        self.assertIsNotNone(cache.get("k3"))
+        self.assertLessEqual(cache.size_bytes, 300)
+        cache.close()
+
+    def test_hits_batch_their_access_time_writes(self):
+        cache = DiskCache("test", max_bytes=300, cache_dir=self.tmp.name)
+        for i in range(3):
+            cache.set(f"k{i}", "x" * 90)
+        writes = cache._conn.total_changes
+        for _ in range(10):
+            cache.get("k0")
+        self.assertEqual(cache._conn.total_changes, writes)
+
+        # Pending access times are written on close, so LRU order survives a reopen
+        cache.close()
+        reopened = DiskCache("test", max_bytes=300, cache_dir=self.tmp.name)
+        reopened.set("k3", "x" * 90)
+        self.assertIsNone(reopened.get("k1"))
+        self.assertIsNotNone(reopened.get("k0"))
+        reopened.close()
+
+        with patch('src.utils.cache.ACCESS_FLUSH_SIZE', 2):
+            cache = DiskCache("test", cache_dir=self.tmp.name)
+            writes = cache._conn.total_changes
+            cache.get("k0")
+            self.assertEqual(cache._conn.total_changes, writes)
+            cache.get("k3")
+            self.assertEqual(cache._conn.total_changes, writes + 2)
+            cache.close()
+
+    def test_ttl_expires_entries(self):
+        cache = DiskCache("test", cache_dir=self.tmp.name, ttl_seconds=60)
+        with patch('src.utils.cache.time.time', return_value=1000.0):
+            cache.set("a", "answer")
+        with patch('src.utils.cache.time.time', return_value=1030.0):
+            self.assertEqual(cache.get("a"), "answer")
+        with patch('src.utils.cache.time.time', return_value=1061.0):
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(len(cache), 0)
+        cache.close()
+
+    def test_keys_depend_on_every_part(self):
+        self.assertEqual(hash_key("a", 1), hash_key("a", 1))
+        self.assertNotEqual(hash_key("a", 1), hash_key("a", 2))
+        base = judge_cache_key("q", "a", "c", "Judge")
+        self.assertNotEqual(base, judge_cache_key("q", "a", "c", "Other Judge"))
+        self.assertNotEqual(base, judge_cache_key("q", "a", "c2", "Judge"))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from langchain_core.documents import Document
+
+from benchmarks.fakes import FakeEmbeddings
+from src.utils.citations import CitationIndex, chapter_of, extract_citations, file_citation, find_citations
+from src.utils.index_store import IndexStore
+from src.utils.vectorstore import (
+    CITATION_FETCH_FACTOR, create_vectorstore, load_vectorstore, needs_query_embedding, retrieve_for_k_values
+)
+
+
+class TestCitationExtraction(unittest.TestCase):
+
+    def test_extracts_and_normalizes_citations(self):
+        text = "Under RCW 36.70a.040 and chapter 19.27 RCW (see WAC\n51-11C, SMC § 23.40.020). RCW 19.27.031Authority."
+        self.assertEqual(
+            extract_citations(text),
+            ["RCW 36.70A.040", "RCW 19.27", "WAC 51-11C", "SMC 23.40.020", "RCW 19.27.031"]
+        )
+        # Shapes that don't fit the code are ignored
+        self.assertEqual(extract_citations("WAC 19.27.031 and RCW 51-50"), [])
+
+    def test_bare_sections_count_only_inside_their_chapter(self):
+        text = "51-50-0303 Section 303. WAC 51-50-0303 again. 151-50-0200, 1004.6"
+        self.assertEqual(find_citations(text, "WAC 51-50"), ["WAC 51-50-0303", "WAC 51-50-0303"])
+        self.assertEqual(find_citations(text), ["WAC 51-50-0303"])
+
+    def test_file_names_from_download_scripts(self):
+        self.assertEqual(file_citation("docs/WAC 51-50.pdf"), "WAC 51-50")
+        self.assertEqual(file_citation("RCW_Chapters/Title_1/RCW_1.04_The_code.pdf"), "RCW 1.04")
+        self.assertEqual(file_citation("WAC_51-11C_Energy_code.pdf"), "WAC 51-11C")
+        self.assertEqual(file_citation("RCW_36.70A.040.pdf"), "RCW 36.70A")
+        self.assertEqual(
+            file_citation("Chapter 23.40 - COMPLIANCE WITH REGULATIONS _ Municipal Code _ Seattle, WA _ Municode Library.pdf"),
+            "SMC 23.40"
+        )
+        self.assertIsNone(file_citation("SPU4GeneralDesignFinalRedacted.pdf"))
+        self.assertEqual(chapter_of("WAC 51-50-0100"), "WAC 51-50")
+        self.assertIsNone(chapter_of("RCW 36.70A"))
+
+
+class TestCitationRetrieval(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.embeddings = FakeEmbeddings(dimension=16)
+        self.chunks = [Document(page_content=f"General drainage text {i}.", metadata={"source": "SPU8.pdf", "i": i}) for i in range(20)]
+        self.chunks += [
+            Document(page_content="51-50-0303 Section 303 Assembly Group A. Per WAC 51-50-0303 ...", metadata={"source": "WAC 51-50.pdf", "i": 20}),
+            Document(page_content="51-50-0305 Section 305 Educational Group E.", metadata={"source": "WAC 51-50.pdf", "i": 21}),
+            Document(page_content="Adopted under RCW 19.27.031.", metadata={"source": "WAC 51-50.pdf", "i": 22}),
+        ]
+        with patch('src.utils.vectorstore.get_embeddings', return_value=self.embeddings):
+            self.vectorstore = create_vectorstore(self.chunks)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def ids(self, docs):
+        return [d.metadata["i"] for d in docs]
+
+    def test_index_maps_citations_to_chunks(self):
+        exact, related = self.vectorstore.citation_index.lookup("What does WAC 51-50-0303 require?")
+        self.assertEqual([self.vectorstore.docstore.search(i).metadata["i"] for i in exact], [20])
+        self.assertEqual(sorted(self.vectorstore.docstore.search(i).metadata["i"] for i in related), [21, 22])
+
+    def test_exact_matches_come_first_then_vector_hits(self):
+        question = "What does WAC 51-50-0303 require?"
+        by_distance = [self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[i]) for i in [3, 20, 5, 22, 7, 8]]
+        with patch.object(self.vectorstore, "similarity_search_by_vector", side_effect=lambda _, k: by_distance[:k]) as search:
+            results = retrieve_for_k_values(self.vectorstore, question, [1, 3], query_embedding=[0.0] * 16)
+        self.assertEqual(search.call_args.kwargs["k"], 3 * CITATION_FETCH_FACTOR)
+        self.assertEqual(self.ids(results[1]), [20])
+        # Candidates from the cited chapter's document are moved ahead of other vector hits
+        self.assertEqual(self.ids(results[3]), [20, 22, 3])
+
+    def test_related_matches_on_a_flat_index_match_a_retriever_per_k(self):
+        # No chunk cites WAC 51-50-0310, but the chapter's document makes 20-22 related
+        question = "What does WAC 51-50-0310 require?"
+        self.assertEqual(self.vectorstore.citation_index.lookup(question)[0], [])
+        # Related chunk 22 is just past what k=1 fetches, but within what k=5 fetches
+        order = list(range(CITATION_FETCH_FACTOR)) + [22] + list(range(CITATION_FETCH_FACTOR, 20))
+        by_distance = [self.vectorstore.docstore.search(self.vectorstore.index_to_docstore_id[i]) for i in order]
+        with patch.object(self.vectorstore, "similarity_search_by_vector", side_effect=lambda _, k: by_distance[:k]):
+            results = retrieve_for_k_values(self.vectorstore, question, [1, 2, 5], query_embedding=[0.0] * 16)
+            for k in [1, 2, 5]:
+                single = retrieve_for_k_values(self.vectorstore, question, [k], query_embedding=[0.0] * 16)
+                self.assertEqual(self.ids(results[k]), self.ids(single[k]))
+        self.assertEqual(self.ids(results[1]), [0])
+        self.assertEqual(self.ids(results[5]), [22, 0, 1, 2, 3])
+
+    def test_full_exact_coverage_skips_search(self):
+        question = "What does WAC 51-50-0303 require?"
+        self.assertFalse(needs_query_embedding(self.vectorstore, question, 1))
+        self.assertTrue(needs_query_embedding(self.vectorstore, question, 3))
+        with patch.object(self.vectorstore, "similarity_search") as search:
+            results = retrieve_for_k_values(self.vectorstore, question, [1])
+        search.assert_not_called()
+        self.assertEqual(self.ids(results[1]), [20])
+
+    def test_citation_index_survives_the_index_store(self):
+        store = IndexStore(cache_dir=self.tmp.name)
+        store.put("k", self.vectorstore)
+        with patch('src.utils.vectorstore.get_embeddings', return_value=self.embeddings):
+            loaded = load_vectorstore(store, "k")
+        self.assertEqual(loaded.citation_index.to_dict(), self.vectorstore.citation_index.to_dict())
+
+        # Indexes saved without one get it rebuilt from their chunks
+        self.vectorstore.citation_index = None
+        store.put("bare", self.vectorstore)
+        with patch('src.utils.vectorstore.get_embeddings', return_value=self.embeddings):
+            rebuilt = load_vectorstore(store, "bare")
+        self.assertIsInstance(rebuilt.citation_index, CitationIndex)
+        self.assertEqual(len(rebuilt.citation_index.lookup("RCW 19.27.031")[0]), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
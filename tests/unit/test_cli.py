@@ -0,0 +1,105 @@
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from src.cli import collect_documents, load_spec, main
+from src.utils.ingestion import load_documents
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+
+
+class TestCli(unittest.TestCase):
+
+    def test_headless_import_does_not_load_streamlit(self):
+        code = "import sys, src.cli; assert 'streamlit' not in sys.modules, 'streamlit was imported'"
+        proc = subprocess.run([sys.executable, "-c", code], cwd=REPO_ROOT, capture_output=True, text=True)
+        self.assertEqual(proc.returncode, 0, proc.stderr)
+
+    def test_load_spec_fills_defaults_and_validates(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "spec.json")
+            with open(path, "w") as f:
+                json.dump({"model_name": "M", "judge_model": "J", "k_retrievals": 5}, f)
+            config = load_spec(path)
+            self.assertEqual(config["k_retrievals"], [5])
+            self.assertEqual(config["chunk_sizes"], [1000])
+
+            with open(path, "w") as f:
+                json.dump({"model_name": "M"}, f)
+            with self.assertRaises(ValueError):
+                load_spec(path)
+
+    def test_collect_documents_filters_and_sorts(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.makedirs(os.path.join(tmp, "sub"))
+            for name in ["b.pdf", "a.txt", "sub/c.md", "notes.docx", "NOTES.TXT"]:
+                open(os.path.join(tmp, name), "w").close()
+            self.assertEqual(
+                [os.path.relpath(p, tmp) for p in collect_documents(tmp)],
+                ["NOTES.TXT", "a.txt", "b.pdf", os.path.join("sub", "c.md")]
+            )
+
+    def test_collected_uppercase_extensions_load(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ["NOTES.TXT", "draft.Txt"]:
+                with open(os.path.join(tmp, name), "w") as f:
+                    f.write(f"Contents of {name}")
+            docs = load_documents(collect_documents(tmp), max_workers=1)
+        self.assertEqual([d.page_content for d in docs], ["Contents of NOTES.TXT", "Contents of draft.Txt"])
+
+    @patch('src.cli.run_batch_experiment')
+    def test_main_runs_grid_and_writes_results(self, mock_run):
+        mock_run.return_value = [{"Question": "Q1", "Accuracy": 8}]
+        with tempfile.TemporaryDirectory() as tmp:
+            spec = os.path.join(tmp, "spec.json")
+            with open(spec, "w") as f:
+                json.dump({"model_name": "M", "judge_model": "J"}, f)
+            questions = os.path.join(tmp, "q.jsonl")
+            with open(questions, "w") as f:
+                f.write('{"question": "Q1"}\n{"question": "Q2"}\n')
+            docs = os.path.join(tmp, "docs")
+            os.makedirs(docs)
+            open(os.path.join(docs, "a.txt"), "w").close()
+            out = os.path.join(tmp, "out")
+
+            code = main(["--spec", spec, "--docs", docs, "--questions", questions, "--output", out, "--run-id", "r1"])
+
+            self.assertEqual(code, 0)
+            kwargs = mock_run.call_args.kwargs
+            self.assertEqual(len(kwargs["questions"]), 2)
+            self.assertEqual(kwargs["config"]["run_id"], "r1")
+            self.assertEqual(kwargs["file_paths"], [os.path.join(docs, "a.txt")])
+            with open(os.path.join(out, "r1.json")) as f:
+                self.assertEqual(json.load(f), mock_run.return_value)
+            self.assertTrue(os.path.exists(os.path.join(out, "r1.csv")))
+            self.assertTrue(os.path.exists(os.path.join(out, "r1_trace.json")))
+            self.assertNotIn("citation_lookup", kwargs["config"])
+
+            main(["--spec", spec, "--question", "Q", "--output", out, "--no-citation-lookup"])
+            self.assertFalse(mock_run.call_args.kwargs["config"]["citation_lookup"])
+
+
+    @patch('src.cli.load_documents')
+    @patch('src.cli.run_batch_experiment')
+    def test_budget_blocks_run(self, mock_run, mock_load):
+        from langchain_core.documents import Document
+        mock_load.return_value = [Document(page_content="Drainage requirements. " * 200)]
+        with tempfile.TemporaryDirectory() as tmp:
+            spec = os.path.join(tmp, "spec.json")
+            with open(spec, "w") as f:
+                json.dump({"model_name": "M", "judge_model": "J", "token_budget": 100, "runs_dir": tmp}, f)
+            docs = os.path.join(tmp, "docs")
+            os.makedirs(docs)
+            open(os.path.join(docs, "a.txt"), "w").close()
+
+            code = main(["--spec", spec, "--docs", docs, "--question", "Q", "--output", os.path.join(tmp, "out")])
+
+        self.assertEqual(code, 2)
+        mock_run.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
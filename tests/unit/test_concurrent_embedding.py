@@ -0,0 +1,71 @@
+import threading
+import unittest
+from unittest.mock import patch
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from benchmarks.fakes import FakeEmbeddings
+from src.utils.memory import MemoryLimitExceeded
+from src.utils.vectorstore import create_vectorstore, create_vectorstore_streaming
+
+
+class InFlightEmbeddings(FakeEmbeddings):
+    """FakeEmbeddings that records the most embed_documents calls running at once."""
+
+    def __init__(self, **kwargs):
+        super().__init__(latency_per_call=0.01, **kwargs)
+        self._in_flight_lock = threading.Lock()
+        self._running = 0
+        self.max_in_flight = 0
+
+    def embed_documents(self, texts):
+        with self._in_flight_lock:
+            self._running += 1
+            self.max_in_flight = max(self.max_in_flight, self._running)
+        try:
+            return super().embed_documents(texts)
+        finally:
+            with self._in_flight_lock:
+                self._running -= 1
+
+
+def as_results(vectorstore, query, k=5):
+    return [(d.page_content, d.metadata) for d in vectorstore.similarity_search_by_vector(query, k=k)]
+
+
+class TestConcurrentEmbedding(unittest.TestCase):
+
+    def setUp(self):
+        self.chunks = [Document(page_content=f"Chunk {i} about drainage.", metadata={"i": i}) for i in range(45)]
+
+    def test_matches_from_documents_with_bounded_requests(self):
+        embeddings = InFlightEmbeddings(dimension=16)
+        with patch('src.utils.vectorstore.get_embeddings', return_value=embeddings):
+            vectorstore = create_vectorstore(self.chunks, batch_size=4, max_workers=3)
+
+        reference = FAISS.from_documents(self.chunks, FakeEmbeddings(dimension=16))
+        query = embeddings.embed_query("drainage")
+        self.assertEqual(vectorstore.index.ntotal, 45)
+        self.assertEqual(as_results(vectorstore, query), as_results(reference, query))
+        self.assertLessEqual(embeddings.max_in_flight, 3)
+        self.assertGreater(embeddings.max_in_flight, 1)
+
+    def test_streaming_keeps_chunk_order(self):
+        embeddings = FakeEmbeddings(dimension=16)
+        with patch('src.utils.vectorstore.get_embeddings', return_value=embeddings):
+            vectorstore, count = create_vectorstore_streaming(iter(self.chunks), batch_size=4, max_workers=3)
+
+        self.assertEqual(count, 45)
+        stored = [vectorstore.docstore.search(vectorstore.index_to_docstore_id[i]).metadata["i"] for i in range(45)]
+        self.assertEqual(stored, list(range(45)))
+
+    def test_streaming_stops_at_memory_limit(self):
+        with patch('src.utils.vectorstore.get_embeddings', return_value=FakeEmbeddings(dimension=16)), \
+             patch('src.utils.memory.current_rss_mb', return_value=1000.0):
+            with self.assertRaises(MemoryLimitExceeded):
+                create_vectorstore_streaming(iter(self.chunks), batch_size=4, memory_limit_mb=500)
+
+
+if __name__ == "__main__":
+    unittest.main()
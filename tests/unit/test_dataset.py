@@ -0,0 +1,49 @@
+import os
+import tempfile
+import unittest
+
+from src.utils.dataset import load_questions, parse_questions
+
+
+class TestDataset(unittest.TestCase):
+
+    def test_parse_jsonl_with_optional_reference(self):
+        content = '{"question": "What is RCW 36.70A?", "reference": "Growth Management Act"}\n\n{"query": "Q2"}\n'
+        questions = parse_questions(content, "jsonl")
+        self.assertEqual(questions, [
+            {"question": "What is RCW 36.70A?", "reference": "Growth Management Act"},
+            {"question": "Q2", "reference": None},
+        ])
+
+    def test_parse_csv(self):
+        content = "Question,Reference_Answer\nQ1,R1\nQ2,\n"
+        questions = parse_questions(content, "csv")
+        self.assertEqual(questions, [
+            {"question": "Q1", "reference": "R1"},
+            {"question": "Q2", "reference": None},
+        ])
+
+    def test_missing_question_is_an_error(self):
+        with self.assertRaises(ValueError):
+            parse_questions('{"reference": "R"}\n', "jsonl")
+        with self.assertRaises(ValueError):
+            parse_questions("", "csv")
+        with self.assertRaises(ValueError):
+            parse_questions("Q", "xlsx")
+
+    def test_non_object_jsonl_line_names_the_row(self):
+        for line in ['["Q", "R"]', "42", "null"]:
+            with self.subTest(line=line):
+                with self.assertRaisesRegex(ValueError, "Row 2"):
+                    parse_questions('{"question": "Q1"}\n' + line + "\n", "jsonl")
+
+    def test_load_questions_from_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "questions.jsonl")
+            with open(path, "w") as f:
+                f.write('"Plain string question"\n')
+            self.assertEqual(load_questions(path), [{"question": "Plain string question", "reference": None}])
+
+
+if __name__ == '__main__':
+    unittest.main()
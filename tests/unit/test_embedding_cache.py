@@ -0,0 +1,76 @@
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from langchain_core.documents import Document
+
+from benchmarks.fakes import FakeEmbeddings
+from src.utils.embedding_cache import EmbeddingCache, CachedEmbeddings
+from src.utils.vectorstore import create_vectorstore
+
+
+class TestEmbeddingCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_persists_across_instances(self):
+        cache = EmbeddingCache("model-a", cache_dir=self.tmp.name)
+        self.assertEqual(cache.get_many(["x", "y"]), [None, None])
+        cache.put_many(["x", "y"], [[1.0, 2.0], [3.0, 4.0]])
+        cache.put_many(["x", "z"], [[9.0, 9.0], [5.0, 6.0]])  # "x" is kept, not overwritten
+        cache.close()
+
+        reopened = EmbeddingCache("model-a", cache_dir=self.tmp.name)
+        self.assertEqual(reopened.get_many(["z", "x", "w"]), [[5.0, 6.0], [1.0, 2.0], None])
+        self.assertEqual(reopened.stats(), {"hits": 2, "misses": 1})
+        self.assertEqual(len(reopened), 3)
+        # Another model never sees these vectors
+        self.assertEqual(EmbeddingCache("model-b", cache_dir=self.tmp.name).get_many(["x"]), [None])
+        reopened.close()
+
+    def test_dimension_mismatch_is_rejected(self):
+        cache = EmbeddingCache("model-a", cache_dir=self.tmp.name)
+        cache.put_many(["x"], [[1.0, 2.0]])
+        with self.assertRaises(ValueError):
+            cache.put_many(["y"], [[1.0, 2.0, 3.0]])
+        self.assertEqual(len(cache), 1)
+        cache.close()
+
+    def test_only_misses_are_embedded_once_each(self):
+        base = MagicMock()
+        base.embed_documents.side_effect = lambda texts: [[float(len(t)), 0.0] for t in texts]
+        cache = EmbeddingCache("model-a", cache_dir=self.tmp.name)
+        cache.put_many(["cached"], [[7.0, 7.0]])
+        embeddings = CachedEmbeddings(base, cache, batch_size=2)
+
+        vectors = embeddings.embed_documents(["cached", "aa", "bbb", "aa", "c"])
+
+        self.assertEqual(vectors, [[7.0, 7.0], [2.0, 0.0], [3.0, 0.0], [2.0, 0.0], [1.0, 0.0]])
+        self.assertEqual([c.args[0] for c in base.embed_documents.call_args_list], [["aa", "bbb"], ["c"]])
+        cache.close()
+
+    def test_second_index_build_embeds_nothing(self):
+        fake = FakeEmbeddings(dimension=16)
+        chunks = [Document(page_content=f"Chunk {i} about drainage.") for i in range(30)]
+        cache = EmbeddingCache("fake", cache_dir=self.tmp.name)
+        with patch('src.utils.vectorstore.get_embeddings', return_value=fake):
+            first = create_vectorstore(chunks, embedding_cache=cache)
+            calls = fake._calls
+            second = create_vectorstore(chunks, embedding_cache=cache)
+
+        self.assertEqual(fake._calls, calls)
+        self.assertEqual(cache.hit_rate(), 0.5)
+        query = fake.embed_query("drainage")
+        self.assertEqual(
+            [d.page_content for d in first.similarity_search_by_vector(query, k=3)],
+            [d.page_content for d in second.similarity_search_by_vector(query, k=3)]
+        )
+        cache.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import json
+import os
+import tempfile
+import unittest
+
+from langchain_core.documents import Document
+
+from src.utils.estimator import estimate_run, check_budget, historical_latencies, DEFAULT_CALL_LATENCY_S
+
+DOCUMENTS = [Document(page_content=" ".join(f"Section {i} requires drainage review." for i in range(400)))]
+
+
+def make_config(**overrides):
+    config = {
+        "model_name": "TestModel",
+        "judge_model": "TestJudge",
+        "chunk_sizes": [500],
+        "chunk_overlaps": [50],
+        "k_retrievals": [1],
+        "temperatures": [0.7],
+        "top_ps": [0.9],
+        "max_concurrency": 1
+    }
+    config.update(overrides)
+    return config
+
+
+class TestEstimator(unittest.TestCase):
+    def estimate(self, **overrides):
+        return estimate_run(["doc.pdf"], make_config(**overrides), [{"question": "What is required?"}],
+                            documents=DOCUMENTS, history={})
+
+    def test_context_tokens_scale_with_k_and_chunk_size(self):
+        small = self.estimate(chunk_sizes=[500], k_retrievals=[1])
+        large = self.estimate(chunk_sizes=[2000], k_retrievals=[10])
+        self.assertEqual(small["requests"], large["requests"])
+        context_small = small["indexes"][0]["context_tokens"][1]
+        context_large = large["indexes"][0]["context_tokens"][10]
+        self.assertGreater(context_large, 10 * context_small)
+        self.assertGreater(large["generation"]["input_tokens"] - small["generation"]["input_tokens"], context_large - context_small - 1)
+        # The system prompt alone makes every generation prompt large
+        self.assertGreater(small["generation"]["input_tokens"], context_small)
+
+    def test_judge_batching_reduces_requests(self):
+        single = self.estimate(temperatures=[0.1, 0.5, 0.9])
+        batched = self.estimate(temperatures=[0.1, 0.5, 0.9], judge_batch_size=2)
+        self.assertEqual(single["judging"]["requests"], 3)
+        self.assertEqual(batched["judging"]["requests"], 2)
+        self.assertLess(batched["judging"]["input_tokens"], single["judging"]["input_tokens"])
+
+    def test_judge_batches_are_split_to_fit_the_token_limit(self):
+        # A 2048-token judge fits the question, context and only one answer per call
+        small_window = self.estimate(
+            temperatures=[0.1, 0.5, 0.9], judge_batch_size=3, k_retrievals=[3], judge_model="Llama 3.2 (Ollama)"
+        )
+        large_window = self.estimate(temperatures=[0.1, 0.5, 0.9], judge_batch_size=3, k_retrievals=[3])
+        self.assertEqual(large_window["judging"]["requests"], 1)
+        self.assertEqual(small_window["judging"]["requests"], 3)
+
+    def test_invalid_configs_are_skipped(self):
+        estimate = self.estimate(chunk_sizes=[100, 500], chunk_overlaps=[200])
+        self.assertEqual([i["chunk_size"] for i in estimate["indexes"]], [500])
+
+    def test_rate_limits_bound_wall_time(self):
+        estimate = estimate_run(
+            ["doc.pdf"], make_config(model_name="Llama 3.1 8b (Groq)", judge_model="Llama 3.1 8b (Groq)", max_concurrency=10,
+                                     temperatures=[0.1, 0.3, 0.5, 0.7, 0.9]),
+            [{"question": "Q"}], documents=DOCUMENTS, history={"generation": {"Llama 3.1 8b (Groq)": 0.1}}
+        )
+        # 10 requests is far below the RPM limit, but the shared 6000 TPM budget is not
+        self.assertGreater(estimate["wall_time_s"], estimate["tokens"] * 60.0 / 6000 - 1)
+        self.assertEqual(list(estimate["providers"]), ["Groq"])
+        self.assertEqual(estimate["latency_source"], "history")
+
+    def test_history_from_run_logs(self):
+        with tempfile.TemporaryDirectory() as runs_dir:
+            with open(os.path.join(runs_dir, "r1.jsonl"), "w") as f:
+                for latency, cached in [(2.0, False), (4.0, False), (0.0, True)]:
+                    row = {"Model": "M", "Judge": "J", "Answer": "word " * 10, "latency_rag": latency,
+                           "latency_judge": latency / 2, "generation_cached": cached, "judge_cached": cached}
+                    f.write(json.dumps({"cell_key": "k", "row": row}) + "\n")
+                f.write("{truncated")
+            history = historical_latencies(runs_dir)
+        self.assertEqual(history["generation"], {"M": 3.0})
+        self.assertEqual(history["judging"], {"J": 1.5})
+        self.assertGreater(history["answer_tokens"]["M"], 0)
+
+        estimate = self.estimate()
+        self.assertEqual(estimate["generation"]["latency_s"], DEFAULT_CALL_LATENCY_S)
+
+    def test_check_budget(self):
+        estimate = self.estimate()
+        self.assertIsNone(check_budget(estimate, {}))
+        self.assertIsNone(check_budget(estimate, {"token_budget": 0, "request_budget": 0}))
+        self.assertIn("token budget", check_budget(estimate, {"token_budget": 10}))
+        self.assertIn("request budget", check_budget(estimate, {"request_budget": 1}))
+
+
+if __name__ == '__main__':
+    unittest.main()
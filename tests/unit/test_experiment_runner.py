@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import MagicMock, patch
+
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings
+from src.components.experiment_runner import run_grid
+from src.utils import experiment
+from src.utils.tracing import Tracer
+
+SAMPLE_DOC = os.path.join(os.path.dirname(__file__), "..", "e2e_sample.txt")
+
+ESTIMATE = {"requests": 4, "tokens": 1000, "wall_time_s": 2.0, "latency_source": "default", "providers": {}}
+
+
+@patch('src.components.experiment_runner.st')
+@patch('src.components.experiment_runner.run_batch_experiment', return_value=[{"Accuracy": 8}])
+@patch('src.components.experiment_runner.estimate_run', return_value=ESTIMATE)
+@patch('src.components.experiment_runner.load_documents', return_value=["doc"])
+class TestRunGrid(unittest.TestCase):
+
+    def setUp(self):
+        self.config = {"model_name": "M", "judge_model": "J", "use_document_cache": False}
+
+    def run_grid(self, **kwargs):
+        return run_grid(["a.pdf"], self.config, "Q", None, MagicMock(), MagicMock(), **kwargs)
+
+    def test_no_budget_skips_the_preflight(self, mock_load, mock_estimate, mock_run, mock_st):
+        self.assertEqual(self.run_grid(), [{"Accuracy": 8}])
+        mock_load.assert_not_called()
+        mock_estimate.assert_not_called()
+        # The engine loads documents itself, and only for indexes it has to build
+        self.assertIsNone(mock_run.call_args.kwargs["documents"])
+
+    def test_budget_estimates_and_reuses_the_loaded_documents(self, mock_load, mock_estimate, mock_run, mock_st):
+        self.config["token_budget"] = 5000
+        self.assertEqual(self.run_grid(), [{"Accuracy": 8}])
+        mock_estimate.assert_called_once_with(["a.pdf"], self.config, [{"question": "Q"}], documents=["doc"])
+        self.assertEqual(mock_run.call_args.kwargs["documents"], ["doc"])
+
+        self.config["token_budget"] = 500
+        self.assertIsNone(self.run_grid())
+        self.assertEqual(mock_run.call_count, 1)
+        mock_st.error.assert_called_once()
+
+    def test_estimate_only_never_runs(self, mock_load, mock_estimate, mock_run, mock_st):
+        self.assertIsNone(self.run_grid(estimate_only=True))
+        mock_estimate.assert_called_once()
+        mock_run.assert_not_called()
+
+
+@patch('src.components.experiment_runner.st')
+class TestRunGridWithIndexStore(unittest.TestCase):
+
+    def test_warm_index_store_skips_document_loading(self, mock_st):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        config = {
+            "model_name": "Fake (Offline)", "judge_model": "Fake (Offline)",
+            "chunk_sizes": [200, 400], "chunk_overlaps": [20], "k_retrievals": [1],
+            "temperatures": [0.1], "top_ps": [0.9], "cache_dir": tmp.name
+        }
+        llm, embeddings = FakeChatModel(), FakeEmbeddings(dimension=16)
+        with patch('src.utils.experiment.get_llm', lambda *args, **kwargs: llm), \
+             patch('src.utils.vectorstore.get_embeddings', lambda: embeddings), \
+             patch('src.utils.experiment.load_documents', wraps=experiment.load_documents) as mock_load, \
+             patch('src.components.experiment_runner.load_documents') as mock_preload:
+            cold = run_grid([SAMPLE_DOC], config, "What is this about?", None, MagicMock(), Tracer())
+            self.assertEqual(len(cold), 2)
+            self.assertEqual(mock_load.call_count, 1)
+
+            tracer = Tracer()
+            warm = run_grid([SAMPLE_DOC], config, "What is this about?", None, MagicMock(), tracer)
+        self.assertEqual(len(warm), len(cold))
+        # Both indexes come from the store, so the documents are never read
+        self.assertEqual(mock_load.call_count, 1)
+        mock_preload.assert_not_called()
+        self.assertNotIn("load_documents", {span.name for span in tracer.spans})
+
+
+if __name__ == "__main__":
+    unittest.main()
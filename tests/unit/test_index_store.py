@@ -0,0 +1,76 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from langchain_community.vectorstores import FAISS
+from langchain_core.documents import Document
+
+from benchmarks.fakes import FakeEmbeddings
+from src.utils.index_store import IndexStore, corpus_key, index_key, INDEX_FILE
+
+
+def build(embeddings, n=20):
+    return FAISS.from_documents([Document(page_content=f"Section {i} on drainage.", metadata={"i": i}) for i in range(n)], embeddings)
+
+
+class TestIndexStore(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.embeddings = FakeEmbeddings(dimension=16)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_round_trip_returns_same_results(self):
+        store = IndexStore(cache_dir=self.tmp.name)
+        original = build(self.embeddings)
+        self.assertIsNone(store.get("k1", self.embeddings))
+        store.put("k1", original, chunk_size=500)
+
+        loaded = IndexStore(cache_dir=self.tmp.name).get("k1", self.embeddings)
+        query = self.embeddings.embed_query("drainage")
+        self.assertEqual(
+            [(d.page_content, d.metadata) for d in loaded.similarity_search_by_vector(query, k=5)],
+            [(d.page_content, d.metadata) for d in original.similarity_search_by_vector(query, k=5)]
+        )
+        self.assertEqual(store.stats(), {"hits": 0, "misses": 1})
+
+    def test_gc_drops_stale_then_least_recently_used(self):
+        store = IndexStore(cache_dir=self.tmp.name, max_age_days=1)
+        with patch('src.utils.index_store.time.time', return_value=time.time() - 3 * 86400):
+            store.put("old", build(self.embeddings))
+        store.put("a", build(self.embeddings))
+        store.put("b", build(self.embeddings))
+        self.assertEqual(sorted(e["key"] for e in store.entries()), ["a", "b"])
+
+        store.get("a", self.embeddings)  # "b" is now the least recently used
+        store.max_bytes = max(e["size_bytes"] for e in store.entries())
+        self.assertEqual(store.gc(), ["b"])
+        self.assertIsNotNone(store.get("a", self.embeddings))
+
+    def test_unreadable_entry_is_discarded(self):
+        store = IndexStore(cache_dir=self.tmp.name)
+        store.put("k1", build(self.embeddings))
+        with open(os.path.join(store.root, "k1", INDEX_FILE), "wb") as f:
+            f.write(b"not an index")
+        self.assertIsNone(store.get("k1", self.embeddings))
+        self.assertEqual(store.entries(), [])
+
+    def test_keys_follow_content_not_location(self):
+        paths = []
+        for name in ["a.txt", "b.txt"]:
+            path = os.path.join(self.tmp.name, name)
+            with open(path, "w") as f:
+                f.write("Same text.")
+            paths.append(path)
+        self.assertEqual(corpus_key([paths[0]]), corpus_key([paths[1]]))
+        base = index_key(corpus_key(paths[:1]), 500, 50, "model")
+        self.assertNotEqual(base, index_key(corpus_key(paths[:1]), 500, 100, "model"))
+        self.assertNotEqual(base, index_key(corpus_key(paths[:1]), 500, 50, "other-model"))
+
+
+if __name__ == "__main__":
+    unittest.main()
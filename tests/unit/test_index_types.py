@@ -0,0 +1,92 @@
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import faiss
+from langchain_core.documents import Document
+
+from benchmarks.fakes import FakeEmbeddings
+from benchmarks.index_benchmark import benchmark_index_types, synthetic_vectors
+from src.utils.index_store import IndexStore
+from src.utils import vectorstore as vs
+from src.utils.vectorstore import (
+    build_index, create_vectorstore, create_vectorstore_streaming, resolve_index_type, retrieve_for_k_values
+)
+
+
+class TestIndexTypes(unittest.TestCase):
+
+    def setUp(self):
+        self.chunks = [Document(page_content=f"Section {i} on drainage.", metadata={"i": i}) for i in range(400)]
+        self.embeddings = FakeEmbeddings(dimension=32)
+
+    def test_auto_follows_corpus_size(self):
+        self.assertEqual(resolve_index_type("auto", vs.FLAT_MAX_VECTORS - 1), "flat")
+        self.assertEqual(resolve_index_type("auto", vs.FLAT_MAX_VECTORS), "hnsw")
+        self.assertEqual(resolve_index_type("auto", vs.HNSW_MAX_VECTORS), "ivf")
+        self.assertEqual(resolve_index_type("auto", vs.IVF_MAX_VECTORS), "ivfpq")
+        self.assertEqual(resolve_index_type("ivf", 10), "ivf")
+        with self.assertRaises(ValueError):
+            resolve_index_type("annoy", 10)
+
+    def test_each_backend_builds_and_searches(self):
+        vectors = synthetic_vectors(2000, 32, clusters=20)
+        expected = {"flat": faiss.IndexFlatL2, "ivf": faiss.IndexIVFFlat, "hnsw": faiss.IndexHNSWFlat, "ivfpq": faiss.IndexIVFPQ}
+        for index_type, cls in expected.items():
+            with self.subTest(index_type=index_type):
+                index = build_index(vectors, index_type)
+                self.assertIsInstance(index, cls)
+                index.add(vectors)
+                _, ids = index.search(vectors[:5], 1)
+                self.assertEqual(index.ntotal, 2000)
+                if index_type != "ivfpq":
+                    self.assertEqual(ids[:, 0].tolist(), [0, 1, 2, 3, 4])
+
+    def test_benchmark_reports_recall_against_flat(self):
+        vectors = synthetic_vectors(1500, 32, clusters=20)
+        rows = benchmark_index_types(vectors[100:], vectors[:100], k=5, index_types=["flat", "hnsw", "ivf"])
+        recall = {row["index_type"]: row["recall_at_5"] for row in rows}
+        self.assertEqual(recall["flat"], 1.0)
+        self.assertGreater(recall["hnsw"], 0.9)
+        self.assertGreater(recall["ivf"], 0.5)
+        self.assertTrue(all(row["memory_mb"] > 0 and row["p50_ms"] >= 0 for row in rows))
+
+    def test_vectorstore_with_ann_backend_round_trips_through_store(self):
+        with patch('src.utils.vectorstore.get_embeddings', return_value=self.embeddings):
+            hnsw = create_vectorstore(self.chunks, index_type="hnsw")
+            ivf, count = create_vectorstore_streaming(iter(self.chunks), batch_size=64, index_type="ivf")
+        self.assertIsInstance(hnsw.index, faiss.IndexHNSWFlat)
+        self.assertIsInstance(ivf.index, faiss.IndexIVFFlat)
+        self.assertEqual((count, ivf.index.ntotal), (400, 400))
+
+        query = self.embeddings.embed_query("Section 7 on drainage.")
+        self.assertEqual(hnsw.similarity_search_by_vector(query, k=1)[0].metadata, {"i": 7})
+        with tempfile.TemporaryDirectory() as tmp:
+            store = IndexStore(cache_dir=tmp)
+            store.put("k", hnsw)
+            loaded = store.get("k", self.embeddings)
+            self.assertEqual(loaded.index.hnsw.efSearch, vs.HNSW_EF_SEARCH)
+            self.assertEqual(loaded.similarity_search_by_vector(query, k=1)[0].metadata, {"i": 7})
+
+    def test_retrieval_for_several_k_matches_a_search_per_k(self):
+        query = self.embeddings.embed_query("Section 7 on drainage.")
+        with patch('src.utils.vectorstore.get_embeddings', return_value=self.embeddings):
+            flat = create_vectorstore(self.chunks, index_type="flat")
+            hnsw = create_vectorstore(self.chunks, index_type="hnsw", index_params={"ef_search": 1})
+        for store in [flat, hnsw]:
+            with self.subTest(index=type(store.index).__name__):
+                results = retrieve_for_k_values(store, "Section 7 on drainage.", [1, 3, 5], query_embedding=query)
+                for k, docs in results.items():
+                    self.assertEqual(docs, store.similarity_search_by_vector(query, k=k))
+
+        # Only the exact index serves every K from one search at the largest
+        with patch.object(flat, "similarity_search_by_vector", wraps=flat.similarity_search_by_vector) as search:
+            retrieve_for_k_values(flat, "Section 7 on drainage.", [1, 3, 5], query_embedding=query)
+        self.assertEqual([c.kwargs["k"] for c in search.call_args_list], [5])
+        with patch.object(hnsw, "similarity_search_by_vector", wraps=hnsw.similarity_search_by_vector) as search:
+            retrieve_for_k_values(hnsw, "Section 7 on drainage.", [1, 3, 5], query_embedding=query)
+        self.assertEqual([c.kwargs["k"] for c in search.call_args_list], [1, 3, 5])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import os
+import shutil
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from langchain_community.document_loaders import PyPDFLoader
+
+from src.utils import ingestion
+from src.utils.cache import DiskCache
+from src.utils.ingestion import load_document, load_documents, DocumentLoadError
+
+PDF_PATH = "SPU_docs/15physicalsecurityfinalredacted.pdf"
+TXT_PATH = "data/test_doc.txt"
+
+
+def as_tuples(docs):
+    return [(d.page_content, d.metadata) for d in docs]
+
+
+@unittest.skipUnless(os.path.exists(PDF_PATH) and os.path.exists(TXT_PATH), "sample documents not available")
+class TestParallelLoading(unittest.TestCase):
+
+    def test_page_ranges_match_whole_file_loader(self):
+        # Compared with langchain's loader itself, so an upstream change in its output is caught
+        expected = PyPDFLoader(PDF_PATH).load()
+        self.assertGreater(len(expected), 10)
+        pages = ingestion._load_pdf_pages(PDF_PATH, 0, 10) + ingestion._load_pdf_pages(PDF_PATH, 10, len(expected) + 5)
+        self.assertEqual(as_tuples(pages), as_tuples(expected))
+
+    def test_process_pool_preserves_order_and_metadata(self):
+        expected = load_document(TXT_PATH) + load_document(PDF_PATH)
+        # Force several page-range tasks across two workers
+        with patch.object(ingestion, "PDF_PAGES_PER_TASK", 5), patch.object(ingestion, "MIN_PAGES_FOR_PARALLEL", 0):
+            docs = load_documents([TXT_PATH, PDF_PATH], max_workers=2)
+        self.assertEqual(as_tuples(docs), as_tuples(expected))
+
+    def test_failure_names_the_file(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            bad = os.path.join(tmp, "notes.xyz")
+            open(bad, "w").close()
+            with self.assertRaises(DocumentLoadError) as ctx:
+                load_documents([TXT_PATH, bad], max_workers=1)
+        self.assertEqual(ctx.exception.file_path, bad)
+
+
+@unittest.skipUnless(os.path.exists(PDF_PATH), "sample documents not available")
+class TestDocumentCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.cache = DiskCache("parsed_documents", cache_dir=self.tmp.name)
+
+    def tearDown(self):
+        self.cache.close()
+        self.tmp.cleanup()
+
+    def test_same_content_at_new_path_skips_parsing(self):
+        expected = load_document(PDF_PATH)
+        load_documents([PDF_PATH], max_workers=1, cache=self.cache)
+
+        # Same bytes under a different name, as each app upload gets a fresh temp dir
+        copy = os.path.join(self.tmp.name, "upload.pdf")
+        shutil.copyfile(PDF_PATH, copy)
+        with patch.object(ingestion.PyPDFLoader, "load", side_effect=AssertionError("parsed again")), \
+             patch.object(ingestion, "_load_pdf_pages", side_effect=AssertionError("parsed again")):
+            docs = load_documents([copy], max_workers=2, cache=self.cache)
+
+        self.assertEqual(self.cache.stats(), {"hits": 1, "misses": 1})
+        self.assertEqual([d.page_content for d in docs], [d.page_content for d in expected])
+        self.assertEqual([d.metadata for d in docs], [dict(d.metadata, source=copy) for d in expected])
+
+    def test_changed_content_is_a_miss(self):
+        path = os.path.join(self.tmp.name, "notes.txt")
+        with open(path, "w") as f:
+            f.write("First version.")
+        self.assertEqual(load_document(path, cache=self.cache)[0].page_content, "First version.")
+        with open(path, "w") as f:
+            f.write("Second version.")
+        self.assertEqual(load_document(path, cache=self.cache)[0].page_content, "Second version.")
+        self.assertEqual(self.cache.stats(), {"hits": 0, "misses": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
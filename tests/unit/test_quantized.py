@@ -0,0 +1,82 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+from langchain_core.documents import Document
+
+from benchmarks.fakes import FakeEmbeddings
+from src.utils.index_store import IndexStore, EXACT_VECTORS_FILE
+from src.utils.quantized import ExactVectors, RerankedFAISS, rerank
+from src.utils.vectorstore import create_vectorstore, create_vectorstore_streaming, vector_bytes
+
+
+def as_results(vectorstore, query, k=5):
+    return [(d.metadata["i"], round(score, 4)) for d, score in vectorstore.similarity_search_with_score_by_vector(query, k=k)]
+
+
+class TestQuantizedStorage(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.embeddings = FakeEmbeddings(dimension=32)
+        self.chunks = [Document(page_content=f"Section {i} on drainage.", metadata={"i": i}) for i in range(600)]
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def build(self, **kwargs):
+        with patch('src.utils.vectorstore.get_embeddings', return_value=self.embeddings):
+            return create_vectorstore(self.chunks, cache_dir=self.tmp.name, **kwargs)
+
+    def test_exact_vectors_append_and_save(self):
+        exact = ExactVectors(4, directory=self.tmp.name)
+        exact.append(np.arange(8, dtype=np.float32).reshape(2, 4))
+        exact.append(np.ones((1, 4), dtype=np.float32))
+        self.assertEqual(len(exact), 3)
+        self.assertEqual(exact[[2, 0]].tolist(), [[1.0] * 4, [0.0, 1.0, 2.0, 3.0]])
+        # The working file is unlinked as soon as it is created
+        self.assertEqual(os.listdir(self.tmp.name), [])
+
+        path = os.path.join(self.tmp.name, "saved.f32")
+        exact.save(path)
+        self.assertEqual(ExactVectors(4, path=path)[1].tolist(), [4.0, 5.0, 6.0, 7.0])
+
+    def test_rerank_orders_by_exact_distance(self):
+        vectors = np.array([[0.0, 0.0], [3.0, 0.0], [1.0, 0.0]], dtype=np.float32)
+        distances, ids = rerank(vectors, np.array([0.9, 0.0], dtype=np.float32), np.array([1, -1, 0, 2]), 2)
+        self.assertEqual(ids.tolist(), [2, 0])
+        self.assertAlmostEqual(float(distances[0]), 0.01, places=5)
+
+    def test_compressed_storage_matches_exact_results(self):
+        reference = self.build()
+        query = self.embeddings.embed_query("drainage")
+        for storage in ["fp16", "int8", "pq"]:
+            with self.subTest(storage=storage):
+                compressed = self.build(storage=storage, rerank_factor=8)
+                self.assertIsInstance(compressed, RerankedFAISS)
+                stored, full = vector_bytes(compressed.index)
+                self.assertLess(stored, full)
+                if storage != "pq":
+                    self.assertEqual(as_results(compressed, query), as_results(reference, query))
+        self.assertNotIsInstance(self.build(storage="int8", rerank_factor=0), RerankedFAISS)
+
+    def test_stored_compressed_index_keeps_exact_vectors(self):
+        with patch('src.utils.vectorstore.get_embeddings', return_value=self.embeddings):
+            original, count = create_vectorstore_streaming(
+                iter(self.chunks), batch_size=64, storage="int8", cache_dir=self.tmp.name
+            )
+        self.assertEqual((count, len(original.exact)), (600, 600))
+
+        store = IndexStore(cache_dir=self.tmp.name)
+        store.put("k", original)
+        self.assertTrue(os.path.exists(os.path.join(store.root, "k", EXACT_VECTORS_FILE)))
+        loaded = store.get("k", self.embeddings)
+        self.assertIsInstance(loaded, RerankedFAISS)
+        query = self.embeddings.embed_query("drainage")
+        self.assertEqual(as_results(loaded, query), as_results(original, query))
+
+
+if __name__ == "__main__":
+    unittest.main()
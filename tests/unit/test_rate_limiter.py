@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import time
+import unittest
+from unittest.mock import MagicMock
+
+from src.utils.rate_limiter import RateLimiter, get_retry_after, is_rate_limit_error
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimitError(Exception):
+    def __init__(self, headers):
+        super().__init__("429")
+        self.response = MagicMock(headers=headers)
+
+
+class TestRateLimiter(unittest.TestCase):
+
+    def test_requests_per_minute_queues_excess_requests(self):
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=60, clock=clock)
+
+        # Full bucket: the first 60 requests go straight through
+        waits = [limiter.reserve() for _ in range(60)]
+        self.assertEqual(max(waits), 0)
+
+        # Then each further request is spaced one second apart
+        self.assertAlmostEqual(limiter.reserve(), 1.0)
+        self.assertAlmostEqual(limiter.reserve(), 2.0)
+
+        # Refill after time passes
+        clock.now += 10
+        self.assertEqual(limiter.reserve(), 0)
+
+    def test_tokens_per_minute_budget(self):
+        clock = FakeClock()
+        limiter = RateLimiter(tokens_per_minute=6000, clock=clock)
+
+        self.assertEqual(limiter.reserve(tokens=6000), 0)
+        self.assertAlmostEqual(limiter.reserve(tokens=3000), 30.0)
+
+    def test_unlimited_never_waits(self):
+        limiter = RateLimiter()
+        self.assertEqual(sum(limiter.reserve(tokens=10**6) for _ in range(100)), 0)
+
+    def test_retry_after_applies_global_backoff(self):
+        clock = FakeClock()
+        limiter = RateLimiter(requests_per_minute=1000, clock=clock)
+
+        self.assertTrue(limiter.observe_error(RateLimitError({"retry-after": "12"})))
+        self.assertAlmostEqual(limiter.reserve(), 12.0)
+
+        clock.now += 12
+        self.assertEqual(limiter.reserve(), 0)
+
+    def test_non_rate_limit_errors_are_ignored(self):
+        limiter = RateLimiter(default_backoff=5)
+        self.assertFalse(limiter.observe_error(ValueError("boom")))
+        self.assertEqual(limiter.reserve(), 0)
+
+    def test_retry_after_parsing(self):
+        self.assertEqual(get_retry_after(RateLimitError({"retry-after-ms": "1500"})), 1.5)
+        self.assertIsNone(get_retry_after(RateLimitError({})))
+        self.assertTrue(is_rate_limit_error(RateLimitError({})))
+
+    def test_backoff_during_a_wait_holds_back_the_waiting_thread(self):
+        limiter = RateLimiter()
+        limiter.backoff(0.1)
+        waited = []
+        worker = threading.Thread(target=lambda: waited.append(limiter.acquire()))
+
+        start = time.monotonic()
+        worker.start()
+        time.sleep(0.05)
+        # A 429 seen elsewhere while the worker is already asleep on the first backoff
+        limiter.backoff(0.3)
+        worker.join()
+
+        self.assertGreaterEqual(time.monotonic() - start, 0.3)
+        self.assertGreaterEqual(waited[0], 0.3)
+
+    def test_acquire_async(self):
+        limiter = RateLimiter(requests_per_minute=6000)
+        waited = asyncio.run(limiter.acquire_async())
+        self.assertEqual(waited, 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
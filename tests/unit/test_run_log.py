@@ -0,0 +1,52 @@
+import os
+import tempfile
+import unittest
+
+from src.utils.run_log import RunLog, cell_key, corpus_fingerprint, list_runs, run_settings
+
+
+class TestRunLog(unittest.TestCase):
+
+    def test_append_and_load_ignores_truncated_line(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            log = RunLog("run-a", runs_dir=tmp)
+            log.append("k1", {"Accuracy": 7})
+            log.append("k2", {"Accuracy": 9})
+            with open(log.path, "a") as f:
+                f.write('{"cell_key": "k3", "row"')  # crash mid-write
+
+            self.assertEqual(RunLog("run-a", runs_dir=tmp).load(), {"k1": {"Accuracy": 7}, "k2": {"Accuracy": 9}})
+            self.assertEqual(list_runs(tmp), ["run-a"])
+
+    def test_cell_key_is_deterministic(self):
+        args = ("corpus", "Model", "Judge", "Q", 500, 50, 3, 0.7, 0.9)
+        self.assertEqual(cell_key(*args), cell_key(*args))
+        self.assertNotEqual(cell_key(*args), cell_key("corpus", "Model", "Judge", "Q", 500, 50, 5, 0.7, 0.9))
+
+    def test_cell_key_covers_result_settings(self):
+        args = ("corpus", "Model", "Judge", "Q", 500, 50, 3, 0.7, 0.9)
+        retrieval = {"index_type": "auto", "index_params": None, "vector_storage": "float32", "citation_lookup": True}
+        defaults = run_settings({}, retrieval)
+        self.assertEqual(cell_key(*args, defaults), cell_key(*args, run_settings({"judge_batch_size": 1}, dict(retrieval))))
+        for config, change in [
+            ({}, {"index_type": "hnsw"}), ({}, {"vector_storage": "int8", "rerank_factor": 4}),
+            ({}, {"citation_lookup": False}), ({"judge_batch_size": 4}, {})
+        ]:
+            with self.subTest(config=config, change=change):
+                self.assertNotEqual(cell_key(*args, defaults), cell_key(*args, run_settings(config, {**retrieval, **change})))
+        # Retrieval options don't matter without documents
+        self.assertEqual(run_settings({"index_type": "hnsw"}), {"judge_batch_size": 1})
+
+    def test_corpus_fingerprint_uses_content_not_path(self):
+        with tempfile.TemporaryDirectory() as a, tempfile.TemporaryDirectory() as b:
+            for d in (a, b):
+                with open(os.path.join(d, "doc.txt"), "w") as f:
+                    f.write("same content")
+            self.assertEqual(
+                corpus_fingerprint([os.path.join(a, "doc.txt")]),
+                corpus_fingerprint([os.path.join(b, "doc.txt")])
+            )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,94 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from langchain_core.documents import Document
+from langchain_text_splitters import RecursiveCharacterTextSplitter
+
+from src.utils import ingestion
+from src.utils.ingestion import MultiConfigSplitter, SEPARATORS, load_document
+
+PDF_PATH = "SPU_docs/15physicalsecurityfinalredacted.pdf"
+
+GRID = [(50, 0), (50, 10), (120, 20), (300, 50), (1000, 200)]
+
+
+def as_tuples(docs):
+    return [(d.page_content, d.metadata) for d in docs]
+
+
+def reference_split(docs, chunk_size, chunk_overlap):
+    # langchain's splitter itself, so a change in its output upstream is caught
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap, separators=SEPARATORS)
+    return splitter.split_documents(docs)
+
+
+class TestMultiConfigSplitter(unittest.TestCase):
+
+    def setUp(self):
+        self.docs = [
+            Document(page_content="Title\n\nFirst paragraph of text.\nSecond line here.\n\n" + "word " * 80, metadata={"page": 0}),
+            # An unbroken run longer than every chunk size forces the character-level fallback
+            Document(page_content="x" * 400 + "\n" + "short tail", metadata={"page": 1, "tags": ["a", "b"]}),
+            Document(page_content="", metadata={"page": 2}),
+        ]
+
+    def test_matches_recursive_splitter_for_every_config(self):
+        splitter = MultiConfigSplitter(self.docs, GRID)
+        for chunk_size, chunk_overlap in GRID + [(80, 30)]:  # the last one is split on its own
+            with self.subTest(chunk_size=chunk_size, chunk_overlap=chunk_overlap):
+                self.assertEqual(
+                    as_tuples(splitter.split(chunk_size, chunk_overlap)),
+                    as_tuples(reference_split(self.docs, chunk_size, chunk_overlap))
+                )
+
+    def test_split_holds_at_most_max_held_chunk_sets(self):
+        splitter = MultiConfigSplitter(self.docs, GRID, max_held=2)
+        with patch.object(splitter, "split_document", wraps=splitter.split_document) as split_document:
+            for chunk_size, chunk_overlap in GRID:
+                splitter.split(chunk_size, chunk_overlap)
+                self.assertLessEqual(len(splitter._pending), 1)
+        # One pass over the documents per two configs
+        batches = [call.args[1] for call in split_document.call_args_list[::len(self.docs)]]
+        self.assertEqual(batches, [GRID[0:2], GRID[2:4], GRID[4:5]])
+
+    def test_discarded_configs_are_never_split(self):
+        splitter = MultiConfigSplitter(self.docs, GRID, max_held=2)
+        splitter.discard(*GRID[1])
+        with patch.object(splitter, "split_document", wraps=splitter.split_document) as split_document:
+            splitter.split(*GRID[0])
+        self.assertEqual(split_document.call_args.args[1], [GRID[0], GRID[2]])
+
+    def test_each_text_is_cut_once_per_document(self):
+        cuts = []
+        def record(text, separator):
+            cuts.append((text, separator))
+            return split(text, separator)
+        split = ingestion._split_keeping_separator
+        with patch.object(ingestion, "_split_keeping_separator", side_effect=record):
+            per_document = list(MultiConfigSplitter(iter(self.docs), GRID).iter_split())
+        self.assertEqual(len(cuts), len(set(cuts)))
+        self.assertEqual([list(chunks) for chunks in per_document], [GRID] * len(self.docs))
+
+    def test_chunk_metadata_is_independent(self):
+        chunks = MultiConfigSplitter(self.docs, [(50, 10)]).split(50, 10)
+        chunks[0].metadata["page"] = 99
+        tagged = [c for c in chunks if "tags" in c.metadata]
+        tagged[0].metadata["tags"].append("c")
+        self.assertEqual(self.docs[0].metadata["page"], 0)
+        self.assertEqual(self.docs[1].metadata["tags"], ["a", "b"])
+
+    @unittest.skipUnless(os.path.exists(PDF_PATH), "sample documents not available")
+    def test_matches_on_real_pdf(self):
+        docs = load_document(PDF_PATH)
+        configs = [(300, 0), (500, 50), (1000, 200)]
+        splitter = MultiConfigSplitter(docs, configs)
+        for chunk_size, chunk_overlap in configs:
+            self.assertEqual(
+                as_tuples(splitter.split(chunk_size, chunk_overlap)),
+                as_tuples(reference_split(docs, chunk_size, chunk_overlap))
+            )
+
+
+if __name__ == "__main__":
+    unittest.main()
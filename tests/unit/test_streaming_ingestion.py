@@ -0,0 +1,48 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from benchmarks.fakes import FakeEmbeddings
+from src.utils.ingestion import load_documents, iter_documents, split_documents, iter_chunks
+from src.utils.memory import MemoryLimitExceeded
+from src.utils.vectorstore import create_vectorstore, create_vectorstore_streaming
+
+FILES = ["data/test_doc.txt", "SPU_docs/15physicalsecurityfinalredacted.pdf"]
+
+
+@unittest.skipUnless(all(os.path.exists(f) for f in FILES), "sample documents not available")
+class TestStreamingIngestion(unittest.TestCase):
+
+    def test_stream_yields_same_chunks_as_batch_path(self):
+        expected = split_documents(load_documents(FILES, max_workers=1), chunk_size=500, chunk_overlap=50)
+        streamed = list(iter_chunks(iter_documents(FILES), chunk_size=500, chunk_overlap=50))
+        self.assertEqual(
+            [(c.page_content, c.metadata) for c in streamed],
+            [(c.page_content, c.metadata) for c in expected]
+        )
+
+    @patch('src.utils.vectorstore.get_embeddings', return_value=FakeEmbeddings(dimension=32))
+    def test_streaming_index_matches_batch_index(self, _):
+        chunks = split_documents(load_documents(FILES, max_workers=1), chunk_size=500, chunk_overlap=50)
+        batch_vs = create_vectorstore(chunks)
+        stream_vs, count = create_vectorstore_streaming(
+            iter_chunks(iter_documents(FILES), chunk_size=500, chunk_overlap=50), batch_size=7
+        )
+
+        self.assertEqual(count, len(chunks))
+        self.assertEqual(stream_vs.index.ntotal, len(chunks))
+        query = "physical security of pump stations"
+        self.assertEqual(
+            [d.page_content for d in stream_vs.similarity_search(query, k=5)],
+            [d.page_content for d in batch_vs.similarity_search(query, k=5)]
+        )
+
+    @patch('src.utils.vectorstore.get_embeddings', return_value=FakeEmbeddings(dimension=32))
+    def test_memory_ceiling_stops_ingestion(self, _):
+        with patch('src.utils.memory.current_rss_mb', return_value=4096.0):
+            with self.assertRaises(MemoryLimitExceeded):
+                create_vectorstore_streaming(iter_chunks(iter_documents(FILES)), memory_limit_mb=1024)
+
+
+if __name__ == "__main__":
+    unittest.main()
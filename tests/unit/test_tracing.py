@@ -0,0 +1,65 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from src.utils.tracing import Tracer
+
+
+class TestTracer(unittest.TestCase):
+    def test_spans_record_attributes_and_errors(self):
+        tracer = Tracer()
+        with tracer.span("generation", model="M") as span:
+            span.set(input_tokens=10, output_tokens=5, retries=1)
+        with self.assertRaises(ValueError):
+            with tracer.span("judging"):
+                raise ValueError("bad")
+
+        spans = tracer.spans
+        self.assertEqual([s.name for s in spans], ["generation", "judging"])
+        self.assertEqual(spans[0].attrs, {"model": "M", "input_tokens": 10, "output_tokens": 5, "retries": 1})
+        self.assertEqual(spans[1].attrs["error"], "ValueError")
+        self.assertGreaterEqual(spans[0].duration, 0.0)
+
+    def test_summary_aggregates_per_stage(self):
+        tracer = Tracer()
+        for cached in [True, False, False]:
+            with tracer.span("judging") as span:
+                span.set(cached=cached, input_tokens=100, retries=1 if not cached else 0)
+        with tracer.span("retrieval"):
+            pass
+
+        summary = {row["Stage"]: row for row in tracer.summary()}
+        self.assertEqual(list(summary.keys()), ["judging", "retrieval"])
+        self.assertEqual(summary["judging"]["Calls"], 3)
+        self.assertEqual(summary["judging"]["Cache Hits"], 1)
+        self.assertEqual(summary["judging"]["input_tokens"], 300)
+        self.assertEqual(summary["judging"]["retries"], 2)
+        self.assertEqual(summary["retrieval"]["Calls"], 1)
+
+    def test_threads_and_json_export(self):
+        tracer = Tracer()
+
+        def work():
+            with tracer.span("generation"):
+                pass
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "trace.json")
+            tracer.write(path)
+            with open(path) as f:
+                trace = json.load(f)
+        self.assertEqual(len(trace["spans"]), 8)
+        self.assertEqual(trace["summary"][0]["Calls"], 8)
+        self.assertTrue(all(s["end"] >= s["start"] for s in trace["spans"]))
+
+
+if __name__ == '__main__':
+    unittest.main()